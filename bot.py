@@ -1,15 +1,26 @@
+import time
+PROCESS_START = time.perf_counter()
+
 import discord
 from discord.ext import commands
+import asyncio
 import os
 from dotenv import load_dotenv
-import re
-from utils import FileDetector, PDFProcessor, ScreenshotService
-from evaluators import ResumeEvaluator, PortfolioEvaluator
 
-# Load secrets
+# Before the project imports, which read their settings at import time
 load_dotenv()
+
+from utils import ProgressTracker, ReviewQueue, Runtime, URLIngestor  # noqa: E402
+from pipeline import ReviewPipeline, send_feedback  # noqa: E402
+
+# Load secrets
 TOKEN = os.getenv('DISCORD_TOKEN')
 CLAUDE_API_KEY = os.getenv('CLAUDE_API_KEY')
+# Jobs in the staged review pipeline at once (each stage bounds its own work)
+MAX_CONCURRENT_REVIEWS = int(os.getenv('MAX_CONCURRENT_REVIEWS', '6'))
+# 'standalone' runs reviews in this process; 'gateway' hands them to worker.py
+BOT_MODE = os.getenv('BOT_MODE', 'standalone')
+JOB_QUEUE_PATH = os.getenv('JOB_QUEUE_PATH', 'data/jobs.db')
 
 # Initialize clients
 intents = discord.Intents.default()
@@ -18,158 +29,97 @@ intents.messages = True
 
 bot = commands.Bot(command_prefix='!', intents=intents)
 
-# Initialize evaluators
-resume_evaluator = ResumeEvaluator(api_key=CLAUDE_API_KEY)
-portfolio_evaluator = PortfolioEvaluator(api_key=CLAUDE_API_KEY)
-
-
-def is_url(text: str) -> bool:
-    """Check if text is a URL."""
-    url_pattern = re.compile(
-        r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+'
-    )
-    return bool(url_pattern.match(text))
-
-
-def extract_urls_from_message(message: str) -> list:
-    """Extract URLs from message content."""
-    url_pattern = re.compile(
-        r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+'
-    )
-    return url_pattern.findall(message)
-
-
-async def process_pdf(attachment, message):
-    """Process PDF attachment - detect type and evaluate accordingly."""
-    await message.add_reaction('👀')
-
-    try:
-        # Download PDF
-        pdf_bytes = await attachment.read()
-        temp_path = f"temp_{attachment.filename}"
-
-        with open(temp_path, 'wb') as f:
-            f.write(pdf_bytes)
-
-        await message.add_reaction('⚙️')
-
-        # Extract text
-        try:
-            text_content = PDFProcessor.extract_text(temp_path)
-        except Exception as e:
-            os.remove(temp_path)
-            await message.reply(f"❌ Error extracting text from PDF: {str(e)}")
-            return
-
-        # Check if we got text
-        if len(text_content) < 50:
-            os.remove(temp_path)
-            await message.reply("⚠️ This PDF seems to be mostly images or very short. For portfolios with mainly images, please share a URL instead. For resumes, try exporting as a text-based PDF.")
-            return
-
-        # Detect file type
-        await message.add_reaction('🔍')
-        file_type = FileDetector.detect(text_content, attachment.filename)
-
-        # Route to appropriate evaluator
-        await message.add_reaction('🤔')
-
-        if file_type == 'resume':
-            # Resume evaluation
-            await message.channel.send(f"📄 Detected: **Resume** - Evaluating against entry-level UX job requirements...")
-            feedback = await resume_evaluator.evaluate(text_content, prompt_type='entry_level_ux')
-            header = "## Resume Feedback - Entry-Level UX Designer Position\n\n"
-        else:
-            # Portfolio evaluation (text-based)
-            await message.channel.send(f"📁 Detected: **Portfolio** - Analyzing content and structure...")
-            feedback = await portfolio_evaluator.evaluate_text(text_content, prompt_type='ux_text')
-            header = "## Portfolio Feedback\n\n"
-
-        # Clean up temp file
-        os.remove(temp_path)
-
-        # Send feedback in chunks if needed (Discord has 2000 char limit)
-        if len(feedback) <= 1900:
-            await message.reply(f"{header}{feedback}")
-        else:
-            # Split into chunks
-            chunks = [feedback[i:i+1800] for i in range(0, len(feedback), 1800)]
-            await message.reply(f"{header}{chunks[0]}")
-            for i, chunk in enumerate(chunks[1:], 2):
-                await message.channel.send(f"**(Part {i})**\n\n{chunk}")
-
-        # Success reaction
-        await message.add_reaction('✅')
-
-    except Exception as e:
-        await message.reply(f'❌ Error processing PDF: {str(e)}')
-        print(f"Error details: {e}")
-        # Clean up temp file if it exists
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
-
-
-async def process_url(url: str, message):
-    """Process portfolio URL - screenshot and evaluate visually."""
-    await message.add_reaction('👀')
-
-    try:
-        # Validate URL
-        if not ScreenshotService.is_valid_url(url):
-            await message.reply(f"❌ Invalid URL: {url}")
-            return
-
-        await message.add_reaction('📸')
-        await message.channel.send(f"🌐 **Portfolio URL detected** - Capturing screenshots for visual analysis...")
-
-        # Capture screenshot
-        async with ScreenshotService() as screenshot_service:
+# Evaluators, PDF processing and Chromium are loaded lazily (see utils/runtime.py)
+runtime = Runtime(api_key=CLAUDE_API_KEY, process_start=PROCESS_START)
+runtime.mark('imports')
+
+# Bounds concurrent reviews; waiting jobs see their queue position
+review_queue = ReviewQueue(max_concurrent=MAX_CONCURRENT_REVIEWS)
+pipeline = ReviewPipeline(runtime, review_queue)
+
+if BOT_MODE == 'gateway':
+    from utils import JobQueue
+    job_queue = JobQueue(JOB_QUEUE_PATH)
+
+
+async def enqueue_job(kind: str, label: str, message, payload: dict):
+    """Gateway mode: post a status message and hand the job to the worker queue."""
+    tracker = ProgressTracker(message, label)
+    queued = (await asyncio.to_thread(job_queue.stats)).get('queued', 0)
+    await tracker.start(queue_position=queued + 1)
+
+    payload.update({
+        'label': label,
+        'channel_id': message.channel.id,
+        'guild_id': message.guild.id if message.guild else None,
+        'message_id': message.id,
+        'author_id': message.author.id,
+        'status_message_id': tracker.status_message.id if tracker.status_message else None,
+    })
+    await asyncio.to_thread(job_queue.enqueue, kind, payload)
+
+
+async def handle_pdfs(attachments: list, message):
+    """Review a message's PDF attachments in-process or via the worker queue."""
+    if BOT_MODE == 'gateway':
+        # Reject oversized uploads here rather than after they wait in the queue
+        from utils import AttachmentDownloader, DownloadRejected
+        accepted = []
+        for attachment in attachments:
             try:
-                screenshot_path = await screenshot_service.capture_screenshot(
-                    url,
-                    full_page=True,
-                    viewport_width=1920,
-                    viewport_height=1080
-                )
-            except Exception as e:
-                await message.reply(f"❌ Error capturing screenshot: {str(e)}")
-                return
-
-        # Evaluate portfolio visually
-        await message.add_reaction('🤔')
-        await message.channel.send("🎨 Analyzing portfolio design, structure, and UX process...")
-
-        feedback = await portfolio_evaluator.evaluate_visual(
-            screenshot_path,
-            prompt_type='ux_visual'
-        )
-
-        # Clean up screenshot
-        if os.path.exists(screenshot_path):
-            os.remove(screenshot_path)
-
-        # Send feedback
-        header = "## Portfolio Feedback - Visual Analysis\n\n"
-        if len(feedback) <= 1900:
-            await message.reply(f"{header}{feedback}")
+                AttachmentDownloader.check_size(attachment)
+                accepted.append(attachment)
+            except DownloadRejected as e:
+                await message.reply(f"❌ {attachment.filename}: {e}")
+        if not accepted:
+            return
+        label = accepted[0].filename if len(accepted) == 1 else f"{len(accepted)} PDFs"
+        await enqueue_job('pdf', label, message, {
+            'attachments': [
+                {'url': a.url, 'filename': a.filename, 'size': a.size}
+                for a in accepted
+            ],
+        })
+    else:
+        await pipeline.process_pdfs(attachments, message)
+
+
+async def handle_url(url: str, message):
+    """Review a portfolio URL in-process or via the worker queue."""
+    if BOT_MODE == 'gateway':
+        await enqueue_job('url', url, message, {'url': url})
+    else:
+        await pipeline.process_url(url, message)
+
+
+async def handle_links(links: list, message):
+    """Route pre-flighted links: pages to screenshot review, PDFs to the PDF pipeline."""
+    pdfs = []
+    for link in links:
+        if link['kind'] in ('html', 'unknown'):
+            await handle_url(link['final_url'], message)
+        elif link['kind'] == 'pdf':
+            pdfs.append(URLIngestor.as_attachment(link))
         else:
-            chunks = [feedback[i:i+1800] for i in range(0, len(feedback), 1800)]
-            await message.reply(f"{header}{chunks[0]}")
-            for i, chunk in enumerate(chunks[1:], 2):
-                await message.channel.send(f"**(Part {i})**\n\n{chunk}")
-
-        await message.add_reaction('✅')
-
-    except Exception as e:
-        await message.reply(f'❌ Error processing URL: {str(e)}')
-        print(f"Error details: {e}")
+            await message.reply(URLIngestor.reason(link))
+    if pdfs:
+        await handle_pdfs(pdfs, message)
 
 
 @bot.event
 async def on_ready():
+    if 'gateway ready' not in runtime.timings:
+        runtime.mark('gateway ready')
     print(f'{bot.user} has connected to Discord!')
     print(f'Bot is in {len(bot.guilds)} server(s)')
     print('Ready to review portfolios and resumes!')
+    print(f"Startup timings - {runtime.report()}")
+
+    # Load evaluators and warm up Chromium now that the gateway is connected
+    if BOT_MODE == 'gateway':
+        print(f'Gateway mode: queueing reviews for worker.py ({JOB_QUEUE_PATH})')
+    else:
+        runtime.start_warm_up()
 
 
 @bot.event
@@ -178,18 +128,16 @@ async def on_message(message):
     if message.author == bot.user:
         return
 
-    # Check for PDF attachments
-    if message.attachments:
-        for attachment in message.attachments:
-            if attachment.filename.lower().endswith('.pdf'):
-                await process_pdf(attachment, message)
-                return
-
-    # Check for URLs in message content
-    urls = extract_urls_from_message(message.content)
-    if urls:
-        for url in urls:
-            await process_url(url, message)
+    # Check for PDF attachments (all PDFs of a message are reviewed together)
+    pdfs = [a for a in message.attachments if a.filename.lower().endswith('.pdf')]
+    if pdfs:
+        await handle_pdfs(pdfs, message)
+        return
+
+    # Check for URLs in message content (deduplicated and pre-flighted before any browser work)
+    links = await URLIngestor.ingest(message.content)
+    if links:
+        await handle_links(links, message)
         return
 
     await bot.process_commands(message)
@@ -200,6 +148,54 @@ async def ping(ctx):
     await ctx.send('Pong! Bot is alive and ready to review portfolios and resumes.')
 
 
+@bot.command(name='metrics')
+async def metrics(ctx):
+    """Show memory, concurrency limits, pipeline stage utilization and recent resource-controller decisions."""
+    text = runtime.resources.format_metrics()
+    if BOT_MODE == 'gateway':
+        stats = await asyncio.to_thread(job_queue.stats)
+        text += "\nJob queue: " + ', '.join(f"{status} {count}" for status, count in stats.items())
+        text += "\n_Reviews run in worker.py; these numbers cover the gateway process._"
+    else:
+        text += "\n\n" + runtime.stages.format_metrics()
+    await ctx.send(text)
+
+
+@bot.command(name='history')
+async def history(ctx, *args):
+    """List your recent reviews: `!history [count]` or `!history search <words>`."""
+    store = runtime.review_store
+    if store is None:
+        await ctx.send("Review history is turned off on this server.")
+        return
+    if args and args[0].lower() == 'search':
+        words = ' '.join(args[1:])
+        if not words.strip():
+            await ctx.send("Usage: `!history search <words>`")
+            return
+        reviews = await asyncio.to_thread(store.search, words, user_id=ctx.author.id, limit=10)
+        empty = f"None of your reviews mention “{words}”."
+    else:
+        count = min(int(args[0]), 20) if args and args[0].isdigit() else 5
+        reviews = await asyncio.to_thread(store.recent, ctx.author.id, count)
+        empty = "You have no reviews yet — upload a resume or portfolio PDF, or share your portfolio link."
+    if not reviews:
+        await ctx.send(empty)
+        return
+    await ctx.send(store.format_history(reviews)[:1900] + "\n_Use `!review <number>` to see a review again._")
+
+
+@bot.command(name='review')
+async def review(ctx, review_id: int):
+    """Show one of your stored reviews again."""
+    store = runtime.review_store
+    stored = await asyncio.to_thread(store.get, review_id) if store is not None else None
+    if stored is None or stored['user_id'] != ctx.author.id:
+        await ctx.send(f"No review #{review_id} of yours was found.")
+        return
+    await send_feedback(ctx.message, f"## {stored['title']} (#{review_id}, {stored['label']})\n\n", stored['feedback'])
+
+
 @bot.command(name='guide')
 async def help_command(ctx):
     help_text = """
@@ -210,7 +206,7 @@ I automatically detect whether you're sharing a resume or portfolio and provide
 **How to use:**
 📄 **Resume**: Upload a PDF - I'll evaluate it against entry-level UX job requirements
 🎨 **Portfolio URL**: Share a link - I'll screenshot it and analyze the visual design & UX process
-📁 **Portfolio PDF**: Upload a PDF - I'll analyze the content and structure
+📁 **Portfolio PDF**: Upload a PDF - I'll analyze the content and structure (image-based PDFs exported from Figma/InDesign are rendered and reviewed visually)
 
 **What I look for in Resumes:**
 - Relevant UX skills and tools (Figma, research methods, etc.)
@@ -229,18 +225,32 @@ I automatically detect whether you're sharing a resume or portfolio and provide
 
 **Tips for best results:**
 ✓ Resumes: Export as text-based PDF (not just images)
-✓ Portfolio PDFs: Include readable text with case studies
+✓ Portfolio PDFs: Text-based or image-based exports both work; readable case study text gives the deepest feedback
 ✓ Portfolio URLs: Share your live portfolio website
 ✓ Include 2-4 strong projects rather than many shallow ones
 
 **Commands:**
 - `!ping` - Check if bot is online
 - `!guide` - Show this message
+- `!metrics` - Show memory use and review concurrency
+- `!history [count]` - List your recent reviews (`!history search <words>` searches them)
+- `!review <number>` - Show one of your earlier reviews again
 
 **Note**: I'm designed to help UX/design students entering a competitive, AI-affected job market. Feedback is supportive but honest!
 """
     await ctx.send(help_text)
 
 
+async def main():
+    """Connect to the gateway, then shut down the shared browser on exit."""
+    discord.utils.setup_logging()
+    try:
+        async with bot:
+            await bot.start(TOKEN)
+    finally:
+        await runtime.close()
+
+
 # Run bot
-bot.run(TOKEN)
+if __name__ == '__main__':
+    asyncio.run(main())
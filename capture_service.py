@@ -0,0 +1,295 @@
+"""
+Shared capture service: one warm pool of Chromium browsers for every process on a node.
+
+Without it, each bot and worker process launches its own Chromium, so
+browser memory grows with the number of processes and a browser crash
+happens inside the bot. This service owns a pool of browsers
+(CAPTURE_SERVICE_BROWSERS, each running up to CAPTURE_SERVICE_PAGES captures
+at once) and exposes ScreenshotService's capture methods over a small local
+HTTP API. Processes started with CAPTURE_SERVICE_URL send their captures
+here instead of launching Chromium:
+
+- POST /capture/{method} with the method's arguments as JSON runs
+  capture_page, capture_views, get_page_text or capture_screenshot on the
+  least busy browser; requests wait for a free slot when the pool is full
+- GET /health reports pool capacity, active and waiting captures and
+  per-browser counters
+- a browser that crashes is relaunched on the next capture, and each
+  browser is recycled after CAPTURE_SERVICE_RECYCLE_AFTER captures
+
+Usage:
+    python capture_service.py --browsers 2 --port 8765
+    CAPTURE_SERVICE_URL=http://127.0.0.1:8765 python worker.py
+"""
+import argparse
+import asyncio
+import ipaddress
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional
+from aiohttp import web
+from dotenv import load_dotenv
+
+# Before the project imports, which read their settings at import time
+load_dotenv()
+
+from utils.screenshot_service import ScreenshotService  # noqa: E402
+
+CAPTURE_SERVICE_HOST = os.getenv('CAPTURE_SERVICE_HOST', '127.0.0.1')
+CAPTURE_SERVICE_PORT = int(os.getenv('CAPTURE_SERVICE_PORT', '8765'))
+# Browsers in the pool and captures each runs at once
+CAPTURE_SERVICE_BROWSERS = int(os.getenv('CAPTURE_SERVICE_BROWSERS', '2'))
+CAPTURE_SERVICE_PAGES = int(os.getenv('CAPTURE_SERVICE_PAGES', '3'))
+# Captures after which a browser is restarted to give its memory back
+CAPTURE_SERVICE_RECYCLE_AFTER = int(os.getenv('CAPTURE_SERVICE_RECYCLE_AFTER', '200'))
+# Hard limit on one capture, in case a browser hangs
+MAX_CAPTURE_SECONDS = 180.0
+
+RPC_METHODS = ('capture_page', 'capture_views', 'get_page_text', 'capture_screenshot')
+# Arguments that would make the service touch its own disk or cannot cross the API
+BLOCKED_ARGUMENTS = ('output_path', 'asset_cache')
+
+
+class BrowserPool:
+    """Warm browsers shared by all clients, each running a bounded number of captures."""
+
+    def __init__(
+        self,
+        browsers: int = CAPTURE_SERVICE_BROWSERS,
+        pages_per_browser: int = CAPTURE_SERVICE_PAGES,
+        recycle_after: int = CAPTURE_SERVICE_RECYCLE_AFTER,
+        factory: Optional[Callable[[], Any]] = None
+    ):
+        """
+        Initialize browser pool.
+
+        Args:
+            browsers: Browsers in the pool
+            pages_per_browser: Captures one browser runs at once
+            recycle_after: Captures after which a browser is restarted
+            factory: Builds one browser (default: a local ScreenshotService)
+        """
+        self.pages_per_browser = pages_per_browser
+        self.recycle_after = recycle_after
+        self.factory = factory or (lambda: ScreenshotService(service_url=''))
+        self.capacity = browsers * pages_per_browser
+        self._slots = asyncio.Semaphore(self.capacity)
+        self.browsers: List[Dict[str, Any]] = [
+            {
+                'index': index, 'service': None, 'active': 0, 'captures': 0, 'failures': 0,
+                'crashes': 0, 'recycles': 0, 'retiring': False, 'lock': asyncio.Lock(),
+            }
+            for index in range(browsers)
+        ]
+        self.waiting = 0
+        self.completed = 0
+        self.started_at = time.monotonic()
+
+    async def start(self):
+        """Launch and warm every browser, so the first captures are fast."""
+        results = await asyncio.gather(*(self._warm(entry) for entry in self.browsers), return_exceptions=True)
+        for entry, result in zip(self.browsers, results):
+            if isinstance(result, Exception):
+                print(f"Warning: Browser {entry['index']} failed to start: {result}")
+
+    async def _warm(self, entry: Dict[str, Any]):
+        service = await self._service(entry)
+        await service.warm_up()
+
+    async def _service(self, entry: Dict[str, Any]):
+        """The entry's browser, launched if it is not running."""
+        async with entry['lock']:
+            if entry['service'] is None:
+                service = self.factory()
+                await service.start()
+                entry['service'] = service
+                entry['captures'] = 0
+                entry['retiring'] = False
+            return entry['service']
+
+    @staticmethod
+    def _connected(service) -> bool:
+        browser = getattr(service, 'browser', None)
+        return browser is not None and browser.is_connected()
+
+    async def _discard(self, entry: Dict[str, Any], service):
+        """Close a crashed or retired browser; the next capture on the entry launches a new one."""
+        if entry['service'] is service:
+            entry['service'] = None
+        try:
+            await service.close()
+        except Exception as e:
+            print(f"Warning: Closing browser {entry['index']} failed: {e}")
+
+    def _pick(self) -> Dict[str, Any]:
+        """Least busy browser with a free page, preferring ones not about to be recycled."""
+        free = [entry for entry in self.browsers if entry['active'] < self.pages_per_browser]
+        preferred = [entry for entry in free if not entry['retiring']] or free
+        return min(preferred, key=lambda entry: entry['active'])
+
+    async def run(self, method: str, **kwargs) -> Any:
+        """
+        Run a ScreenshotService method on a pool browser.
+
+        Args:
+            method: One of RPC_METHODS
+            **kwargs: Arguments of the method
+
+        Returns:
+            The method's result
+
+        Raises:
+            Exception: Whatever the capture raised (a crashed browser is replaced)
+        """
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+
+        entry = self._pick()
+        entry['active'] += 1
+        service = None
+        try:
+            service = await self._service(entry)
+            timeout = kwargs.get('timeout', 30.0) + kwargs.get('grace', 0.0)
+            return await asyncio.wait_for(
+                getattr(service, method)(**kwargs), timeout=min(timeout + 60.0, MAX_CAPTURE_SECONDS)
+            )
+        except Exception:
+            entry['failures'] += 1
+            if service is not None and not self._connected(service):
+                entry['crashes'] += 1
+                print(f"Browser {entry['index']} disconnected; relaunching on the next capture")
+                await self._discard(entry, service)
+            raise
+        finally:
+            entry['active'] -= 1
+            entry['captures'] += 1
+            self.completed += 1
+            if entry['captures'] >= self.recycle_after and entry['service'] is not None:
+                entry['retiring'] = True
+                if entry['active'] == 0:
+                    entry['recycles'] += 1
+                    await self._discard(entry, entry['service'])
+            self._slots.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool capacity, load and per-browser counters."""
+        return {
+            'capacity': self.capacity,
+            'active': sum(entry['active'] for entry in self.browsers),
+            'waiting': self.waiting,
+            'completed': self.completed,
+            'uptime_seconds': round(time.monotonic() - self.started_at),
+            'browsers': [
+                {
+                    key: entry[key] for key in ('index', 'active', 'captures', 'failures', 'crashes', 'recycles')
+                } | {'running': entry['service'] is not None}
+                for entry in self.browsers
+            ],
+        }
+
+    async def close(self):
+        """Close every browser."""
+        for entry in self.browsers:
+            if entry['service'] is not None:
+                await self._discard(entry, entry['service'])
+
+
+def create_app(pool: BrowserPool, token: str) -> web.Application:
+    """
+    Build the HTTP API of a pool.
+
+    Args:
+        pool: Browser pool serving the captures
+        token: Shared secret clients send as a Bearer token ('' accepts any client)
+
+    Returns:
+        aiohttp application
+    """
+
+    def authorized(request: web.Request) -> bool:
+        return not token or request.headers.get('Authorization') == f"Bearer {token}"
+
+    async def health(request: web.Request) -> web.Response:
+        if not authorized(request):
+            return web.json_response({'error': 'Unauthorized'}, status=401)
+        return web.json_response(pool.stats())
+
+    async def capture(request: web.Request) -> web.Response:
+        if not authorized(request):
+            return web.json_response({'error': 'Unauthorized'}, status=401)
+        method = request.match_info['method']
+        if method not in RPC_METHODS:
+            return web.json_response({'error': f"Unknown method: {method}"}, status=404)
+        try:
+            kwargs = await request.json()
+        except ValueError:
+            return web.json_response({'error': 'Body must be a JSON object'}, status=400)
+        if not isinstance(kwargs, dict) or any(key in kwargs for key in BLOCKED_ARGUMENTS):
+            return web.json_response({'error': 'Invalid arguments'}, status=400)
+
+        start = time.monotonic()
+        try:
+            result = await pool.run(method, **kwargs)
+        except (TypeError, ValueError) as e:
+            return web.json_response({'error': str(e)}, status=400)
+        except asyncio.TimeoutError:
+            return web.json_response({'error': f"Capture of {kwargs.get('url')} timed out"}, status=504)
+        except Exception as e:
+            return web.json_response({'error': str(e)}, status=502)
+        print(f"{method} {kwargs.get('url')} in {time.monotonic() - start:.1f}s")
+        return web.json_response({'result': ScreenshotService.encode(result)})
+
+    app = web.Application(client_max_size=1024 * 1024)
+    app.router.add_get('/health', health)
+    app.router.add_post('/capture/{method}', capture)
+    return app
+
+
+def is_loopback(host: str) -> bool:
+    """Whether a bind address only accepts connections from this machine."""
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+async def serve(host: str, port: int, browsers: int, pages: int, token: str):
+    """Start the pool and serve the API until cancelled."""
+    pool = BrowserPool(browsers, pages)
+    await pool.start()
+    # A client that gives up (deadline exceeded) cancels its capture here too
+    runner = web.AppRunner(create_app(pool, token), handler_cancellation=True)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    print(f"Capture service on http://{host}:{port}: {browsers} browsers x {pages} pages")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+        await pool.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the shared capture service.')
+    parser.add_argument('--host', default=CAPTURE_SERVICE_HOST)
+    parser.add_argument('--port', type=int, default=CAPTURE_SERVICE_PORT)
+    parser.add_argument('--browsers', type=int, default=CAPTURE_SERVICE_BROWSERS, help='Browsers in the pool')
+    parser.add_argument('--pages', type=int, default=CAPTURE_SERVICE_PAGES, help='Captures per browser at once')
+    args = parser.parse_args()
+    token = os.getenv('CAPTURE_SERVICE_TOKEN', '')
+    if not token and not is_loopback(args.host):
+        # Without a token anyone reaching the port could drive the browsers to arbitrary URLs
+        parser.error(f"Set CAPTURE_SERVICE_TOKEN to listen on {args.host}; without it only loopback hosts are allowed")
+    try:
+        asyncio.run(serve(args.host, args.port, args.browsers, args.pages, token))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
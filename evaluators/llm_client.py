@@ -0,0 +1,198 @@
+"""
+Async Claude client with deadlines, hedged requests and a fallback model.
+
+A request that is still running when its latency passes the recent p99 is
+hedged with an identical second request, and whichever answers first wins.
+If the main model errors or cannot answer within the stage budget (minus a
+reserve), a shorter answer is requested from a faster fallback model so the
+user still gets a review in time.
+"""
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple, Union
+import anthropic
+from utils.deadline import Deadline, DeadlineExceeded
+from utils.trace_recorder import current_trace, sha256
+
+# Message content: a prompt string or a list of content blocks
+Content = Union[str, List[Dict[str, Any]]]
+
+CONCISE_NOTE = "Keep this review concise: the most important points only, under 350 words."
+
+
+class LLMClient:
+    """Sends prompts to Claude within a deadline, hedging slow requests."""
+
+    def __init__(
+        self,
+        api_key: str,
+        model: str,
+        fallback_model: Optional[str] = None,
+        hedge_quantile: float = 0.99,
+        min_samples: int = 20
+    ):
+        """
+        Initialize client.
+
+        Args:
+            api_key: Anthropic API key
+            model: Main Claude model
+            fallback_model: Faster model used when the main one is slow or failing
+                (default: LLM_FALLBACK_MODEL env)
+            hedge_quantile: Latency quantile after which a request is hedged
+            min_samples: Latencies needed before the quantile is trusted; until
+                then requests are hedged after LLM_HEDGE_AFTER seconds
+        """
+        self.client = anthropic.AsyncAnthropic(api_key=api_key)
+        self.model = model
+        self.fallback_model = fallback_model or os.getenv('LLM_FALLBACK_MODEL', 'claude-3-5-haiku-20241022')
+        self.hedge_quantile = hedge_quantile
+        self.min_samples = min_samples
+        self.default_hedge_after = float(os.getenv('LLM_HEDGE_AFTER', '40'))
+        self.fallback_reserve = float(os.getenv('LLM_FALLBACK_RESERVE', '25'))
+        self.latencies = deque(maxlen=200)
+        # Optional async context manager bounding concurrent requests (see utils.resource_controller)
+        self.limiter = None
+
+    def hedge_delay(self) -> float:
+        """Seconds after which a request gets a hedged duplicate."""
+        if len(self.latencies) < self.min_samples:
+            return self.default_hedge_after
+        ordered = sorted(self.latencies)
+        return ordered[int(self.hedge_quantile * (len(ordered) - 1))]
+
+    @staticmethod
+    def fingerprint(content: Content) -> Tuple[str, int]:
+        """
+        Identify a prompt for traces and replay.
+
+        Returns:
+            Tuple of (SHA-256 of the content, number of image blocks)
+        """
+        if isinstance(content, str):
+            return sha256(content), 0
+        images = sum(1 for block in content if block.get('type') == 'image')
+        return sha256(json.dumps(content, sort_keys=True)), images
+
+    async def _request(self, model: str, content: Content, max_tokens: int) -> str:
+        if self.limiter is None:
+            return await self._traced(model, content, max_tokens)
+        async with self.limiter:
+            return await self._traced(model, content, max_tokens)
+
+    async def _traced(self, model: str, content: Content, max_tokens: int) -> str:
+        """Send a request and add its metadata to the job's trace, if one is recording."""
+        start = time.monotonic()
+        text, usage, stop_reason = await self._send(model, content, max_tokens)
+        trace = current_trace.get()
+        if trace is not None:
+            prompt_sha256, images = self.fingerprint(content)
+            trace.record_llm(
+                model, prompt_sha256, images, max_tokens, time.monotonic() - start, text, usage, stop_reason
+            )
+        return text
+
+    async def _send(self, model: str, content: Content, max_tokens: int) -> Tuple[str, Dict[str, Any], Optional[str]]:
+        """
+        Call the Messages API.
+
+        Returns:
+            Tuple of (response text, token usage, stop reason)
+        """
+        message = await self.client.messages.create(
+            model=model,
+            max_tokens=max_tokens,
+            messages=[
+                {
+                    "role": "user",
+                    "content": content
+                }
+            ]
+        )
+        usage = {
+            'input_tokens': message.usage.input_tokens,
+            'output_tokens': message.usage.output_tokens,
+        }
+        return message.content[0].text, usage, message.stop_reason
+
+    async def _hedged(self, content: Content, max_tokens: int) -> Tuple[str, bool]:
+        """
+        Request from the main model, adding a duplicate request once the first is slow.
+
+        Returns:
+            Tuple of (text, whether a hedge was sent)
+        """
+        start = time.monotonic()
+        pending = {asyncio.create_task(self._request(self.model, content, max_tokens))}
+        hedged = False
+        errors = []
+        try:
+            while pending:
+                timeout = None if hedged else max(self.hedge_delay() - (time.monotonic() - start), 0.0)
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        self.latencies.append(time.monotonic() - start)
+                        return task.result(), hedged
+                    errors.append(task.exception())
+                if not done and not hedged:
+                    hedged = True
+                    pending.add(asyncio.create_task(self._request(self.model, content, max_tokens)))
+            raise errors[0]
+        finally:
+            for task in pending:
+                task.cancel()
+
+    @staticmethod
+    def _concise(content: Content) -> Content:
+        """Append the request for a shorter answer to a prompt."""
+        if isinstance(content, str):
+            return f"{content}\n\n{CONCISE_NOTE}"
+        return content + [{"type": "text", "text": CONCISE_NOTE}]
+
+    async def complete(
+        self,
+        content: Content,
+        max_tokens: int,
+        deadline: Optional[Deadline] = None,
+        stage: str = 'evaluate'
+    ) -> str:
+        """
+        Get a response within the stage budget of a deadline.
+
+        Args:
+            content: Prompt string or content blocks
+            max_tokens: Maximum tokens for response
+            deadline: Job deadline (a fresh default deadline if omitted)
+            stage: Stage name used for the budget and the timing record
+
+        Returns:
+            Response text
+
+        Raises:
+            Exception: If both the main and the fallback model fail
+        """
+        deadline = deadline or Deadline()
+        budget = deadline.budget(stage)
+        # Keep time back for the fallback model, unless the budget is already tight
+        primary_budget = budget - self.fallback_reserve if budget > 2 * self.fallback_reserve else budget * 0.6
+        start = time.monotonic()
+
+        try:
+            text, hedged = await deadline.run(stage, self._hedged(content, max_tokens), budget=primary_budget)
+            if hedged:
+                deadline.fallback('hedged request')
+            return text
+        except (DeadlineExceeded, anthropic.APIError) as e:
+            reason = 'slow' if isinstance(e, DeadlineExceeded) else 'error'
+            print(f"Warning: {self.model} {reason} ({e}), falling back to {self.fallback_model}")
+            deadline.fallback(f"{self.model} {reason} -> {self.fallback_model}")
+
+        return await deadline.run(
+            f"{stage}_fallback",
+            self._request(self.fallback_model, self._concise(content), min(max_tokens, 900)),
+            budget=budget - (time.monotonic() - start)
+        )
@@ -1,11 +1,18 @@
 """
 Portfolio evaluation using Claude Vision API for visual analysis.
 """
-import anthropic
+import asyncio
 import base64
-from typing import List, Optional, Union
+import time
+from typing import Any, Dict, List, Optional, Tuple, Union
 from pathlib import Path
 from prompts.portfolio_prompts import PORTFOLIO_PROMPTS
+from utils.deadline import Deadline
+from utils.image_dedup import ImageDeduplicator
+from .llm_client import LLMClient
+
+# An image given as a file path or as encoded bytes (PNG/JPEG/GIF/WebP)
+ImageSource = Union[str, bytes]
 
 
 class PortfolioEvaluator:
@@ -19,22 +26,37 @@ class PortfolioEvaluator:
             api_key: Anthropic API key
             model: Claude model to use
         """
-        self.client = anthropic.Anthropic(api_key=api_key)
+        self.client = LLMClient(api_key, model)
         self.model = model
+        self.deduplicator = ImageDeduplicator()
 
     @staticmethod
-    def encode_image(image_path: str) -> tuple[str, str]:
+    def encode_image(image: ImageSource) -> tuple[str, str]:
         """
         Encode image to base64 and detect media type.
 
         Args:
-            image_path: Path to image file
+            image: Path to image file or encoded image bytes
 
         Returns:
             Tuple of (media_type, base64_data)
         """
+        if isinstance(image, (bytes, bytearray)):
+            # Detect media type from magic bytes
+            if image[:8] == b'\x89PNG\r\n\x1a\n':
+                media_type = 'image/png'
+            elif image[:3] == b'\xff\xd8\xff':
+                media_type = 'image/jpeg'
+            elif image[:6] in (b'GIF87a', b'GIF89a'):
+                media_type = 'image/gif'
+            elif image[:4] == b'RIFF' and image[8:12] == b'WEBP':
+                media_type = 'image/webp'
+            else:
+                media_type = 'image/png'
+            return media_type, base64.b64encode(image).decode('utf-8')
+
         # Detect media type from extension
-        extension = Path(image_path).suffix.lower()
+        extension = Path(image).suffix.lower()
         media_types = {
             '.png': 'image/png',
             '.jpg': 'image/jpeg',
@@ -45,73 +67,153 @@ class PortfolioEvaluator:
         media_type = media_types.get(extension, 'image/png')
 
         # Read and encode image
-        with open(image_path, 'rb') as image_file:
+        with open(image, 'rb') as image_file:
             image_data = base64.b64encode(image_file.read()).decode('utf-8')
 
         return media_type, image_data
 
+    def _prepare_images(self, images: List[ImageSource], max_images: int) -> Tuple[List[Tuple[str, str]], Dict[str, Any]]:
+        """
+        Deduplicate tiles and base64-encode them (blocking; run off the event loop).
+
+        Falls back to encoding the originals if deduplication fails.
+        """
+        try:
+            tiles, report = self.deduplicator.deduplicate(images, max_images)
+        except Exception as e:
+            print(f"Warning: Image deduplication failed, sending originals: {e}")
+            encoded = []
+            for image in images[:max_images]:
+                try:
+                    encoded.append(self.encode_image(image))
+                except Exception as encode_error:
+                    print(f"Warning: Failed to encode image: {encode_error}")
+            return encoded, {}
+
+        # Base64 happens exactly once per tile; the raw tile is dropped right after
+        encoded = []
+        base64_bytes = 0
+        while tiles:
+            data = base64.b64encode(tiles.pop(0)).decode('ascii')
+            base64_bytes += len(data)
+            encoded.append(('image/jpeg', data))
+        report['base64_bytes'] = base64_bytes
+        report['peak_bytes'] = max(report['peak_bytes'], report['bytes_after'] + base64_bytes)
+        return encoded, report
+
+    def _prepare_content(
+        self,
+        images: List[ImageSource],
+        max_images: int,
+        labelled: List[Tuple[str, ImageSource]]
+    ) -> Tuple[List[Tuple[str, str]], Dict[str, Any], List[Tuple[str, str, str]]]:
+        """
+        Prepare the tiles and encode the labelled images (blocking; run off the event loop).
+
+        Returns:
+            Tuple of (encoded tiles, dedup report, (label, media type, data) per labelled image)
+        """
+        encoded, report = self._prepare_images(images, max_images)
+        encoded_labelled = []
+        for label, image in labelled:
+            try:
+                encoded_labelled.append((label, *self.encode_image(image)))
+            except Exception as e:
+                print(f"Warning: Failed to encode image ({label}): {e}")
+        return encoded, report, encoded_labelled
+
+    async def build_image_content(
+        self,
+        images: List[ImageSource],
+        max_images: int,
+        labelled: Optional[List[Tuple[str, ImageSource]]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Tile images, drop blank and near-duplicate tiles, and build image content blocks.
+
+        Args:
+            images: Image file paths or encoded image bytes
+            max_images: Maximum number of image blocks
+            labelled: Optional (label, image) pairs added after the tiles as
+                they are, without tiling, each preceded by its label
+
+        Returns:
+            List of content blocks: base64 images, and labels for labelled images
+        """
+        encoded, report, encoded_labelled = await asyncio.to_thread(
+            self._prepare_content, images, max_images, labelled or []
+        )
+
+        if report:
+            print(
+                f"Image dedup: kept {report['tiles_kept']}/{report['tiles_total']} tiles "
+                f"({report['blank_dropped']} blank, {report['duplicates_dropped']} duplicate, "
+                f"{report['capped']} over the {max_images}-image cap), "
+                f"~{report['tokens_before'] - report['tokens_after']} tokens saved, "
+                f"{report['bytes_before']} -> {report['bytes_after']} bytes, "
+                f"peak ~{report['peak_bytes'] / 1e6:.1f} MB"
+            )
+
+        content = [
+            {
+                "type": "image",
+                "source": {
+                    "type": "base64",
+                    "media_type": media_type,
+                    "data": data
+                }
+            }
+            for media_type, data in encoded
+        ]
+        for label, media_type, data in encoded_labelled:
+            content.append({"type": "text", "text": label})
+            content.append({"type": "image", "source": {"type": "base64", "media_type": media_type, "data": data}})
+        return content
+
     async def evaluate_visual(
         self,
-        image_paths: Union[str, List[str]],
+        images: Union[ImageSource, List[ImageSource]],
         prompt_type: str = 'ux_visual',
-        max_tokens: int = 2000
+        max_tokens: int = 2000,
+        capture_note: Optional[str] = None,
+        deadline: Optional[Deadline] = None
     ) -> str:
         """
         Evaluate portfolio from images using vision API.
 
         Args:
-            image_paths: Single image path or list of image paths
+            images: Single image or list of images (file paths or bytes)
             prompt_type: Type of evaluation prompt
             max_tokens: Maximum tokens for response
+            capture_note: Optional note about how the images were captured
+                (e.g. that a long page was truncated)
+            deadline: Job deadline bounding the model call (see utils.deadline)
 
         Returns:
             Evaluation feedback text
         """
-        # Ensure image_paths is a list
-        if isinstance(image_paths, str):
-            image_paths = [image_paths]
+        # Ensure images is a list
+        if isinstance(images, (str, bytes, bytearray)):
+            images = [images]
 
         # Get prompt template
         prompt_template = PORTFOLIO_PROMPTS.get(prompt_type, PORTFOLIO_PROMPTS['general_visual'])
 
-        # Build message content with images
-        content = []
-
-        # Add all images
-        for image_path in image_paths[:10]:  # Limit to 10 images
-            try:
-                media_type, image_data = self.encode_image(image_path)
-                content.append({
-                    "type": "image",
-                    "source": {
-                        "type": "base64",
-                        "media_type": media_type,
-                        "data": image_data
-                    }
-                })
-            except Exception as e:
-                print(f"Warning: Failed to encode image {image_path}: {e}")
+        # Build message content with distinct image tiles
+        content = await self.build_image_content(images, max_images=10)  # Limit to 10 images
 
         # Add text prompt after images
+        prompt = prompt_template
+        if capture_note:
+            prompt += f"\n\nCapture note: {capture_note}"
         content.append({
             "type": "text",
-            "text": prompt_template
+            "text": prompt
         })
 
         try:
             # Call Claude API with vision
-            message = self.client.messages.create(
-                model=self.model,
-                max_tokens=max_tokens,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": content
-                    }
-                ]
-            )
-
-            return message.content[0].text
+            return await self.client.complete(content, max_tokens, deadline)
 
         except Exception as e:
             raise Exception(f"Error getting portfolio feedback: {str(e)}")
@@ -120,7 +222,8 @@ class PortfolioEvaluator:
         self,
         portfolio_text: str,
         prompt_type: str = 'ux_text',
-        max_tokens: int = 1500
+        max_tokens: int = 1500,
+        deadline: Optional[Deadline] = None
     ) -> str:
         """
         Evaluate portfolio from text content (for text-based portfolios).
@@ -129,6 +232,7 @@ class PortfolioEvaluator:
             portfolio_text: Extracted text from portfolio
             prompt_type: Type of evaluation prompt
             max_tokens: Maximum tokens for response
+            deadline: Job deadline bounding the model call (see utils.deadline)
 
         Returns:
             Evaluation feedback text
@@ -141,77 +245,309 @@ class PortfolioEvaluator:
 
         try:
             # Call Claude API
-            message = self.client.messages.create(
-                model=self.model,
-                max_tokens=max_tokens,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": formatted_prompt
-                    }
-                ]
+            return await self.client.complete(formatted_prompt, max_tokens, deadline)
+
+        except Exception as e:
+            raise Exception(f"Error getting portfolio feedback: {str(e)}")
+
+    async def evaluate_case_studies(
+        self,
+        intro: str,
+        case_studies: List[Dict[str, str]],
+        max_case_studies: int = 6,
+        max_chars: int = 8000,
+        max_tokens: int = 450,
+        reduce_max_tokens: int = 700,
+        deadline: Optional[Deadline] = None
+    ) -> str:
+        """
+        Review each case study in parallel with a short prompt, then combine the reviews.
+
+        The map calls run concurrently (bounded by the client's limiter), so
+        the wall-clock time is that of the slowest case study plus one short
+        reduce call that writes the overview from condensed notes.
+
+        Args:
+            intro: Portfolio text outside case studies (see TextSections.case_studies)
+            case_studies: List of {'title', 'text'} dicts
+            max_case_studies: Case studies reviewed individually; later ones are only listed
+            max_chars: Text sent per case study
+            max_tokens: Maximum tokens per case study review
+            reduce_max_tokens: Maximum tokens for the overview
+            deadline: Job deadline bounding the model calls (see utils.deadline)
+
+        Returns:
+            Overview followed by one section per case study
+
+        Raises:
+            Exception: If no case study could be reviewed
+        """
+        from utils.text_sections import TextSections
+
+        reviewed = case_studies[:max_case_studies]
+        start = time.monotonic()
+        reviews = await asyncio.gather(*(
+            self.client.complete(
+                PORTFOLIO_PROMPTS['case_study'].format(
+                    position=position,
+                    total=len(case_studies),
+                    title=study['title'],
+                    case_study_text=study['text'][:max_chars]
+                ),
+                max_tokens,
+                deadline,
+                stage='case_study'
+            )
+            for position, study in enumerate(reviewed, 1)
+        ), return_exceptions=True)
+        print(f"Case studies: {len(reviewed)} reviewed in parallel in {time.monotonic() - start:.1f}s")
+
+        sections, notes = [], []
+        for study, review in zip(reviewed, reviews):
+            if isinstance(review, Exception):
+                print(f"Warning: Case study '{study['title']}' could not be reviewed: {review}")
+                sections.append(f"### {study['title']}\n\n_This case study could not be reviewed this time._")
+                continue
+            sections.append(f"### {study['title']}\n\n{review.strip()}")
+            notes.append(f"## {study['title']}\n{TextSections.summarize_feedback(review, max_chars=700)}")
+        if not notes:
+            raise Exception(f"Error getting portfolio feedback: {reviews[0]}")
+        skipped = [study['title'] for study in case_studies[max_case_studies:]]
+        if skipped:
+            sections.append(
+                f"_Reviewed the first {max_case_studies} case studies individually; not covered: {', '.join(skipped)}._"
+            )
+
+        try:
+            overview = await self.client.complete(
+                PORTFOLIO_PROMPTS['case_study_reduce'].format(
+                    intro=intro[:2000] or '(none)',
+                    reviews='\n\n'.join(notes)
+                ),
+                reduce_max_tokens,
+                deadline,
+                stage='reduce'
             )
+        except Exception as e:
+            # The per-case-study reviews stand on their own
+            print(f"Warning: Portfolio overview failed, sending case study reviews only: {e}")
+            if deadline is not None:
+                deadline.fallback('reduce -> case studies only')
+            overview = f"Your portfolio has {len(case_studies)} case studies; here is feedback on each."
 
-            return message.content[0].text
+        return overview.strip() + "\n\n## Case Studies\n\n" + '\n\n'.join(sections)
+
+    async def evaluate_revision(
+        self,
+        changes: str,
+        previous_feedback: str,
+        prompt_type: str = 'revision',
+        max_tokens: int = 800,
+        deadline: Optional[Deadline] = None
+    ) -> str:
+        """
+        Review only what changed since an earlier, already reviewed version.
+
+        Args:
+            changes: Formatted section diff (see TextSections.format_changes)
+            previous_feedback: Summary of the earlier feedback
+            prompt_type: 'revision', or 'adapt' to rewrite the review of a near-duplicate
+            max_tokens: Maximum tokens for response
+            deadline: Job deadline bounding the model call (see utils.deadline)
+
+        Returns:
+            Follow-up feedback text
+        """
+        formatted_prompt = PORTFOLIO_PROMPTS[prompt_type].format(
+            previous_feedback=previous_feedback,
+            changes=changes
+        )
+
+        try:
+            return await self.client.complete(formatted_prompt, max_tokens, deadline)
 
         except Exception as e:
-            raise Exception(f"Error getting portfolio feedback: {str(e)}")
+            raise Exception(f"Error getting portfolio revision feedback: {str(e)}")
+
+    @staticmethod
+    def format_page_structure(
+        headings: Optional[List[Tuple[int, str]]] = None,
+        image_alts: Optional[List[Optional[str]]] = None
+    ) -> str:
+        """
+        Format a page's heading outline and image alt texts for the prompt.
+
+        Args:
+            headings: List of (level, text) tuples in document order
+            image_alts: Alt text per image, None where the attribute is missing
+
+        Returns:
+            Compact structure section (empty string if nothing to report)
+        """
+        lines = []
+        if headings:
+            lines.append("Heading outline:")
+            for level, text in headings[:60]:
+                lines.append(f"{'  ' * (level - 1)}- H{level}: {text[:120]}")
+        if image_alts:
+            missing = sum(1 for alt in image_alts if not alt)
+            lines.append(f"Images: {len(image_alts)} ({missing} without alt text)")
+            described = [alt[:100] for alt in image_alts if alt]
+            if described:
+                lines.append("Alt texts: " + "; ".join(described[:40]))
+        if not lines:
+            return ''
+        return (
+            "\nPage structure (measured from the live page; use it to judge headings and alt text):\n"
+            + "\n".join(lines) + "\n"
+        )
+
+    @staticmethod
+    def format_page_metrics(
+        metrics: Optional[Dict[str, Any]] = None,
+        viewports: Optional[Dict[str, Dict[str, Any]]] = None
+    ) -> str:
+        """
+        Format the measured page metrics (ScreenshotService PAGE_METRICS_SCRIPT) for the prompt.
+
+        Args:
+            metrics: Metrics of the desktop page
+            viewports: Optional extra device views, whose tap target metrics are added
+
+        Returns:
+            Compact metrics section (empty string if nothing was measured)
+        """
+        if not metrics:
+            return ''
+
+        def quoted(text: str) -> str:
+            return f'"{text}"' if text else '(no text)'
+
+        lines = []
+        headings = metrics.get('headings') or {}
+        if headings:
+            lines.append(
+                f"- Headings: {headings['total']} ({headings['h1']} H1, {headings['skipped']} skipped level(s))"
+            )
+        images = metrics.get('images') or {}
+        if images.get('decorative'):
+            lines.append(f"- Images marked decorative (empty alt): {images['decorative']}")
+        contrast = metrics.get('contrast') or {}
+        if contrast.get('checked'):
+            line = f"- Text contrast: {contrast['failures']} of {contrast['checked']} text elements below WCAG AA"
+            worst = [
+                f"{quoted(item['text'])} {item['ratio']}:1 ({item['fg']} on {item['bg']}, {item['size']}px)"
+                for item in contrast.get('worst', [])
+            ]
+            if worst:
+                line += "; worst: " + ", ".join(worst)
+            lines.append(line)
+
+        targets = [('desktop', metrics.get('tap_targets'))] + [
+            (f"{name}, {view['width']}px", view.get('tap_targets')) for name, view in (viewports or {}).items()
+        ]
+        for label, tap in targets:
+            if not tap or not tap.get('total'):
+                continue
+            line = (
+                f"- Tap targets ({label}): {tap['under_44']} of {tap['total']} under 44x44px, "
+                f"{tap['under_24']} under 24x24px"
+            )
+            smallest = [f"{quoted(item['text'])} {item['width']}x{item['height']}" for item in tap.get('smallest', [])]
+            if smallest:
+                line += "; smallest: " + ", ".join(smallest)
+            lines.append(line)
+
+        text = metrics.get('text') or {}
+        if text.get('words'):
+            lines.append(
+                f"- Text: {text['words']} words, about {text['words_per_screen']} per screen; "
+                f"{text['paragraphs']} paragraphs ({text['long_paragraphs']} over 120 words); "
+                f"{round(100 * text['small_text_share'])}% of words under 14px"
+            )
+        links = metrics.get('links') or {}
+        if links.get('total'):
+            lines.append(
+                f"- Links: {links['total']} ({links['internal']} internal, {links['external']} external, "
+                f"{links['mailto']} email, {links['placeholder']} placeholder); "
+                f"{links['vague']} with vague text such as \"read more\", {links['unnamed']} without an accessible name"
+            )
+        page = metrics.get('page') or {}
+        if page:
+            lines.append(
+                f"- Page: lang {quoted(page['lang'] or '') if page['lang'] else 'missing'}, "
+                f"viewport meta {'present' if page['viewport_meta'] else 'missing'}, "
+                f"{page['unlabeled_fields']} form field(s) without a label"
+            )
+        if not lines:
+            return ''
+        return (
+            "\nMeasured page metrics (computed from the DOM, so exact; use them instead of estimating "
+            "contrast, tap targets, alt text or text density from the images):\n"
+            + "\n".join(lines) + "\n"
+        )
 
     async def evaluate_hybrid(
         self,
         portfolio_text: str,
-        image_paths: Optional[List[str]] = None,
-        max_tokens: int = 2000
+        images: Optional[List[ImageSource]] = None,
+        max_tokens: int = 2000,
+        prompt_type: str = 'ux_hybrid',
+        headings: Optional[List[Tuple[int, str]]] = None,
+        image_alts: Optional[List[Optional[str]]] = None,
+        capture_note: Optional[str] = None,
+        deadline: Optional[Deadline] = None,
+        viewports: Optional[Dict[str, Dict[str, Any]]] = None,
+        page_metrics: Optional[Dict[str, Any]] = None
     ) -> str:
         """
         Evaluate portfolio using both text and images.
 
         Args:
             portfolio_text: Extracted text from portfolio
-            image_paths: Optional list of image paths
+            images: Optional list of images (file paths or bytes)
             max_tokens: Maximum tokens for response
+            prompt_type: Type of evaluation prompt
+            headings: Optional heading outline of a web portfolio
+            image_alts: Optional image alt texts of a web portfolio
+            capture_note: Optional note about how the images were captured
+            deadline: Job deadline bounding the model call (see utils.deadline)
+            viewports: Optional extra device views of a web portfolio
+                (ScreenshotService.capture_views), shown after the desktop images
+            page_metrics: Optional measured metrics of a web portfolio
+                (ScreenshotService.capture_page 'metrics')
 
         Returns:
             Evaluation feedback text
         """
-        if not image_paths:
+        if not images:
             # No images, use text-only evaluation
-            return await self.evaluate_text(portfolio_text)
-
-        # Build hybrid content
-        content = []
+            return await self.evaluate_text(portfolio_text, deadline=deadline)
 
-        # Add images first
-        for image_path in image_paths[:5]:  # Limit to 5 for hybrid
-            try:
-                media_type, image_data = self.encode_image(image_path)
-                content.append({
-                    "type": "image",
-                    "source": {
-                        "type": "base64",
-                        "media_type": media_type,
-                        "data": image_data
-                    }
-                })
-            except Exception as e:
-                print(f"Warning: Failed to encode image {image_path}: {e}")
+        # Build hybrid content, images first; device views are already composed
+        # into one compact image each, so they skip tiling
+        views = [
+            (f"{name.title()} view ({view['width']}px wide, first {view['screens']} screen(s) side by side):", view['image'])
+            for name, view in (viewports or {}).items()
+        ]
+        # Limit to 5 for hybrid; measured metrics cover what the last one was mostly needed for
+        content = await self.build_image_content(images, max_images=4 if page_metrics else 5, labelled=views)
 
         # Add text analysis prompt
-        prompt = f"""You are a UX hiring manager reviewing a portfolio. You have both visual and text content to analyze.
-
-Visual content is shown in the images above.
-
-Text content from the portfolio:
-{portfolio_text[:10000]}
-
-Provide comprehensive feedback considering both the visual presentation and the written case study content. Focus on:
-1. Visual presentation quality and professionalism
-2. Case study structure and clarity
-3. Evidence of UX process and user-centered design
-4. Measurable outcomes and impact
-5. Areas of strength and opportunities for improvement
-
-Format: Clear sections with bullet points, 500-700 words."""
+        prompt_template = PORTFOLIO_PROMPTS.get(prompt_type, PORTFOLIO_PROMPTS['ux_hybrid'])
+        page_structure = self.format_page_structure(headings, image_alts)
+        page_structure += self.format_page_metrics(page_metrics, viewports)
+        if capture_note:
+            page_structure += f"\nCapture note: {capture_note}\n"
+        if viewports:
+            page_structure += (
+                f"\nThe first images show the desktop layout; the labelled {' and '.join(viewports)} views show the same "
+                "page on those devices. Judge responsiveness from them: reflow, readable text, tap targets, navigation.\n"
+            )
+        prompt = prompt_template.format(
+            portfolio_text=portfolio_text[:10000],
+            page_structure=page_structure
+        )
 
         content.append({
             "type": "text",
@@ -219,18 +555,7 @@ Format: Clear sections with bullet points, 500-700 words."""
         })
 
         try:
-            message = self.client.messages.create(
-                model=self.model,
-                max_tokens=max_tokens,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": content
-                    }
-                ]
-            )
-
-            return message.content[0].text
+            return await self.client.complete(content, max_tokens, deadline)
 
         except Exception as e:
             raise Exception(f"Error getting hybrid portfolio feedback: {str(e)}")
@@ -1,9 +1,10 @@
 """
 Resume evaluation using Claude API for text-based analysis.
 """
-import anthropic
 from typing import Dict, Optional
 from prompts.resume_prompts import RESUME_PROMPTS
+from utils.deadline import Deadline
+from .llm_client import LLMClient
 
 
 class ResumeEvaluator:
@@ -17,14 +18,15 @@ class ResumeEvaluator:
             api_key: Anthropic API key
             model: Claude model to use
         """
-        self.client = anthropic.Anthropic(api_key=api_key)
+        self.client = LLMClient(api_key, model)
         self.model = model
 
     async def evaluate(
         self,
         resume_text: str,
         prompt_type: str = 'entry_level_ux',
-        max_tokens: int = 1500
+        max_tokens: int = 1500,
+        deadline: Optional[Deadline] = None
     ) -> str:
         """
         Evaluate a resume and provide feedback.
@@ -33,6 +35,7 @@ class ResumeEvaluator:
             resume_text: Extracted text from resume
             prompt_type: Type of evaluation ('entry_level_ux' or 'general')
             max_tokens: Maximum tokens for response
+            deadline: Job deadline bounding the model call (see utils.deadline)
 
         Returns:
             Evaluation feedback text
@@ -45,22 +48,43 @@ class ResumeEvaluator:
 
         try:
             # Call Claude API
-            message = self.client.messages.create(
-                model=self.model,
-                max_tokens=max_tokens,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": formatted_prompt
-                    }
-                ]
-            )
-
-            return message.content[0].text
+            return await self.client.complete(formatted_prompt, max_tokens, deadline)
 
         except Exception as e:
             raise Exception(f"Error getting resume feedback: {str(e)}")
 
+    async def evaluate_revision(
+        self,
+        changes: str,
+        previous_feedback: str,
+        prompt_type: str = 'revision',
+        max_tokens: int = 800,
+        deadline: Optional[Deadline] = None
+    ) -> str:
+        """
+        Review only what changed since an earlier, already reviewed version.
+
+        Args:
+            changes: Formatted section diff (see TextSections.format_changes)
+            previous_feedback: Summary of the earlier feedback
+            prompt_type: 'revision', or 'adapt' to rewrite the review of a near-duplicate
+            max_tokens: Maximum tokens for response
+            deadline: Job deadline bounding the model call (see utils.deadline)
+
+        Returns:
+            Follow-up feedback text
+        """
+        formatted_prompt = RESUME_PROMPTS[prompt_type].format(
+            previous_feedback=previous_feedback,
+            changes=changes
+        )
+
+        try:
+            return await self.client.complete(formatted_prompt, max_tokens, deadline)
+
+        except Exception as e:
+            raise Exception(f"Error getting resume revision feedback: {str(e)}")
+
     async def quick_check(self, resume_text: str) -> Dict[str, any]:
         """
         Perform a quick check of resume quality.
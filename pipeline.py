@@ -0,0 +1,914 @@
+"""
+Review pipeline shared by the standalone bot and the evaluation workers.
+
+Works with anything that quacks like a discord.py Message/Attachment, so
+the same code runs in-process (bot.py) and in worker processes that only
+hold partial messages fetched over REST (worker.py).
+"""
+import asyncio
+import os
+import shutil
+from typing import Dict, List, Optional, Tuple
+from utils import Deadline, DeadlineExceeded, ProgressTracker
+from utils.stage_executor import StageExecutor
+from utils.trace_recorder import current_trace
+
+# Portfolio PDFs with less extracted text per page than this are also rendered
+IMAGE_HEAVY_CHARS_PER_PAGE = 300
+
+# Budget for full-page URL captures (long and infinite-scroll pages are truncated)
+CAPTURE_MAX_HEIGHT = int(os.getenv('CAPTURE_MAX_HEIGHT', '12000'))
+CAPTURE_MAX_PIXELS = int(os.getenv('CAPTURE_MAX_PIXELS', '25000000'))
+
+# Device views captured beside the desktop one, concurrently (empty: desktop only)
+CAPTURE_VIEWPORTS = tuple(v.strip() for v in os.getenv('CAPTURE_VIEWPORTS', 'tablet,mobile').split(',') if v.strip())
+
+# Revised uploads changing at most this share of the text get a changes-only review
+REVISION_MAX_CHANGE = float(os.getenv('REVISION_MAX_CHANGE', '0.5'))
+
+# Documents at least this similar to an indexed one reuse or adapt its feedback
+DUPLICATE_THRESHOLD = float(os.getenv('DUPLICATE_THRESHOLD', '0.85'))
+
+# Long text portfolios with several case studies are reviewed per case study, in parallel
+CASE_STUDY_REVIEW = os.getenv('CASE_STUDY_REVIEW', '1') == '1'
+CASE_STUDY_MIN_CHARS = int(os.getenv('CASE_STUDY_MIN_CHARS', '6000'))
+CASE_STUDY_MAX = int(os.getenv('CASE_STUDY_MAX', '6'))
+# PDF text read for portfolios with case studies (everything else stops at MAX_TEXT_CHARS)
+CASE_STUDY_MAX_CHARS = int(os.getenv('CASE_STUDY_MAX_CHARS', '60000'))
+
+# PDFs reviewed from a single message
+MAX_PDFS_PER_MESSAGE = int(os.getenv('MAX_PDFS_PER_MESSAGE', '3'))
+
+
+class ReviewRejected(Exception):
+    """A document that cannot be reviewed, with the status text and the reply for the user."""
+
+    def __init__(self, status: str, reply: str):
+        super().__init__(reply)
+        self.status = status
+        self.reply = reply
+
+
+async def send_feedback(message, header: str, feedback: str):
+    """Reply with feedback, split into chunks if needed (Discord has 2000 char limit)."""
+    if len(feedback) <= 1900:
+        await message.reply(f"{header}{feedback}")
+    else:
+        chunks = [feedback[i:i+1800] for i in range(0, len(feedback), 1800)]
+        await message.reply(f"{header}{chunks[0]}")
+        for i, chunk in enumerate(chunks[1:], 2):
+            await message.channel.send(f"**(Part {i})**\n\n{chunk}")
+
+
+class ReviewPipeline:
+    """Runs PDF and URL reviews end to end and posts the results."""
+
+    def __init__(self, runtime, review_queue):
+        """
+        Initialize review pipeline.
+
+        Args:
+            runtime: Runtime providing evaluators and the shared browser
+            review_queue: ReviewQueue bounding concurrent reviews
+        """
+        self.runtime = runtime
+        self.review_queue = review_queue
+
+    async def _start_tracker(self, message, label: str, tracker: Optional[ProgressTracker]):
+        """Post a new status message unless the job already has one."""
+        if tracker is None:
+            tracker = ProgressTracker(message, label)
+            await tracker.start(queue_position=self.review_queue.next_position())
+        return tracker
+
+    def _start_trace(self, kind: str, label: str):
+        """Start recording the job in the current task if tracing is on."""
+        recorder = self.runtime.trace_recorder
+        return recorder.start(kind, label) if recorder is not None else None
+
+    async def _finish_trace(self, trace, deadline: Optional[Deadline], result: Optional[Dict], error: Optional[str]):
+        """Close and write the job's trace."""
+        if trace is None:
+            return
+        recorder = self.runtime.trace_recorder
+        recorder.finish(trace, deadline, result, error)
+        await asyncio.to_thread(recorder.save, trace)
+
+    async def _limited(self, resource: str, awaitable):
+        """Await work while holding a slot of an adaptive concurrency limiter."""
+        async with self.runtime.resources.limiter(resource):
+            return await awaitable
+
+    async def _with_browser(self, call):
+        """Run call(screenshot_service) in a capture slot, so a browser recycle never closes it mid-capture."""
+        async with self.runtime.resources.limiter('capture'):
+            screenshot_service = await self.runtime.get_screenshot_service()
+            return await call(screenshot_service)
+
+    async def _wait_for_intake(self, tracker: ProgressTracker):
+        """Hold a job back while the resource controller has paused intake."""
+        resources = self.runtime.resources
+        if resources.intake_paused:
+            tracker.update('⏸️ Server is busy — waiting for memory to free up')
+            await resources.wait_for_intake()
+
+    @staticmethod
+    def _is_image_heavy(text: str, pages_read: int) -> bool:
+        """Whether a portfolio PDF carries too little text per page to review from text alone."""
+        return len(text) / max(pages_read, 1) < IMAGE_HEAVY_CHARS_PER_PAGE
+
+    @staticmethod
+    def _case_studies(text: str) -> Optional[Dict]:
+        """
+        Case studies of a long portfolio text, if it should be reviewed per case study.
+
+        Returns:
+            TextSections.case_studies() result, or None for a single-call review
+        """
+        from utils import TextSections
+
+        if not CASE_STUDY_REVIEW or len(text) < CASE_STUDY_MIN_CHARS:
+            return None
+        parts = TextSections.case_studies(text)
+        return parts if len(parts['case_studies']) >= 2 else None
+
+    async def _evaluate_portfolio_text(
+        self,
+        text_content: str,
+        tracker: ProgressTracker,
+        deadline: Deadline
+    ) -> Tuple[str, str]:
+        """
+        Review a text portfolio: per case study in parallel when it has several, else in one call.
+
+        Returns:
+            Tuple of (header, feedback)
+        """
+        evaluator = self.runtime.portfolio_evaluator
+        parts = self._case_studies(text_content)
+        if parts is None:
+            tracker.update('📁 Portfolio — analyzing content and structure')
+            async with StageExecutor.stage('llm'):
+                feedback = await evaluator.evaluate_text(text_content, prompt_type='ux_text', deadline=deadline)
+            return "## Portfolio Feedback\n\n", feedback
+
+        tracker.update(f"📁 Portfolio — reviewing {len(parts['case_studies'])} case studies in parallel")
+        async with StageExecutor.stage('llm'):
+            feedback = await evaluator.evaluate_case_studies(
+                parts['intro'],
+                parts['case_studies'],
+                max_case_studies=CASE_STUDY_MAX,
+                deadline=deadline
+            )
+        return "## Portfolio Feedback - Case Study Review\n\n", feedback
+
+    async def _review_text(
+        self,
+        file_type: str,
+        text_content: str,
+        filename: str,
+        user_id: Optional[int],
+        tracker: ProgressTracker,
+        deadline: Deadline
+    ) -> Tuple[str, str]:
+        """
+        Review a resume or text portfolio, incrementally if the user sent an earlier version.
+
+        Args:
+            file_type: 'resume' or 'portfolio'
+            text_content: Extracted text
+            filename: Uploaded file name
+            user_id: Discord user id (None disables the submission history)
+            tracker: Progress tracker of the job
+            deadline: Job deadline
+
+        Returns:
+            Tuple of (header, feedback)
+        """
+        from utils import TextSections
+
+        history = self.runtime.submission_history if user_id is not None else None
+        title = 'Resume' if file_type == 'resume' else 'Portfolio'
+        evaluator = self.runtime.resume_evaluator if file_type == 'resume' else self.runtime.portfolio_evaluator
+        sections = TextSections.split(text_content)
+
+        previous = None
+        if history is not None:
+            try:
+                async with StageExecutor.stage('preprocess'):
+                    previous = await asyncio.to_thread(history.latest, user_id, file_type)
+            except Exception as e:
+                print(f"Warning: Could not read submission history: {e}")
+
+        diff = TextSections.diff(previous['sections'], sections) if previous else None
+        if diff is not None and not (diff['changed'] or diff['added'] or diff['removed']):
+            # Same document again: the earlier feedback still applies, no model call needed
+            tracker.update('🔁 Same as your last upload')
+            return (
+                f"## {title} Feedback - No Changes Detected\n\n",
+                "This matches the version you uploaded before, so your earlier feedback still applies:\n\n"
+                + TextSections.summarize_feedback(previous['feedback'])
+            )
+
+        if diff is not None and diff['change_ratio'] <= REVISION_MAX_CHANGE:
+            tracker.update(f'🔁 Revised {file_type} — reviewing what changed')
+            async with StageExecutor.stage('llm'):
+                feedback = await evaluator.evaluate_revision(
+                    TextSections.format_changes(diff),
+                    TextSections.summarize_feedback(previous['feedback']),
+                    deadline=deadline
+                )
+            header = f"## {title} Feedback - Revision Review\n\n"
+            # The last full review stays the reference for later revisions
+            full_feedback, revision_feedback = previous['feedback'], feedback
+        else:
+            if file_type == 'resume':
+                header = "## Resume Feedback - Entry-Level UX Designer Position\n\n"
+            else:
+                header = "## Portfolio Feedback\n\n"
+
+            feedback = await self._reuse_review(
+                file_type, text_content, sections, user_id, evaluator, tracker, deadline
+            )
+            if feedback is None and file_type == 'resume':
+                # Resume evaluation
+                tracker.update('📄 Resume — evaluating against entry-level UX job requirements')
+                async with StageExecutor.stage('llm'):
+                    feedback = await evaluator.evaluate(text_content, prompt_type='entry_level_ux', deadline=deadline)
+                await self._index_review(file_type, text_content, sections, user_id, feedback)
+            elif feedback is None:
+                # Portfolio evaluation (text-based)
+                header, feedback = await self._evaluate_portfolio_text(text_content, tracker, deadline)
+                await self._index_review(file_type, text_content, sections, user_id, feedback)
+            full_feedback, revision_feedback = feedback, None
+
+        if history is not None:
+            try:
+                async with StageExecutor.stage('deliver'):
+                    await asyncio.to_thread(
+                        history.record, user_id, file_type, filename, text_content, sections,
+                        full_feedback, revision_feedback
+                    )
+            except Exception as e:
+                print(f"Warning: Could not record submission: {e}")
+
+        return header, feedback
+
+    async def _reuse_review(
+        self,
+        file_type: str,
+        text_content: str,
+        sections: List[Dict[str, str]],
+        user_id: Optional[int],
+        evaluator,
+        tracker: ProgressTracker,
+        deadline: Deadline
+    ) -> Optional[str]:
+        """
+        Reuse or adapt the feedback of a near-duplicate document reviewed before.
+
+        Args:
+            file_type: 'resume' or 'portfolio'
+            text_content: Extracted text
+            sections: Sections of text_content
+            user_id: Discord user id (only their own reviews are reused verbatim)
+            evaluator: Evaluator for file_type
+            tracker: Progress tracker of the job
+            deadline: Job deadline
+
+        Returns:
+            Feedback, or None if no document above DUPLICATE_THRESHOLD is indexed
+        """
+        from utils import TextSections
+
+        index = self.runtime.duplicate_index
+        if index is None:
+            return None
+        try:
+            async with StageExecutor.stage('preprocess'):
+                match = await asyncio.to_thread(
+                    index.query, text_content, file_type, DUPLICATE_THRESHOLD, user_id=user_id
+                )
+        except Exception as e:
+            print(f"Warning: Duplicate index lookup failed: {e}")
+            return None
+        if match is None:
+            return None
+
+        print(f"Near-duplicate of indexed document {match['id']} (similarity {match['similarity']:.2f})")
+        if match['exact']:
+            tracker.update('♻️ Matches a document reviewed before')
+            return match['feedback']
+
+        # Same template or a few edited lines: rewrite the earlier review for the differences
+        tracker.update('♻️ Similar to a document reviewed before — adapting its review')
+        diff = TextSections.diff(match['sections'], sections)
+        async with StageExecutor.stage('llm'):
+            return await evaluator.evaluate_revision(
+                TextSections.format_changes(diff),
+                match['feedback'],
+                prompt_type='adapt',
+                max_tokens=1500,
+                deadline=deadline
+            )
+
+    async def _index_review(
+        self,
+        file_type: str,
+        text_content: str,
+        sections: List[Dict[str, str]],
+        user_id: Optional[int],
+        feedback: str
+    ):
+        """Add a fully reviewed document to the near-duplicate index."""
+        index = self.runtime.duplicate_index
+        if index is None:
+            return
+        try:
+            async with StageExecutor.stage('deliver'):
+                await asyncio.to_thread(index.add, text_content, file_type, sections, feedback, user_id=user_id)
+        except Exception as e:
+            print(f"Warning: Could not index review: {e}")
+
+    async def _prepare_pdf(
+        self,
+        attachment,
+        temp_path: str,
+        tracker: ProgressTracker,
+        deadline: Deadline
+    ) -> Dict:
+        """
+        Download a PDF attachment, extract its text and classify it.
+
+        Args:
+            attachment: discord.py Attachment or compatible object
+            temp_path: Where the downloaded PDF is written
+            tracker: Progress tracker of the job
+            deadline: Job deadline
+
+        Returns:
+            Dict with filename, temp_path, pages, text, report, file_type and
+            image_only
+
+        Raises:
+            ReviewRejected: If the file is rejected or unreadable
+        """
+        from utils import AttachmentDownloader, DownloadRejected
+
+        # Download PDF (streamed, size-capped, signature checked on the first chunk)
+        tracker.update('Downloading')
+        async with StageExecutor.stage('fetch'):
+            try:
+                buffer = await deadline.run('download', AttachmentDownloader.download(attachment))
+            except DownloadRejected as e:
+                raise ReviewRejected('Rejected', f"❌ {e}")
+
+            with buffer, open(temp_path, 'wb') as f:
+                await asyncio.to_thread(shutil.copyfileobj, buffer, f)
+
+        # Extract text and detect the type while the pages are read
+        tracker.update('Extracting text')
+        try:
+            async with StageExecutor.stage('extract'):
+                pages, text_report, file_type = await deadline.run(
+                    'extract',
+                    self._limited('extract', asyncio.to_thread(self._read_pdf, temp_path, attachment.filename))
+                )
+        except Exception as e:
+            raise ReviewRejected('Could not read PDF', f"❌ Error extracting text from PDF: {str(e)}")
+        text_content = '\n\n'.join(pages)
+        print(
+            f"Text normalization ({attachment.filename}): {text_report['pages']}/{text_report['page_count']} pages"
+            f"{' (text budget filled)' if text_report['truncated'] else ''}, "
+            f"~{text_report['tokens_before']} -> ~{text_report['tokens_after']} tokens "
+            f"({text_report['boilerplate_dropped']} boilerplate, {text_report['page_numbers_dropped']} page numbers, "
+            f"{text_report['duplicates_dropped']} duplicate lines, {text_report['hyphens_joined']} hyphenations), "
+            f"backend {text_report['backend']} {text_report['backend_scores']} in {text_report['extract_seconds']}s"
+        )
+
+        async with StageExecutor.stage('preprocess'):
+            trace = current_trace.get()
+            if trace is not None:
+                await asyncio.to_thread(
+                    trace.add_document, attachment.filename, temp_path, text_content, text_report, file_type
+                )
+
+        return {
+            'filename': attachment.filename,
+            'temp_path': temp_path,
+            'pages': pages,
+            'text': text_content,
+            'report': text_report,
+            'file_type': file_type,
+            'image_only': len(text_content) < 50,
+        }
+
+    @staticmethod
+    def _read_pdf(pdf_path: str, filename: str) -> Tuple[List[str], Dict, str]:
+        """
+        Read a PDF's text and detect its type in one pass (blocking; run in a thread).
+
+        Detection consumes the pages as they are parsed and stops at the
+        first confident result (image-only PDFs fall back to the filename);
+        reading then continues only up to the text budget of the detected
+        type, so pages past it are never parsed. Only portfolios headed for
+        case study review read past MAX_TEXT_CHARS, up to CASE_STUDY_MAX_CHARS.
+
+        Returns:
+            Tuple of (cleaned pages, extraction report, file type)
+        """
+        from utils import FileDetector, PDFProcessor, TextSections
+        from utils.pdf_processor import MAX_TEXT_CHARS
+
+        with PDFProcessor.open_clean_pages(pdf_path) as reader:
+            file_type, _ = FileDetector.detect_incremental(reader.iter_pages(MAX_TEXT_CHARS), filename)
+            # Resume and portfolio reviews both read the first MAX_TEXT_CHARS
+            pages = reader.read(MAX_TEXT_CHARS)
+            if (
+                file_type == 'portfolio' and CASE_STUDY_REVIEW and not reader.finished
+                and TextSections.case_studies('\n\n'.join(pages))['case_studies']
+            ):
+                # A long portfolio with case studies is reviewed per case study: read the later ones too
+                pages = reader.read(max(CASE_STUDY_MAX_CHARS, MAX_TEXT_CHARS))
+            return pages, reader.report(), file_type
+
+    async def _review_pdf(
+        self,
+        document: Dict,
+        user_id: Optional[int],
+        tracker: ProgressTracker,
+        deadline: Deadline
+    ) -> Tuple[str, str]:
+        """
+        Route a prepared PDF to the right evaluator.
+
+        Args:
+            document: Result of _prepare_pdf
+            user_id: Discord user id (None disables the submission history)
+            tracker: Progress tracker of the job
+            deadline: Job deadline
+
+        Returns:
+            Tuple of (header, feedback)
+
+        Raises:
+            ReviewRejected: If a resume has too little text to review
+        """
+        file_type = document['file_type']
+        text_content = document['text']
+
+        if document['image_only'] and file_type == 'resume':
+            raise ReviewRejected(
+                'Not enough text',
+                "⚠️ This resume PDF seems to be mostly images or very short. Try exporting it as a text-based PDF."
+            )
+        elif file_type == 'resume':
+            # Resume evaluation (changes-only if the user sent an earlier version)
+            return await self._review_text(
+                file_type, text_content, document['filename'], user_id, tracker, deadline
+            )
+        elif document['image_only']:
+            # Image-only portfolio: rendered pages reviewed visually
+            tracker.update('🖼️ Image-based portfolio — rendering pages')
+            async with StageExecutor.stage('preprocess'):
+                page_images = await deadline.run(
+                    'render',
+                    self._limited('extract', self.runtime.pdf_rasterizer.rasterize(document['temp_path']))
+                )
+            tracker.update('🎨 Analyzing design, structure, and UX process')
+            async with StageExecutor.stage('llm'):
+                feedback = await self.runtime.portfolio_evaluator.evaluate_visual(
+                    page_images,
+                    prompt_type='ux_visual',
+                    deadline=deadline
+                )
+            return "## Portfolio Feedback - Visual Analysis\n\n", feedback
+        elif self._is_image_heavy(text_content, document['report']['pages']):
+            # Image-heavy portfolio: rendered pages plus the little text there is
+            tracker.update('🖼️ Portfolio — rendering pages')
+            try:
+                async with StageExecutor.stage('preprocess'):
+                    page_images = await deadline.run(
+                        'render',
+                        self._limited('extract', self.runtime.pdf_rasterizer.rasterize(document['temp_path']))
+                    )
+            except DeadlineExceeded:
+                # Rendering is late: review the text that was extracted
+                deadline.fallback('render -> text only')
+                page_images = []
+            tracker.update('📁 Portfolio — analyzing visuals and content')
+            async with StageExecutor.stage('llm'):
+                feedback = await self.runtime.portfolio_evaluator.evaluate_hybrid(
+                    text_content,
+                    page_images,
+                    deadline=deadline
+                )
+            return "## Portfolio Feedback\n\n", feedback
+        else:
+            # Portfolio evaluation (text-based)
+            return await self._review_text(
+                file_type, text_content, document['filename'], user_id, tracker, deadline
+            )
+
+    @staticmethod
+    def _author_id(message, user_id: Optional[int]) -> Optional[int]:
+        """Partial messages rebuilt by workers carry no author; workers pass user_id."""
+        if user_id is not None:
+            return user_id
+        author = getattr(message, 'author', None)
+        return getattr(author, 'id', None)
+
+    @staticmethod
+    def _guild_id(message) -> Optional[int]:
+        """Server of the message; partial messages rebuilt by workers only know the channel's guild_id."""
+        guild = getattr(message, 'guild', None)
+        if guild is not None:
+            return guild.id
+        return getattr(getattr(message, 'channel', None), 'guild_id', None)
+
+    @staticmethod
+    def _pdf_scores(document: Dict, feedback: str) -> Dict:
+        """Measurements of a reviewed PDF kept in the review store."""
+        report = document['report']
+        return {
+            'pages': report['pages'],
+            'page_count': report['page_count'],
+            'chars': len(document['text']),
+            'tokens': report['tokens_after'],
+            'text_quality': max(report['backend_scores'].values(), default=None),
+            'image_only': document['image_only'],
+            'feedback_chars': len(feedback),
+        }
+
+    @staticmethod
+    def _capture_scores(capture: Optional[Dict], text: str, feedback: str) -> Dict:
+        """Measurements of a reviewed URL capture kept in the review store."""
+        scores = {'chars': len(text), 'text_only': capture is None, 'feedback_chars': len(feedback)}
+        if capture is not None:
+            alts = capture['image_alts']
+            scores.update({
+                'screenshots': len(capture['screenshots']),
+                'page_height': capture['page_height'],
+                'headings': len(capture['headings']),
+                'images': len(alts),
+                'images_without_alt': sum(1 for alt in alts if not alt),
+                'views': sorted(capture.get('viewports') or {}),
+            })
+            metrics = capture.get('metrics')
+            if metrics:
+                scores.update({
+                    'contrast_failures': metrics['contrast']['failures'],
+                    'small_tap_targets': metrics['tap_targets']['under_44'],
+                    'skipped_heading_levels': metrics['headings']['skipped'],
+                    'words_per_screen': metrics['text']['words_per_screen'],
+                    'vague_links': metrics['links']['vague'],
+                })
+        return scores
+
+    def _store_review(
+        self,
+        message,
+        user_id: Optional[int],
+        kind: str,
+        file_type: str,
+        label: str,
+        content: str,
+        header: str,
+        feedback: str,
+        deadline: Deadline,
+        scores: Dict
+    ):
+        """Queue a delivered review for the review store (written in batches, off the job's path)."""
+        store = self.runtime.review_store
+        if store is None or user_id is None:
+            return
+        try:
+            store.add(
+                user_id,
+                file_type,
+                feedback,
+                kind=kind,
+                label=label,
+                title=header.strip().lstrip('#').strip(),
+                content=content,
+                guild_id=self._guild_id(message),
+                channel_id=getattr(getattr(message, 'channel', None), 'id', None),
+                message_id=getattr(message, 'id', None),
+                scores=scores,
+                timings=dict(deadline.timings),
+                total_seconds=deadline.elapsed(),
+                fallbacks=deadline.fallbacks
+            )
+        except Exception as e:
+            print(f"Warning: Could not store review: {e}")
+
+    async def process_pdf(
+        self,
+        attachment,
+        message,
+        tracker: Optional[ProgressTracker] = None,
+        user_id: Optional[int] = None
+    ):
+        """Process PDF attachment - detect type and evaluate accordingly."""
+        from utils import AttachmentDownloader, DownloadRejected
+
+        user_id = self._author_id(message, user_id)
+
+        # Oversized uploads are turned away before they take a queue slot
+        try:
+            AttachmentDownloader.check_size(attachment)
+        except DownloadRejected as e:
+            if tracker is not None:
+                await tracker.fail('Too large')
+            await message.reply(f"❌ {e}")
+            return
+
+        tracker = await self._start_tracker(message, attachment.filename, tracker)
+        temp_path = f"temp_{os.getpid()}_{attachment.filename}"
+
+        deadline = None
+        trace = self._start_trace('pdf', attachment.filename)
+        result, error = None, None
+        try:
+            async with self.review_queue.slot(tracker):
+                await self._wait_for_intake(tracker)
+                # The job deadline starts once the review leaves the queue
+                deadline = Deadline()
+                with self.runtime.stages.flow():
+                    try:
+                        document = await self._prepare_pdf(attachment, temp_path, tracker, deadline)
+                        header, feedback = await self._review_pdf(document, user_id, tracker, deadline)
+                    except ReviewRejected as e:
+                        result = {'rejected': e.status}
+                        await tracker.fail(e.status)
+                        await message.reply(e.reply)
+                        return
+
+                    result = {'file_types': [document['file_type']], 'feedback_chars': len(feedback)}
+                    async with StageExecutor.stage('deliver'):
+                        await send_feedback(message, header, feedback)
+                        self._store_review(
+                            message, user_id, 'pdf', document['file_type'], attachment.filename, document['text'],
+                            header, feedback, deadline, self._pdf_scores(document, feedback)
+                        )
+                    await tracker.finish(f"Reviewed as {document['file_type']}")
+
+        except Exception as e:
+            error = str(e)
+            await tracker.fail('Error')
+            await message.reply(f'❌ Error processing PDF: {str(e)}')
+            print(f"Error details: {e}")
+        finally:
+            # Clean up temp file if it exists
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            if deadline is not None:
+                print(f"Review timings ({attachment.filename}) - {deadline.report()}")
+            await self._finish_trace(trace, deadline, result, error)
+
+    async def process_pdfs(
+        self,
+        attachments: List,
+        message,
+        tracker: Optional[ProgressTracker] = None,
+        user_id: Optional[int] = None
+    ):
+        """
+        Review every PDF attached to one message and answer with a single reply.
+
+        Every PDF moves through the pipeline stages on its own (download,
+        extraction and classification of one overlap with the model call of
+        another). A resume and a portfolio sent together come back as one
+        combined review.
+
+        Args:
+            attachments: PDF attachments of the message
+            message: Discord message to reply to
+            tracker: Existing progress tracker (workers pass the queued job's)
+            user_id: Discord user id (default: the message author)
+        """
+        from utils import AttachmentDownloader, DownloadRejected
+
+        attachments = list(attachments)
+        if len(attachments) == 1:
+            await self.process_pdf(attachments[0], message, tracker, user_id=user_id)
+            return
+
+        user_id = self._author_id(message, user_id)
+        notes = []
+        if len(attachments) > MAX_PDFS_PER_MESSAGE:
+            skipped = ', '.join(a.filename for a in attachments[MAX_PDFS_PER_MESSAGE:])
+            notes.append(f"⚠️ Only {MAX_PDFS_PER_MESSAGE} PDFs are reviewed per message; skipped {skipped}.")
+            attachments = attachments[:MAX_PDFS_PER_MESSAGE]
+
+        # Oversized uploads are turned away before they take a queue slot
+        accepted = []
+        for attachment in attachments:
+            try:
+                AttachmentDownloader.check_size(attachment)
+                accepted.append(attachment)
+            except DownloadRejected as e:
+                notes.append(f"❌ {attachment.filename}: {e}")
+        if not accepted:
+            if tracker is not None:
+                await tracker.fail('Too large')
+            await message.reply('\n'.join(notes))
+            return
+
+        tracker = await self._start_tracker(message, f"{len(accepted)} PDFs", tracker)
+        temp_paths = [f"temp_{os.getpid()}_{index}_{a.filename}" for index, a in enumerate(accepted)]
+
+        deadline = None
+        trace = self._start_trace('pdfs', ', '.join(a.filename for a in accepted))
+        result, error = None, None
+        try:
+            async with self.review_queue.slot(tracker):
+                await self._wait_for_intake(tracker)
+                # The job deadline starts once the review leaves the queue
+                deadline = Deadline()
+
+                async def review(attachment, temp_path):
+                    # One flow per document, so no document waits at a barrier holding a stage worker
+                    with self.runtime.stages.flow():
+                        document = await self._prepare_pdf(attachment, temp_path, tracker, deadline)
+                        return document, await self._review_pdf(document, user_id, tracker, deadline)
+
+                tracker.update(f"Reviewing {len(accepted)} documents")
+                outcomes = await asyncio.gather(
+                    *(review(a, path) for a, path in zip(accepted, temp_paths)),
+                    return_exceptions=True
+                )
+                reviews = []
+                for attachment, outcome in zip(accepted, outcomes):
+                    if isinstance(outcome, ReviewRejected):
+                        notes.append(f"{attachment.filename}: {outcome.reply}")
+                    elif isinstance(outcome, Exception):
+                        notes.append(f"❌ {attachment.filename}: {str(outcome)}")
+                    else:
+                        reviews.append(outcome)
+
+                # Resume first, so a resume + portfolio pair reads as one application
+                reviews.sort(key=lambda review: review[0]['file_type'] != 'resume')
+                sections = []
+                reviewed_types = []
+                for document, (header, feedback) in reviews:
+                    reviewed_types.append(document['file_type'])
+                    sections.append(f"### {document['filename']} — {header.strip().lstrip('#').strip()}\n\n{feedback}")
+
+                result = {'file_types': reviewed_types, 'notes': len(notes)}
+                if not sections:
+                    await tracker.fail('Nothing to review')
+                    await message.reply('\n'.join(notes))
+                    return
+
+                if sorted(reviewed_types) == ['portfolio', 'resume']:
+                    header = "## Resume + Portfolio Feedback\n\n"
+                else:
+                    header = f"## Feedback on {len(sections)} PDFs\n\n"
+                feedback = '\n\n'.join(sections)
+                if notes:
+                    feedback += '\n\n' + '\n'.join(notes)
+
+                result['feedback_chars'] = len(feedback)
+                with self.runtime.stages.flow():
+                    async with StageExecutor.stage('deliver'):
+                        await send_feedback(message, header, feedback)
+                        # One stored review per document, with its own feedback
+                        for document, (document_header, document_feedback) in reviews:
+                            self._store_review(
+                                message, user_id, 'pdf', document['file_type'], document['filename'],
+                                document['text'], document_header, document_feedback, deadline,
+                                self._pdf_scores(document, document_feedback)
+                            )
+                await tracker.finish(f"Reviewed {len(sections)} PDFs")
+
+        except Exception as e:
+            error = str(e)
+            await tracker.fail('Error')
+            await message.reply(f'❌ Error processing PDFs: {str(e)}')
+            print(f"Error details: {e}")
+        finally:
+            for temp_path in temp_paths:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+            if deadline is not None:
+                print(f"Review timings ({', '.join(a.filename for a in accepted)}) - {deadline.report()}")
+            await self._finish_trace(trace, deadline, result, error)
+
+    async def process_url(
+        self,
+        url: str,
+        message,
+        tracker: Optional[ProgressTracker] = None,
+        user_id: Optional[int] = None
+    ):
+        """Process portfolio URL - screenshot and evaluate visually."""
+        from utils import ScreenshotService
+
+        user_id = self._author_id(message, user_id)
+
+        # Validate URL
+        if not ScreenshotService.is_valid_url(url):
+            if tracker is not None:
+                await tracker.fail('Invalid URL')
+            await message.reply(f"❌ Invalid URL: {url}")
+            return
+
+        tracker = await self._start_tracker(message, url, tracker)
+
+        deadline = None
+        trace = self._start_trace('url', url)
+        result, error = None, None
+        try:
+            async with self.review_queue.slot(tracker):
+                await self._wait_for_intake(tracker)
+                # The job deadline starts once the review leaves the queue
+                deadline = Deadline()
+                with self.runtime.stages.flow():
+                    tracker.update('🌐 Loading portfolio')
+
+                    # One navigation per device view yields screenshots, text, headings and alt texts
+                    try:
+                        async with StageExecutor.stage('extract'):
+                            capture = await deadline.run('capture', self._with_browser(
+                                lambda screenshot_service: screenshot_service.capture_views(
+                                    url,
+                                    views=CAPTURE_VIEWPORTS,
+                                    full_page=True,
+                                    viewport_width=1920,
+                                    viewport_height=1080,
+                                    max_height=CAPTURE_MAX_HEIGHT,
+                                    max_pixels=CAPTURE_MAX_PIXELS,
+                                    timeout=deadline.budget('capture')
+                                )
+                            ))
+                    except DeadlineExceeded:
+                        # Capture is late: fall back to a text-only review of the page
+                        deadline.fallback('capture -> text only')
+                        capture = None
+                    except Exception as e:
+                        error = str(e)
+                        await tracker.fail('Capture failed')
+                        await message.reply(f"❌ Error capturing screenshot: {str(e)}")
+                        return
+
+                    if trace is not None and capture is not None:
+                        trace.add_capture(url, capture)
+
+                    if capture is None:
+                        tracker.update('🐢 Page is slow — reviewing its text only')
+                        try:
+                            async with StageExecutor.stage('extract'):
+                                text = await deadline.run(
+                                    'text_fallback',
+                                    self._with_browser(
+                                        lambda screenshot_service: screenshot_service.get_page_text(
+                                            url, timeout=deadline.budget('text_fallback')
+                                        )
+                                    )
+                                )
+                        except Exception as e:
+                            error = str(e)
+                            await tracker.fail('Page too slow')
+                            await message.reply(f"❌ The page took too long to load: {str(e)}")
+                            return
+                        _, feedback = await self._evaluate_portfolio_text(text, tracker, deadline)
+                        header = "## Portfolio Feedback - Content Analysis\n\n"
+                        feedback = "_The page took too long to load, so this review is based on its text only._\n\n" + feedback
+                    else:
+                        # Evaluate portfolio from visuals and page content together
+                        tracker.update('🎨 Analyzing design, content, and UX process')
+
+                        async with StageExecutor.stage('llm'):
+                            feedback = await self.runtime.portfolio_evaluator.evaluate_hybrid(
+                                capture['text'],
+                                capture['screenshots'],
+                                headings=capture['headings'],
+                                image_alts=capture['image_alts'],
+                                capture_note=capture['truncation_note'],
+                                deadline=deadline,
+                                viewports=capture.get('viewports'),
+                                page_metrics=capture.get('metrics')
+                            )
+                        header = "## Portfolio Feedback - Visual & Content Analysis\n\n"
+
+                    # Send feedback
+                    result = {'file_types': ['portfolio'], 'feedback_chars': len(feedback), 'text_only': capture is None}
+                    async with StageExecutor.stage('deliver'):
+                        await send_feedback(message, header, feedback)
+                        page_text = text if capture is None else capture['text']
+                        self._store_review(
+                            message, user_id, 'url', 'portfolio', url, page_text, header, feedback, deadline,
+                            self._capture_scores(capture, page_text, feedback)
+                        )
+                    await tracker.finish('Reviewed')
+
+        except Exception as e:
+            error = str(e)
+            await tracker.fail('Error')
+            await message.reply(f'❌ Error processing URL: {str(e)}')
+            print(f"Error details: {e}")
+        finally:
+            if deadline is not None:
+                print(f"Review timings ({url}) - {deadline.report()}")
+            await self._finish_trace(trace, deadline, result, error)
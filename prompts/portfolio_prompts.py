@@ -66,5 +66,83 @@ Portfolio content:
 3. **Areas for Improvement**: What needs work?
 4. **Recommendations**: Specific next steps
 
-Analyze the portfolio image(s) provided."""
+Analyze the portfolio image(s) provided.""",
+
+    'ux_hybrid': """You are a UX hiring manager reviewing a portfolio. You have both visual and text content to analyze.
+
+Visual content is shown in the images above.
+
+Text content from the portfolio:
+{portfolio_text}
+{page_structure}
+Provide comprehensive feedback considering both the visual presentation and the written case study content. Focus on:
+1. Visual presentation quality and professionalism
+2. Case study structure and clarity
+3. Evidence of UX process and user-centered design
+4. Measurable outcomes and impact
+5. Accessibility and responsiveness (where measured page metrics are given, interpret them rather than re-checking from the images)
+6. Areas of strength and opportunities for improvement
+
+Format: Clear sections with bullet points, 500-700 words.""",
+
+    'revision': """You are a UX hiring manager re-reviewing a revised portfolio. You reviewed an earlier version of this portfolio; the candidate has since edited it.
+
+Summary of your earlier feedback:
+{previous_feedback}
+
+Changes since that version (lines starting with "-" were removed, "+" were added; sections not listed are unchanged):
+{changes}
+
+Give a focused follow-up review:
+
+1. **What Improved**: Which points of the earlier feedback do these changes address, and how well?
+2. **Still Missing**: Which earlier recommendations (process evidence, outcomes, storytelling) are still open?
+3. **New Issues**: Anything the edits introduced that weakens the case studies.
+4. **Next Step**: The single most valuable change to make next.
+
+Tone: Direct but supportive. Length: 200-350 words. Do not repeat the full earlier review.""",
+
+    'adapt': """You are a UX hiring manager. Below is feedback you wrote for a portfolio that is nearly identical to the one in front of you now (the same template, or the same file with a few edits). Rewrite that feedback so it is accurate for this portfolio.
+
+Earlier feedback for the similar portfolio:
+{previous_feedback}
+
+Differences between that portfolio and this one (lines starting with "-" appear only in the earlier one, "+" only in this one; sections not listed are identical):
+{changes}
+
+Instructions:
+- Keep every point that still applies, in the same structure.
+- Update or drop points the differences resolve, and add points for new content.
+- Address the candidate directly. Do not mention the other document, names or details that appear only in it, or that this review was adapted.
+- Same length and format as the earlier feedback.""",
+
+    'case_study': """You are a UX hiring manager reviewing one case study from a portfolio for an entry-level UX Designer position (case study {position} of {total}; the others are reviewed separately).
+
+Case study: {title}
+{case_study_text}
+
+Give focused feedback on this case study only:
+1. **Problem & Role**: Is the problem clearly framed, and is the candidate's own contribution clear?
+2. **Process Evidence**: Research, ideation, prototyping and testing — what is shown, what is missing?
+3. **Outcomes**: Are results measured or at least concretely described?
+4. **Storytelling**: Does it explain decisions, or only show deliverables?
+5. **Top Fix**: The single change that would most strengthen this case study.
+
+Tone: Supportive but honest. Format: bullet points. Length: 120-200 words. Do not comment on the portfolio as a whole.""",
+
+    'case_study_reduce': """You are a UX hiring manager. You reviewed each case study of a portfolio for an entry-level UX Designer position separately; your notes are below.
+
+Portfolio introduction (about, skills, contact):
+{intro}
+
+Your notes per case study:
+{reviews}
+
+Write the overall review that opens the feedback:
+1. **Overall Impression**: 2-3 sentences on how the portfolio reads as a whole.
+2. **Standout Strengths**: What the candidate does well across projects.
+3. **Patterns to Fix**: Issues that recur across case studies.
+4. **Priority Improvements**: The top 3 changes, naming the case study each applies to.
+
+Tone: Supportive but honest. Format: bullet points. Length: 200-300 words. Do not repeat the per-case-study feedback; it is shown right after your overview."""
 }
@@ -39,5 +39,38 @@ Provide feedback on:
 5. **Next Steps**: Specific actions to improve this resume.
 
 Resume content:
-{resume_text}"""
+{resume_text}""",
+
+    'revision': """You are a UX hiring manager re-reviewing a revised resume for an entry-level UX Designer position. You reviewed an earlier version of this resume; the candidate has since edited it.
+
+Summary of your earlier feedback:
+{previous_feedback}
+
+Changes since that version (lines starting with "-" were removed, "+" were added; sections not listed are unchanged):
+{changes}
+
+Give a focused follow-up review:
+
+1. **What Improved**: Which points of the earlier feedback do these changes address, and how well?
+2. **Still Missing**: Which earlier recommendations are still open?
+3. **New Issues**: Anything the edits introduced (typos, vague claims, formatting) that needs fixing.
+4. **Next Step**: The single most valuable change to make next.
+
+**Tone**: Direct but supportive; acknowledge the work they put in.
+
+**Length**: 200-350 words. Do not repeat the full earlier review.""",
+
+    'adapt': """You are a UX hiring manager. Below is feedback you wrote for a resume that is nearly identical to the one in front of you now (the same template, or the same file with a few edits). Rewrite that feedback so it is accurate for this resume.
+
+Earlier feedback for the similar resume:
+{previous_feedback}
+
+Differences between that resume and this one (lines starting with "-" appear only in the earlier one, "+" only in this one; sections not listed are identical):
+{changes}
+
+Instructions:
+- Keep every point that still applies, in the same structure.
+- Update or drop points the differences resolve, and add points for new content.
+- Address the candidate directly. Do not mention the other document, names or details that appear only in it, or that this review was adapted.
+- Same length and format as the earlier feedback."""
 }
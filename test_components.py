@@ -2,8 +2,11 @@
 Test script for validating core components.
 """
 import asyncio
-from utils import FileDetector, PDFProcessor, ScreenshotService
+from utils import FileDetector, PDFProcessor, PDFRasterizer, ScreenshotService, ProgressTracker, ReviewQueue
+from utils import Deadline, DeadlineExceeded, ImageDeduplicator, MinHashIndex, SubmissionHistory, TextSections
+from utils import AttachmentDownloader, DownloadRejected, TextNormalizer
 from evaluators import ResumeEvaluator, PortfolioEvaluator
+from evaluators.llm_client import LLMClient
 import os
 from dotenv import load_dotenv
 
@@ -66,6 +69,18 @@ def test_file_detector():
     print(f"Portfolio detection: {file_type}")
     assert file_type == 'portfolio', f"Expected 'portfolio', got '{file_type}'"
 
+    # Incremental detection stops reading once confident
+    read = []
+
+    def lazy_pages():
+        for page in [portfolio_text * 4, resume_text, resume_text]:
+            read.append(page)
+            yield page
+
+    file_type, pages_read = FileDetector.detect_incremental(lazy_pages(), 'document.pdf')
+    assert (file_type, pages_read, len(read)) == ('portfolio', 1, 1), (file_type, pages_read, len(read))
+    assert FileDetector.detect_incremental(lazy_pages(), 'my_resume.pdf') == ('resume', 0)
+
     print("[PASS] FileDetector tests passed!")
 
 
@@ -80,6 +95,766 @@ def test_pdf_processor():
 
     print("[PASS] PDFProcessor structure validated!")
 
+    # Backend selection: quality scoring and extraction of a generated PDF
+    import tempfile
+    from utils.pdf_backends import PDFBackend, get_backend, select_backend, text_quality
+
+    try:
+        PDFBackend()
+        assert False, "the backend interface is abstract"
+    except TypeError:
+        pass
+    from tools.benchmark_pdf_backends import write_pdf
+
+    assert text_quality("Led usability testing for the checkout redesign.") > 0.9
+    assert text_quality("L e d  u s a b i l i t y  t e s t i n g") < 0.5
+    assert text_quality("(cid:12)(cid:7)(cid:44) \ufffd\ufffd") < 0.5
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'resume.pdf')
+        write_pdf(path, [[(60, 700, 'plain', 'Jane Doe UX Designer')], [(60, 700, 'kerned', 'Led usability testing')]])
+        text, report = PDFProcessor.extract_clean_text(path)
+        print(f"Backend: {report['backend']} {report['backend_scores']}")
+        assert "Jane Doe UX Designer" in text and "Led usability testing" in text, text
+        assert PDFProcessor.get_page_count(path) == 2 and PDFProcessor.validate_pdf(path)
+
+        # Image-only documents stop at the first backend that finds no text
+        write_pdf(path, [[], []])
+        _, selection = select_backend(path)
+        assert selection.get('no_text') and len(selection['scores']) == 1, selection
+        write_pdf(path, [[(60, 700, 'plain', 'Jane Doe UX Designer')], [(60, 700, 'kerned', 'Led usability testing')]])
+        pdfminer = get_backend('pdfminer')
+        if pdfminer.available():
+            pages = list(pdfminer.extract_pages(path))
+            assert len(pages) == 2 and "Jane Doe UX Designer" in pages[0], pages
+            assert list(pdfminer.extract_pages(path, start=1)) == pages[1:]
+
+        # Long documents are only read until the text budget is filled
+        line = 'Checkout redesign case study with usability testing'
+        write_pdf(path, [[(60, 700 - 15 * n, 'plain', f"{line} {p} {n}") for n in range(30)] for p in range(100)])
+        pages, report = PDFProcessor.extract_clean_pages(path, max_chars=5000)
+        assert report['truncated'] and report['page_count'] == 100 and len(pages) < 5, report
+
+        # Detection consumes pages as they are parsed; the budget read afterwards reuses them
+        with PDFProcessor.open_clean_pages(path) as reader:
+            file_type, pages_read = FileDetector.detect_incremental(reader.iter_pages(5000), 'case_studies.pdf')
+            parsed = reader.report()['pages']
+            assert parsed == pages_read and parsed < 5, (parsed, pages_read)
+            pages = reader.read(20000)
+            assert reader.report()['pages'] == len(pages) and len(pages) > parsed, reader.report()
+        with open(path, 'wb') as f:
+            f.write(b'not a pdf')
+        assert not PDFProcessor.validate_pdf(path)
+
+    print("[PASS] PDF backend selection validated!")
+
+    # Page sampling for image-based PDFs: cover, most visual pages, even spread
+    scores = [0.1] * 40
+    scores[7], scores[30] = 1.2, 1.0
+    pages = PDFRasterizer.select_pages(scores, max_pages=5)
+    assert len(pages) == 5, pages
+    assert pages[0] == 0 and 7 in pages and 30 in pages, pages
+    assert PDFRasterizer.select_pages([0.5, 0.2], max_pages=5) == [0, 1]
+    scores = [None] * 40
+    scores[0], scores[13], scores[39] = 0.1, 1.5, 0.2
+    pages = PDFRasterizer.select_pages(scores, max_pages=4)
+    assert len(pages) == 4 and 13 in pages, pages
+    from utils.pdf_rasterizer import _candidate_pages
+    assert _candidate_pages(40, 4) == [0, 13, 26, 39]
+    assert _candidate_pages(40, 1) == [0] and _candidate_pages(3, 5) == [0, 1, 2]
+
+    print("[PASS] PDFRasterizer page selection validated!")
+
+    # Long documents are scored on a sample; daemon processes (gateway workers) render on a thread
+    import multiprocessing
+    from utils.pdf_rasterizer import _score_pages
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'portfolio.pdf')
+        write_pdf(path, [[(60, 700, 'plain', f"Project {p}")] for p in range(60)])
+        scores = _score_pages(path, max_candidates=8)
+        assert len(scores) == 60 and sum(score is not None for score in scores) == 8, scores
+
+        results = multiprocessing.Queue()
+        child = multiprocessing.Process(target=_rasterize_in_child, args=(path, results), daemon=True)
+        child.start()
+        outcome = results.get(timeout=60)
+        child.join(timeout=10)
+        assert isinstance(outcome, list) and len(outcome) == 3, outcome
+        assert all(size > 0 for size in outcome)
+
+    print("[PASS] PDFRasterizer rendering in a daemon process validated!")
+
+
+def _rasterize_in_child(path, results):
+    """Rasterize in a child process and report the page sizes (or the error)."""
+    try:
+        pages = asyncio.run(PDFRasterizer(max_pages=3).rasterize(path))
+        results.put([len(page) for page in pages])
+    except Exception as e:
+        results.put(f"{type(e).__name__}: {e}")
+
+
+def test_image_dedup():
+    """Test that blank and repeated tiles are dropped before vision calls."""
+    print("\n=== Testing ImageDeduplicator ===")
+    import io
+    from PIL import Image, ImageDraw
+
+    # Four 16:9 tiles: hero, the same hero again, blank, footer
+    page = Image.new('RGB', (800, 450 * 4), 'white')
+    draw = ImageDraw.Draw(page)
+    for top in (0, 450):
+        draw.rectangle((50, top + 50, 750, top + 400), fill=(30, 60, 200))
+    draw.rectangle((100, 1350 + 200, 300, 1350 + 260), fill=(0, 0, 0))
+    buffer = io.BytesIO()
+    page.save(buffer, format='PNG')
+
+    tiles, report = ImageDeduplicator().deduplicate([buffer.getvalue()])
+    print(f"Kept {report['tiles_kept']}/{report['tiles_total']} tiles")
+    assert report['tiles_total'] == 4, report
+    assert report['blank_dropped'] == 1 and report['duplicates_dropped'] == 1, report
+    assert len(tiles) == 2 and report['tokens_after'] < report['tokens_before']
+    assert report['capped'] == 0, report
+
+    # Distinct tiles beyond max_tiles are counted, not dropped silently
+    tiles, report = ImageDeduplicator().deduplicate([buffer.getvalue()], max_tiles=1)
+    assert len(tiles) == 1 and report['capped'] == 1, report
+
+    print("[PASS] ImageDeduplicator tests passed!")
+
+
+def test_text_normalizer():
+    """Test that extraction noise is removed without losing content."""
+    print("\n=== Testing TextNormalizer ===")
+
+    pages = [
+        "Jane Doe | Portfolio\nC A S E  S T U D Y\nWe interviewed 12 partici-\npants about the ﬁrst checkout.\n"
+        "We interviewed 12 partici-\npants about the ﬁrst checkout.\nConversion   rose   25%\nPage 1 of 2",
+        "Jane Doe | Portfolio\nOutcome\nThe redesign shipped in 2023.\n2",
+    ]
+    text, report = TextNormalizer().normalize(pages)
+    print(f"Tokens: ~{report['tokens_before']} -> ~{report['tokens_after']}")
+    assert text.count("Jane Doe | Portfolio") == 1, text
+    assert "CASE STUDY" in text and "Conversion rose 25%" in text
+    assert text.count("We interviewed 12 participants about the first checkout.") == 1, text
+    assert "Page 1" not in text and "2023" in text and not text.endswith("2")
+    assert report['tokens_after'] < report['tokens_before'] and report['hyphens_joined'] == 2
+
+    print("[PASS] TextNormalizer tests passed!")
+
+
+def test_text_sections():
+    """Test section splitting and the diff used for revision reviews."""
+    print("\n=== Testing TextSections ===")
+    import tempfile
+
+    v1 = """Jane Doe
+    jane@email.com
+
+    EXPERIENCE
+    UX Intern - Company A
+    - Created wireframes
+
+    Skills
+    Figma, Sketch
+    """
+    v2 = v1.replace("- Created wireframes", "- Created wireframes for 3 features\n    - Ran 8 usability tests")
+    v2 += "\n    Projects\n    Checkout redesign case study\n"
+
+    sections = TextSections.split(v1)
+    assert [s['title'] for s in sections] == ['Header', 'EXPERIENCE', 'Skills'], sections
+
+    diff = TextSections.diff(sections, TextSections.split(v2))
+    assert [c['title'] for c in diff['changed']] == ['EXPERIENCE'], diff
+    assert '+ - Ran 8 usability tests' in diff['changed'][0]['diff']
+    assert [s['title'] for s in diff['added']] == ['Projects'] and diff['unchanged'] == ['Header', 'Skills']
+    assert 0 < diff['change_ratio'] < 1
+    assert not TextSections.diff(sections, TextSections.split(v1.replace("Sketch", "SKETCH  ")))["changed"]
+    print(f"Change ratio: {diff['change_ratio']}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        history = SubmissionHistory(os.path.join(directory, 'history.db'), keep=2)
+        for version in range(3):
+            history.record('42', 'resume', 'cv.pdf', v1, sections, f"feedback {version}")
+        latest = history.latest('42', 'resume')
+        assert latest['feedback'] == 'feedback 2' and latest['sections'] == sections
+        assert history.latest('42', 'portfolio') is None
+
+    print("[PASS] TextSections tests passed!")
+
+
+async def test_revision_history():
+    """Test that revision reviews keep the last full review as their reference."""
+    print("\n=== Testing revision history ===")
+    import tempfile
+    from pipeline import ReviewPipeline
+    from tools.replay_traces import ReplayMessage
+    from utils import Runtime
+
+    full_review = "**Strengths**\n- Clear structure\n**Improvements**\n- Add metrics to every bullet\n- Tighten the summary"
+    prompts = []
+
+    async def fake_send(model, content, max_tokens):
+        prompts.append(content)
+        if len(prompts) == 1:
+            return full_review, {'input_tokens': 10, 'output_tokens': 20}, 'end_turn'
+        return f"- Revision note {len(prompts)}", {'input_tokens': 10, 'output_tokens': 5}, 'end_turn'
+
+    base = """Jane Doe
+    EXPERIENCE
+    UX Design Intern - Company A
+    - Created wireframes in Figma
+    - Conducted user interviews
+    - Ran usability tests
+    - Presented findings to stakeholders
+    EDUCATION
+    BS Human-Computer Interaction
+    SKILLS
+    Figma, Sketch, user research, prototyping
+    """
+    versions = [base, base.replace("Ran usability tests", "Ran 8 usability tests"),
+                base.replace("Ran usability tests", "Ran 8 usability tests, cutting errors by 30%")]
+
+    previous_path = os.environ.get('DUPLICATE_INDEX_PATH')
+    os.environ['DUPLICATE_INDEX_PATH'] = ''
+    runtime = Runtime(api_key='test')
+    runtime.resume_evaluator.client._send = fake_send
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            runtime._submission_history = SubmissionHistory(os.path.join(directory, 'history.db'))
+            pipeline = ReviewPipeline(runtime, ReviewQueue(1))
+            headers = []
+            for text in versions:
+                tracker = ProgressTracker(ReplayMessage(), 'cv.pdf')
+                header, _ = await pipeline._review_text('resume', text, 'cv.pdf', 42, tracker, Deadline())
+                headers.append(header)
+            assert [('Revision' in header) for header in headers] == [False, True, True], headers
+
+            latest = runtime.submission_history.latest(42, 'resume')
+            assert latest['feedback'] == full_review and latest['revision_feedback'] == "- Revision note 3", latest
+            # The second revision is compared against the full review, not the first revision's notes
+            assert "Tighten the summary" in prompts[2] and "Revision note 2" not in prompts[2], prompts[2]
+    finally:
+        if previous_path is None:
+            os.environ.pop('DUPLICATE_INDEX_PATH', None)
+        else:
+            os.environ['DUPLICATE_INDEX_PATH'] = previous_path
+        await runtime.close()
+
+    print("[PASS] Revision history tests passed!")
+
+
+async def test_case_study_review():
+    """Test case study detection and the parallel map-reduce portfolio review."""
+    print("\n=== Testing case study review ===")
+    import time
+    from evaluators import PortfolioEvaluator
+    from evaluators.llm_client import LLMClient
+
+    process = "We interviewed twelve students, mapped their journey and tested three prototypes. " * 5
+    portfolio = f"""Jane Doe
+    UX Designer
+    ABOUT ME
+    I design calm tools for busy people.
+    BUDGET BUDDY
+    Problem
+    {process}
+    Research
+    {process}
+    Case Study: Campus Maps
+    {process}
+    Outcome
+    Task time dropped by 40%.
+    WELLNESS APP
+    Challenge
+    {process}
+    Contact
+    jane@doe.com
+    """
+    parts = TextSections.case_studies(portfolio)
+    assert [c['title'] for c in parts['case_studies']] == ['BUDGET BUDDY', 'Case Study: Campus Maps', 'WELLNESS APP'], parts
+    assert 'Research' in parts['case_studies'][0]['text'] and 'Task time' in parts['case_studies'][1]['text']
+    assert 'ABOUT ME' in parts['intro'] and 'jane@doe.com' in parts['intro'] and 'interviewed' not in parts['intro']
+    assert TextSections.case_studies("Jane Doe\nSkills\nFigma")['case_studies'] == []
+
+    class SlowClient(LLMClient):
+        prompts = []
+
+        async def _send(self, model, content, max_tokens):
+            SlowClient.prompts.append(content)
+            await asyncio.sleep(0.2)
+            return "- **Top Fix**: Show the outcome first", {}, 'end_turn'
+
+    evaluator = PortfolioEvaluator(api_key='test')
+    evaluator.client = SlowClient(api_key='test', model='main')
+    start = time.perf_counter()
+    feedback = await evaluator.evaluate_case_studies(parts['intro'], parts['case_studies'], max_case_studies=2)
+    elapsed = time.perf_counter() - start
+    # Two case study calls in parallel, then the overview: two rounds, not three
+    assert elapsed < 0.55, elapsed
+    assert len(SlowClient.prompts) == 3 and 'case study 2 of 3' in SlowClient.prompts[1]
+    assert '### Case Study: Campus Maps' in feedback and 'not covered: WELLNESS APP' in feedback
+    assert 'Show the outcome first' in SlowClient.prompts[2]
+    print(f"3 case studies (2 reviewed) in {elapsed:.2f}s")
+
+    # Only portfolios headed for case study review are read past MAX_TEXT_CHARS
+    import tempfile
+    from pipeline import ReviewPipeline
+    from tools.benchmark_pdf_backends import write_pdf
+    from utils.pdf_processor import MAX_TEXT_CHARS
+
+    sentence = "We interviewed students about budgeting habits and tested prototypes with them"
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'document.pdf')
+        pages = []
+        for n in range(10):
+            lines = [f'PROJECT {n}', 'Problem'] + [f'{sentence} {n} step {j}' for j in range(20)]
+            lines += ['Research'] + [f'{sentence} {n} note {j}' for j in range(20)]
+            pages.append([(40, 780 - 16 * i, 'plain', line) for i, line in enumerate(lines)])
+        write_pdf(path, pages)
+        pages, report, file_type = ReviewPipeline._read_pdf(path, 'jane_portfolio.pdf')
+        assert file_type == 'portfolio' and len('\n\n'.join(pages)) > MAX_TEXT_CHARS, report
+        pages, report, file_type = ReviewPipeline._read_pdf(path, 'jane_resume.pdf')
+        assert file_type == 'resume' and report['truncated'], report
+        assert len('\n\n'.join(pages)) < MAX_TEXT_CHARS + 5000, report
+
+    print("[PASS] Case study review tests passed!")
+
+
+def test_minhash_index():
+    """Test near-duplicate lookup of earlier reviews."""
+    print("\n=== Testing MinHashIndex ===")
+    import random
+    import tempfile
+
+    rng = random.Random(7)
+    vocabulary = [f"word{i}" for i in range(3000)]
+    original = ' '.join(rng.choice(vocabulary) for _ in range(400))
+    edited = original.replace(original.split()[200], 'figma', 1)
+    unrelated = ' '.join(rng.choice(vocabulary) for _ in range(400))
+
+    with tempfile.TemporaryDirectory() as directory:
+        index = MinHashIndex(os.path.join(directory, 'minhash.db'))
+        index.add(original, 'resume', [{'title': 'Header', 'text': original}], 'Earlier feedback', user_id=1)
+        index.add(unrelated, 'resume', [], 'Other feedback')
+
+        match = index.query(edited, 'resume', threshold=0.85)
+        assert match and match['feedback'] == 'Earlier feedback' and not match['exact'], match
+        assert index.query(original.upper(), 'resume', user_id=1)['exact']
+        # Another user's identical upload only gets the earlier review adapted
+        assert not index.query(original, 'resume', user_id=2)['exact']
+        assert index.query(edited, 'portfolio') is None
+        assert index.query(' '.join(rng.choice(vocabulary) for _ in range(400)), 'resume') is None
+        print(f"Edited copy similarity: {match['similarity']:.2f}")
+        index.close()
+
+    print("[PASS] MinHashIndex tests passed!")
+
+
+async def test_review_store():
+    """Test batched review writes, history lookups and full-text search."""
+    print("\n=== Testing ReviewStore ===")
+    import tempfile
+    import time
+    from utils import ReviewStore
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = ReviewStore(os.path.join(directory, 'reviews.db'), batch_size=100, flush_interval=0.05)
+        # Many reviews by other users, written in bulk, so lookups have to use the indexes
+        store._write([
+            (i, 1000 + i % 5000, 1, 2, 3, 'pdf', 'resume', 'r.pdf', 'Resume Feedback', 'x', '{}', '{}', 30.0, None,
+             f"Tighten the summary of project {i}")
+            for i in range(20000)
+        ])
+        store.add(7, 'resume', "Add research methods to your skills.", label='a.pdf', title='Resume Feedback',
+                  content='resume text', guild_id=1, scores={'pages': 1}, timings={'llm': 12.5}, total_seconds=20.0)
+        store.add(7, 'portfolio', "Show your wireframes and usability testing.", kind='url',
+                  label='https://site.com', title='Portfolio Feedback')
+
+        # Queued rows are visible before the flush; none is written yet
+        queued = store.recent(7)
+        assert [r['id'] for r in queued] == [None, None] and queued[0]['file_type'] == 'portfolio', queued
+        await asyncio.sleep(0.3)
+        assert not store._pending
+
+        start = time.perf_counter()
+        reviews = store.recent(7, limit=5)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        assert [r['file_type'] for r in reviews] == ['portfolio', 'resume'] and reviews[0]['id'], reviews
+        assert store.recent(7, file_type='resume')[0]['scores'] == {'pages': 1}
+        stored = store.get(reviews[1]['id'])
+        assert stored['feedback'] == "Add research methods to your skills." and stored['timings'] == {'llm': 12.5}
+        assert store.by_content(ReviewStore.content_hash('resume text'))[0]['id'] == stored['id']
+
+        # Stemmed full-text search, scoped to the user; quotes in input are not query syntax
+        found = store.search('wireframe usability', user_id=7)
+        assert len(found) == 1 and found[0]['label'] == 'https://site.com', found
+        assert store.search('summary', user_id=7) == []
+        assert len(store.search('"tighten summaries', limit=3)) == 3
+        assert store.stats(guild_id=1)['resume']['reviews'] == 20001
+        print(f"recent() over 20002 rows: {elapsed_ms:.2f}ms")
+        print(store.format_history(reviews))
+
+        # Rows queued at shutdown are written by close()
+        store.add(8, 'resume', "Final review.")
+        await store.close()
+        assert store.recent(8)[0]['id'] is not None
+
+    print("[PASS] ReviewStore tests passed!")
+
+
+async def test_job_queue():
+    """Test job claims, lease expiry and heartbeats, and that a worker stops a job whose lease it lost."""
+    print("\n=== Testing JobQueue ===")
+    import tempfile
+    import time
+    import worker
+    from utils import JobQueue
+
+    with tempfile.TemporaryDirectory() as directory:
+        queue = JobQueue(os.path.join(directory, 'jobs.db'), max_attempts=2)
+        job_id = queue.enqueue('pdf', {'label': 'cv.pdf'})
+        assert queue.position(job_id) == 1
+
+        job = queue.claim('a', lease_seconds=0.2)
+        assert job['id'] == job_id and job['payload'] == {'label': 'cv.pdf'} and job['attempts'] == 1
+        assert queue.claim('b') is None, "a leased job is not claimed twice"
+        assert queue.heartbeat(job_id, 'a', lease_seconds=0.2)
+        assert not queue.heartbeat(job_id, 'b')
+
+        # An expired lease lets another worker reclaim the job; the old holder can no longer finish it
+        time.sleep(0.25)
+        job = queue.claim('b', lease_seconds=60)
+        assert job['id'] == job_id and job['attempts'] == 2
+        assert not queue.heartbeat(job_id, 'a')
+        assert not queue.complete(job_id, 'a') and not queue.fail(job_id, 'late', 'a')
+        assert queue.complete(job_id, 'b') and queue.stats() == {'done': 1}
+
+        # Jobs whose lease expires max_attempts times are given up on
+        job_id = queue.enqueue('url', {'label': 'site.com'})
+        for _ in range(2):
+            queue.claim('a', lease_seconds=0.01)
+            time.sleep(0.02)
+        assert queue.claim('a') is None and queue.stats() == {'done': 1, 'failed': 1}
+
+        # A worker losing the lease mid-job cancels it instead of finishing and replying
+        job_id = queue.enqueue('pdf', {'label': 'portfolio.pdf'})
+        lease_seconds = worker.LEASE_SECONDS
+        worker.LEASE_SECONDS = 0.15
+        replies = []
+        try:
+            job_worker = worker.Worker('w1', None, queue)
+
+            async def slow_job(job):
+                await asyncio.sleep(1.0)
+                replies.append(job['id'])
+
+            job_worker.run_job = slow_job
+            job = queue.claim('w1', lease_seconds=worker.LEASE_SECONDS)
+            handling = asyncio.create_task(job_worker.handle(job))
+            await asyncio.sleep(0.02)
+            with queue._connect() as conn:
+                conn.execute("UPDATE jobs SET worker = 'w2' WHERE id = ?", (job_id,))
+            start = time.monotonic()
+            await handling
+            assert replies == [] and time.monotonic() - start < 0.5
+            assert queue.stats() == {'done': 1, 'failed': 1, 'running': 1}
+            await job_worker.runtime.close()
+        finally:
+            worker.LEASE_SECONDS = lease_seconds
+
+    print("[PASS] JobQueue tests passed!")
+
+
+async def test_progress_tracker():
+    """Test that stage updates are coalesced into few status edits."""
+    print("\n=== Testing ProgressTracker ===")
+
+    class FakeMessage:
+        def __init__(self):
+            self.contents = []
+
+        async def reply(self, content, **kwargs):
+            self.contents.append(content)
+            return self
+
+        async def edit(self, content):
+            self.contents.append(content)
+
+    queue = ReviewQueue(max_concurrent=1)
+    messages = [FakeMessage(), FakeMessage()]
+
+    async def run_job(message):
+        tracker = ProgressTracker(message, "job.pdf", min_interval=0.05)
+        await tracker.start(queue_position=queue.next_position())
+        async with queue.slot(tracker):
+            for stage in ['Downloading', 'Extracting text', 'Detecting type', 'Evaluating']:
+                tracker.update(stage)
+            await asyncio.sleep(0.1)
+            await tracker.finish()
+
+    await asyncio.gather(*(run_job(m) for m in messages))
+
+    # Initial post + one coalesced edit + final edit
+    assert len(messages[0].contents) == 3, messages[0].contents
+    assert 'Evaluating' in messages[0].contents[1]
+    assert 'Queued — position 1' in messages[1].contents[0]
+    assert messages[1].contents[-1].startswith('✅')
+
+    print("[PASS] ProgressTracker tests passed!")
+
+
+async def test_deadline():
+    """Test stage budgets, hedged requests and the fallback model."""
+    print("\n=== Testing Deadline ===")
+
+    deadline = Deadline(total=5, budgets={'capture': 0.05})
+    try:
+        await deadline.run('capture', asyncio.sleep(1))
+        assert False, "capture should have run out of budget"
+    except DeadlineExceeded as e:
+        assert e.stage == 'capture'
+    assert deadline.budget('evaluate') <= 5 and 'capture' in deadline.timings
+
+    class ScriptedClient(LLMClient):
+        """LLMClient whose requests take scripted times instead of calling the API."""
+
+        def __init__(self, delays):
+            super().__init__(api_key='test', model='main', fallback_model='fast')
+            self.delays = list(delays)
+            self.default_hedge_after = 0.05
+            self.fallback_reserve = 0.2
+
+        async def _request(self, model, content, max_tokens):
+            await asyncio.sleep(self.delays.pop(0))
+            return model
+
+    # First request stalls, the hedge answers
+    deadline = Deadline(total=5, budgets={'evaluate': 2})
+    assert await ScriptedClient([1.5, 0.01]).complete('prompt', 100, deadline) == 'main'
+    assert deadline.fallbacks == ['hedged request'], deadline.fallbacks
+
+    # Main model too slow for the budget: the fallback model answers
+    deadline = Deadline(total=5, budgets={'evaluate': 0.5})
+    assert await ScriptedClient([2, 2, 0.01]).complete('prompt', 100, deadline) == 'fast'
+    assert any('-> fast' in entry for entry in deadline.fallbacks), deadline.fallbacks
+    print(f"Fallback run - {deadline.report()}")
+
+    print("[PASS] Deadline tests passed!")
+
+
+async def test_attachment_download():
+    """Test size-capped downloads and early PDF signature checks."""
+    print("\n=== Testing AttachmentDownloader ===")
+
+    class FakeAttachment:
+        def __init__(self, data: bytes, size: int = None):
+            self.data = data
+            self.size = len(data) if size is None else size
+
+        async def read(self) -> bytes:
+            return self.data
+
+    pdf = b'%PDF-1.4\n' + b'0' * 5000
+    with await AttachmentDownloader.download(FakeAttachment(pdf), spool_bytes=1024) as buffer:
+        assert buffer.read() == pdf
+
+    rejected = [
+        (FakeAttachment(pdf, size=10 * 1024 * 1024), 1024 * 1024),  # declared size over the cap
+        (FakeAttachment(pdf + b'0' * 2 * 1024 * 1024, size=100), 1024 * 1024),  # body larger than declared
+        (FakeAttachment(b'PK\x03\x04' + b'0' * 5000), 1024 * 1024), # not a PDF
+    ]
+    for attachment, max_bytes in rejected:
+        try:
+            await AttachmentDownloader.download(attachment, max_bytes=max_bytes)
+            assert False, "download should have been rejected"
+        except DownloadRejected as e:
+            print(f"Rejected: {e}")
+
+    print("[PASS] AttachmentDownloader tests passed!")
+
+
+async def test_url_ingest():
+    """Test URL extraction, canonicalization, dedup and pre-flight routing."""
+    print("\n=== Testing URLIngestor ===")
+    from aiohttp import web
+    from utils import URLIngestor
+
+    text = "My site: https://Jane.design/work/?utm_source=x&page=2, also (https://jane.design/work?page=2) and www.example.com/a_(b)."
+    assert URLIngestor.extract(text) == [
+        "https://Jane.design/work/?utm_source=x&page=2", "https://jane.design/work?page=2", "www.example.com/a_(b)"
+    ]
+    assert URLIngestor.dedupe(URLIngestor.extract(text)) == ["https://jane.design/work?page=2", "https://www.example.com/a_(b)"]
+    assert URLIngestor.canonicalize("HTTP://Site.com:80/#about") == "http://site.com"
+    assert URLIngestor.canonicalize("https://site.com/#/case-study") == "https://site.com#/case-study"
+    assert URLIngestor.is_url("https://site.com") and not URLIngestor.is_url("hello there")
+    assert URLIngestor.pdf_filename("https://cdn.site/files/Jane%20Resume.pdf") == "Jane_Resume.pdf"
+
+    async def page(request):
+        return web.Response(text="<html></html>", content_type='text/html')
+
+    async def head_rejected(request):
+        if request.method == 'HEAD':
+            return web.Response(status=405)
+        return await page(request)
+
+    app = web.Application()
+    app.router.add_get('/page', page)
+    app.router.add_get('/old', lambda request: web.HTTPFound('/page'))
+    app.router.add_get('/cv', lambda request: web.Response(body=b'%PDF-1.4', content_type='application/pdf'))
+    app.router.add_route('*', '/strict', head_rejected)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    base = f"http://127.0.0.1:{runner.addresses[0][1]}"
+    try:
+        links = await URLIngestor.ingest(
+            f"{base}/page {base}/old {base}/cv {base}/missing {base}/strict https://youtu.be/abc"
+        )
+        kinds = [(link['url'].replace(base, ''), link['kind']) for link in links]
+        # /old redirects to /page and is dropped as a duplicate destination
+        assert kinds == [('/page', 'html'), ('/cv', 'pdf'), ('/missing', 'not_found'),
+                         ('/strict', 'html'), ('https://youtu.be/abc', 'video')], kinds
+        assert URLIngestor.as_attachment(links[1]).filename == 'cv.pdf'
+        print(URLIngestor.reason(links[2]))
+    finally:
+        await runner.cleanup()
+
+    print("[PASS] URLIngestor tests passed!")
+
+
+async def test_resource_controller():
+    """Test adjustable limiters and the controller's memory decisions."""
+    print("\n=== Testing ResourceController ===")
+    from utils.resource_controller import AdjustableLimiter, ResourceController
+
+    # A lowered limit holds back new acquisitions until holders release
+    limiter = AdjustableLimiter('capture', 2, minimum=1, maximum=3)
+    await limiter.acquire()
+    await limiter.acquire()
+    limiter.set_limit(1)
+    waiter = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    limiter.release()
+    await asyncio.sleep(0)
+    assert not waiter.done() and limiter.stats() == {'limit': 1, 'in_use': 1, 'waiting': 1}
+    limiter.set_limit(5)
+    await asyncio.sleep(0)
+    assert waiter.done() and limiter.stats() == {'limit': 3, 'in_use': 2, 'waiting': 0}
+
+    recycled = []
+
+    async def recycle():
+        recycled.append(True)
+
+    controller = ResourceController(
+        limits={'capture': (1, 3), 'llm': (2, 8)},
+        memory_limit=1000 * 1024 * 1024,
+        on_browser_recycle=recycle
+    )
+    controller.decide({'rss_mb': 950, 'browser_mb': 100, 'cpu_percent': 20})
+    assert controller.intake_paused
+    assert controller.metrics()['limits']['llm']['limit'] == 2
+    controller.decide({'rss_mb': 500, 'browser_mb': 1500, 'cpu_percent': 20})
+    await asyncio.sleep(0)
+    assert not controller.intake_paused and recycled == [True]
+    assert controller.metrics()['limits']['llm']['limit'] == 3
+    print(controller.format_metrics())
+
+    print("[PASS] ResourceController tests passed!")
+
+
+async def test_stage_executor():
+    """Test stage overlap across jobs, backpressure and utilization metrics."""
+    print("\n=== Testing StageExecutor ===")
+    import time
+    from utils import StageExecutor
+
+    executor = StageExecutor(workers={'extract': 1, 'llm': 1}, queue_size=1)
+    order = []
+
+    async def job(name):
+        with executor.flow():
+            async with executor.stage('extract'):
+                order.append(f"extract {name}")
+                await asyncio.sleep(0.05)
+            async with executor.stage('llm'):
+                order.append(f"llm {name}")
+                await asyncio.sleep(0.05)
+
+    start = time.monotonic()
+    await asyncio.gather(*(job(name) for name in 'abc'))
+    elapsed = time.monotonic() - start
+    # Extraction of b runs while a waits on the model: 4 steps of 0.05s instead of 6
+    assert elapsed < 0.25, elapsed
+    assert order[:3] == ['extract a', 'llm a', 'extract b'], order
+
+    metrics = executor.metrics()
+    assert metrics['llm']['completed'] == 3 and metrics['llm']['busy'] == 0
+    assert metrics['llm']['utilization'] > 0.5, metrics['llm']
+    assert executor.bottleneck(metrics) in ('extract', 'llm')
+    # Jobs finishing extraction wait for the single-place llm queue while keeping their extract worker
+    assert metrics['extract']['blocked_share'] > 0
+    print(executor.format_metrics())
+
+    # Outside a flow, stage() is a no-op
+    async with StageExecutor.stage('llm'):
+        pass
+
+    print("[PASS] StageExecutor tests passed!")
+
+
+async def test_trace_recorder():
+    """Test job traces: redaction, LLM call recording and archive round trip."""
+    print("\n=== Testing TraceRecorder ===")
+    import tempfile
+    from evaluators.llm_client import LLMClient
+    from utils import TraceRecorder
+    from utils.trace_recorder import current_trace, load_trace, redact, redact_filename
+
+    assert redact("Mail jane@doe.com or call (555) 123-4567") == "Mail [email] or call [phone]"
+    assert redact("see https://site.com/jane/work") == "see https://site.com/[path]"
+    assert redact_filename("Jane_Doe_Resume.pdf") == "redacted_resume.pdf"
+
+    class RecordingClient(LLMClient):
+        async def _send(self, model, content, max_tokens):
+            return "Looks good, jane@doe.com", {'input_tokens': 10, 'output_tokens': 2}, 'end_turn'
+
+    with tempfile.TemporaryDirectory() as directory:
+        recorder = TraceRecorder(directory, content='redacted', sample_rate=1.0)
+        trace = recorder.start('url', 'https://site.com/jane')
+        assert current_trace.get() is trace
+        client = RecordingClient(api_key='test', model='main')
+        assert await client.complete([{"type": "text", "text": "Review this"}], 100) == "Looks good, jane@doe.com"
+        capture = {
+            'screenshots': [b'png'],
+            'viewports': {'mobile': {'width': 390, 'height': 844, 'screens': 1, 'image': b'jpg'}},
+            'text': 'page',
+        }
+        trace.add_capture('https://site.com/jane', capture)
+        recorder.finish(trace, result={'feedback_chars': 10})
+        assert current_trace.get() is None
+        path = recorder.save(trace)
+
+        loaded = load_trace(path)
+        assert loaded['label'] == 'https://site.com/[path]'
+        # Redacted traces mask responses and keep no screenshots
+        assert loaded['llm'][0]['response'] == "Looks good, [email]"
+        assert loaded['capture']['screenshots'][0]['file'] is None and not loaded['files']
+        assert loaded['llm'][0]['prompt_sha256'] == LLMClient.fingerprint([{"type": "text", "text": "Review this"}])[0]
+        assert loaded['resources']['end']['cpu_seconds'] >= loaded['resources']['start']['cpu_seconds']
+
+        recorder = TraceRecorder(directory, content='full', sample_rate=1.0)
+        trace = recorder.start('url', 'https://site.com/jane')
+        await client.complete([{"type": "text", "text": "Review this"}], 100)
+        trace.add_capture('https://site.com/jane', capture)
+        recorder.finish(trace)
+        loaded = load_trace(recorder.save(trace))
+        assert loaded['llm'][0]['response'] == "Looks good, jane@doe.com"
+        assert loaded['files'] == {'screenshots/0.png': b'png', 'viewports/mobile.jpg': b'jpg'}
+
+    print("[PASS] TraceRecorder tests passed!")
+
 
 async def test_screenshot_service():
     """Test screenshot service."""
@@ -97,6 +872,80 @@ async def test_screenshot_service():
     normalized = ScreenshotService.normalize_url("http://example.com")
     assert normalized == "http://example.com"
 
+    assert hasattr(ScreenshotService, 'capture_page')
+
+    # Long pages are captured as section-aligned segments within the height budget
+    segments = ScreenshotService.plan_segments(
+        page_height=30000, budget_height=6000, viewport_height=1080, boundaries=[900, 2100]
+    )
+    assert segments[0] == (0, 900) and segments[1] == (900, 1200), segments
+    assert sum(height for _, height in segments) == 6000
+    assert all(height <= 1080 * 1.4 for _, height in segments)
+
+    # Mobile screens are composed side by side instead of being tiled
+    import io
+    from PIL import Image
+    from utils.screenshot_service import AssetCache
+
+    def screen(shade):
+        output = io.BytesIO()
+        Image.new('RGB', (390, 844), (shade, shade, shade)).save(output, format='PNG')
+        return output.getvalue()
+
+    strip = Image.open(io.BytesIO(ScreenshotService.compose_screens([screen(0), screen(90), screen(180)])))
+    assert strip.size == (3 * 390 + 2 * 16, 844)
+
+    # Concurrent contexts requesting the same asset share one fetch
+    class FakeResponse:
+        ok, status = True, 200
+
+        def __init__(self, headers):
+            self.headers = headers
+
+        async def body(self):
+            await asyncio.sleep(0.01)
+            return b'body'
+
+    class FakeRoute:
+        def __init__(self, resource_type, url='https://site.com/hero.png', headers=None):
+            self.request = type('Request', (), {'url': url, 'method': 'GET', 'resource_type': resource_type})()
+            self.headers = headers or {'content-type': 'image/png', 'content-encoding': 'gzip'}
+            self.fetched = False
+            self.fulfilled = None
+
+        async def fetch(self):
+            self.fetched = True
+            return FakeResponse(self.headers)
+
+        async def fulfill(self, status, headers, body):
+            self.fulfilled = (status, headers, body)
+
+        async def continue_(self):
+            self.fulfilled = 'network'
+
+    cache = AssetCache()
+    desktop, mobile = cache.handler('1920x1080 '), cache.handler('390x844 iPhone')
+    routes = [FakeRoute('image') for _ in range(3)] + [FakeRoute('document')]
+    await asyncio.gather(*(handle(route) for handle, route in zip([desktop, mobile, mobile, desktop], routes)))
+    assert (cache.misses, cache.hits) == (1, 2)
+    assert routes[2].fulfilled == (200, {'content-type': 'image/png'}, b'body')
+    assert routes[3].fulfilled == 'network'
+
+    # Device-dependent responses are not shared between profiles
+    script = [FakeRoute('script', 'https://site.com/app.js') for _ in range(3)]
+    await desktop(script[0])
+    await mobile(script[1])
+    await desktop(script[2])
+    assert [route.fetched for route in script] == [True, True, False]
+    bundle = [FakeRoute('script', 'https://site.com/app.3f9a1c2b.js') for _ in range(2)]
+    await desktop(bundle[0])
+    await mobile(bundle[1])
+    assert [route.fetched for route in bundle] == [True, False]
+    varying = [FakeRoute('image', 'https://cdn.site.com/hero.webp', {'vary': 'Accept, User-Agent'}) for _ in range(2)]
+    await desktop(varying[0])
+    await mobile(varying[1])
+    assert [route.fetched for route in varying] == [True, True]
+
     print("[PASS] ScreenshotService validation tests passed!")
 
     # Optional: Test actual screenshot (requires network)
@@ -105,23 +954,224 @@ async def test_screenshot_service():
         print("Capturing screenshot of example.com...")
         async with ScreenshotService() as service:
             try:
-                screenshot_path = await service.capture_screenshot(
+                screenshot = await service.capture_screenshot(
                     "https://example.com",
                     viewport_width=1920,
                     viewport_height=1080
                 )
-                print(f"Screenshot saved: {screenshot_path}")
-                if os.path.exists(screenshot_path):
-                    os.remove(screenshot_path)
-                    print("[PASS] Screenshot test passed!")
+                print(f"Screenshot captured: {len(screenshot)} bytes")
+                assert screenshot.startswith(b'\x89PNG')
+                print("[PASS] Screenshot test passed!")
             except Exception as e:
                 print(f"Screenshot test failed: {e}")
 
 
+async def test_capture_service():
+    """Test the shared capture service: pool scheduling, crash recovery and the client mode of ScreenshotService."""
+    print("\n=== Testing capture service ===")
+    import time
+    from aiohttp import web
+    from capture_service import BrowserPool, create_app, is_loopback
+
+    class FakeBrowser:
+        def __init__(self):
+            self.connected = True
+
+        def is_connected(self):
+            return self.connected
+
+    class FakeCapture:
+        """Stands in for a pool browser (no Chromium in the test environment)."""
+        launched = 0
+
+        def __init__(self):
+            self.browser = None
+
+        async def start(self):
+            FakeCapture.launched += 1
+            self.browser = FakeBrowser()
+
+        async def warm_up(self):
+            await self.start()
+
+        async def close(self):
+            self.browser = None
+
+        async def capture_views(self, url, views=(), grace=3.0, **kwargs):
+            await asyncio.sleep(0.2)
+            if 'crash' in url:
+                self.browser.connected = False
+                raise Exception("Failed to capture page: Target closed")
+            return {
+                'screenshots': [b'\x89PNG desktop'], 'url': url, 'headings': [(1, 'Work')],
+                'viewports': {name: {'image': b'JPEG ' + name.encode(), 'width': 390} for name in views},
+            }
+
+        async def get_page_text(self, url, timeout=30.0):
+            return f"text of {url}"
+
+    pool = BrowserPool(browsers=2, pages_per_browser=1, recycle_after=3, factory=FakeCapture)
+    await pool.start()
+    runner = web.AppRunner(create_app(pool, token='secret'))
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+
+    client = ScreenshotService(service_url=url, token='secret')
+    try:
+        await client.warm_up()
+        # Four captures on two single-page browsers run in two waves
+        start = time.perf_counter()
+        captures = await asyncio.gather(*(
+            client.capture_views(f"https://site{i}.com", views=('mobile',), grace=1.0, timeout=10) for i in range(4)
+        ))
+        elapsed = time.perf_counter() - start
+        assert 0.35 < elapsed < 1.5, elapsed
+        assert captures[0]['screenshots'] == [b'\x89PNG desktop'] and captures[0]['headings'] == [(1, 'Work')]
+        assert captures[3]['viewports']['mobile']['image'] == b'JPEG mobile'
+        assert await client.get_page_text('https://site.com') == "text of https://site.com"
+
+        # A crashed browser fails its capture, then is relaunched for the next one
+        try:
+            await client.capture_views('https://crash.com', timeout=10)
+            assert False, "capture should have failed"
+        except ValueError:
+            raise
+        except Exception as e:
+            assert 'Target closed' in str(e), e
+        await client.capture_views('https://after.com', timeout=10)
+        stats = pool.stats()
+        assert sum(b['crashes'] for b in stats['browsers']) == 1, stats
+        assert sum(b['recycles'] for b in stats['browsers']) >= 1, stats
+        print(f"Pool after {stats['completed']} captures: {stats['browsers']}, {FakeCapture.launched} launches")
+
+        # Invalid URLs are refused by the client; unauthenticated clients by the service
+        try:
+            await client.capture_page('not a url')
+            assert False, "invalid URL should be rejected"
+        except ValueError:
+            pass
+        stranger = ScreenshotService(service_url=url, token='')
+        try:
+            await stranger.get_page_text('https://site.com')
+            assert False, "unauthenticated request should be rejected"
+        except Exception as e:
+            assert 'Unauthorized' in str(e), e
+        finally:
+            await stranger.close()
+
+        # Without a token the service only binds loopback addresses
+        assert is_loopback('127.0.0.1') and is_loopback('localhost') and is_loopback('::1')
+        assert not is_loopback('0.0.0.0') and not is_loopback('10.0.0.5') and not is_loopback('example.com')
+    finally:
+        await client.close()
+        await runner.cleanup()
+        await pool.close()
+
+    print("[PASS] Capture service tests passed!")
+
+
+async def test_page_metrics():
+    """Test that measured page metrics reach the hybrid prompt and traces."""
+    print("\n=== Testing Page Metrics ===")
+    import io
+    import random
+    import tempfile
+    from PIL import Image
+    from utils import TraceRecorder
+
+    metrics = {
+        'headings': {'total': 9, 'h1': 2, 'skipped': 1},
+        'images': {'total': 6, 'missing_alt': 2, 'decorative': 1},
+        'contrast': {'checked': 120, 'failures': 4, 'worst': [
+            {'text': 'Posted in 2023', 'ratio': 2.32, 'fg': '#aaaaaa', 'bg': '#ffffff', 'size': 12, 'large': False},
+        ]},
+        'tap_targets': {'total': 30, 'under_24': 2, 'under_44': 7, 'smallest': [
+            {'text': 'jane@doe.com', 'width': 18, 'height': 16},
+        ]},
+        'text': {'words': 2400, 'words_per_screen': 310, 'paragraphs': 18, 'long_paragraphs': 2,
+                 'small_text_share': 0.35},
+        'links': {'total': 40, 'internal': 30, 'external': 6, 'mailto': 1, 'placeholder': 3, 'vague': 3,
+                  'unnamed': 1},
+        'page': {'lang': None, 'viewport_meta': True, 'unlabeled_fields': 0},
+    }
+    mobile = {'width': 390, 'height': 844, 'screens': 3, 'image': b'',
+              'tap_targets': {'total': 20, 'under_24': 5, 'under_44': 12, 'smallest': []}}
+    block = PortfolioEvaluator.format_page_metrics(metrics, {'mobile': mobile})
+    assert "Headings: 9 (2 H1, 1 skipped level(s))" in block, block
+    assert '4 of 120 text elements below WCAG AA; worst: "Posted in 2023" 2.32:1 (#aaaaaa on #ffffff, 12px)' in block
+    assert "Tap targets (desktop): 7 of 30 under 44x44px" in block
+    assert "Tap targets (mobile, 390px): 12 of 20 under 44x44px, 5 under 24x24px" in block
+    assert "35% of words under 14px" in block and "lang missing" in block
+    assert PortfolioEvaluator.format_page_metrics(None) == ''
+
+    # Metrics go into the prompt and replace one screenshot
+    def noise(seed: int) -> bytes:
+        rng = random.Random(seed)
+        image = Image.new('RGB', (64, 64))
+        image.putdata([tuple(rng.randrange(256) for _ in range(3)) for _ in range(64 * 64)])
+        output = io.BytesIO()
+        image.save(output, format='PNG')
+        return output.getvalue()
+
+    sent = []
+
+    async def fake_send(model, content, max_tokens):
+        sent.append(content)
+        return "Feedback", {'input_tokens': 10, 'output_tokens': 2}, 'end_turn'
+
+    evaluator = PortfolioEvaluator(api_key='test')
+    evaluator.client._send = fake_send
+    screenshots = [noise(seed) for seed in range(6)]
+    await evaluator.evaluate_hybrid("Case study text", screenshots)
+    await evaluator.evaluate_hybrid("Case study text", screenshots, page_metrics=metrics)
+    images = [sum(1 for block in content if block['type'] == 'image') for content in sent]
+    assert images == [5, 4], images
+    assert "Measured page metrics" in sent[1][-1]['text'] and "Measured page metrics" not in sent[0][-1]['text']
+
+    # Device views are encoded off the event loop, after the tiles and behind their label
+    import threading
+    encoded_on = []
+    encode_image = evaluator.encode_image
+
+    def recording_encode(image):
+        encoded_on.append(threading.current_thread() is threading.main_thread())
+        return encode_image(image)
+
+    evaluator.encode_image = recording_encode
+    await evaluator.evaluate_hybrid("Case study text", screenshots, viewports={'mobile': dict(mobile, image=noise(9))})
+    kinds = [block['type'] for block in sent[2]]
+    assert kinds == ['image'] * 5 + ['text', 'image', 'text'], kinds
+    assert sent[2][5]['text'].startswith("Mobile view (390px wide") and encoded_on == [False], encoded_on
+
+    # Traces keep the numbers but redact page text in the examples
+    with tempfile.TemporaryDirectory() as directory:
+        recorder = TraceRecorder(directory, content='redacted', sample_rate=1.0)
+        trace = recorder.start('url', 'https://site.com')
+        trace.add_capture('https://site.com', {'screenshots': [], 'metrics': metrics, 'viewports': {'mobile': mobile}})
+        stored = trace.data['capture']
+        assert stored['metrics']['tap_targets']['smallest'][0]['text'] == '[email]'
+        assert stored['metrics']['contrast']['failures'] == 4
+        assert stored['viewports']['mobile']['tap_targets']['under_44'] == 12
+        recorder.finish(trace)
+
+    print("[PASS] Page metrics tests passed!")
+
+
 def test_evaluators():
     """Test evaluator initialization."""
     print("\n=== Testing Evaluators ===")
 
+    # Page structure block for hybrid URL reviews
+    structure = PortfolioEvaluator.format_page_structure(
+        headings=[(1, "Jane Doe"), (2, "Case Study: Checkout")],
+        image_alts=["Wireframe of checkout", None, ""]
+    )
+    assert "  - H2: Case Study: Checkout" in structure
+    assert "Images: 3 (2 without alt text)" in structure
+    assert PortfolioEvaluator.format_page_structure() == ''
+
     api_key = os.getenv('CLAUDE_API_KEY')
 
     if not api_key:
@@ -153,7 +1203,24 @@ async def main():
     try:
         test_file_detector()
         test_pdf_processor()
+        test_image_dedup()
+        test_text_normalizer()
+        test_text_sections()
+        await test_revision_history()
+        await test_case_study_review()
+        test_minhash_index()
+        await test_review_store()
+        await test_job_queue()
+        await test_progress_tracker()
+        await test_deadline()
+        await test_attachment_download()
+        await test_url_ingest()
+        await test_resource_controller()
+        await test_stage_executor()
+        await test_trace_recorder()
         await test_screenshot_service()
+        await test_capture_service()
+        await test_page_metrics()
         test_evaluators()
 
         print("\n" + "=" * 60)
@@ -0,0 +1,242 @@
+"""
+Benchmark the PDF extraction backends in utils/pdf_backends.py.
+
+Without arguments a synthetic corpus is generated that mimics the uploads
+the bot sees: single-column resumes, two-column resumes, kerned
+design-tool exports (word gaps encoded as TJ offsets), letter-spaced
+headings and long multi-page portfolios with running headers. Because the
+text of each document is known, word recall and reading order can be
+measured exactly. Point --corpus at a directory of real PDFs to also
+compare speed and text_quality() on those.
+
+Usage:
+    python tools/benchmark_pdf_backends.py
+    python tools/benchmark_pdf_backends.py --corpus ~/pdfs --repeat 3
+"""
+import argparse
+import difflib
+import os
+import random
+import re
+import statistics
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.pdf_backends import BACKENDS, text_quality  # noqa: E402
+
+WORDS = (
+    "user research usability testing wireframes prototype figma interviews personas journey "
+    "design system accessibility checkout conversion onboarding stakeholders insights iteration "
+    "dashboard mobile responsive typography layout metrics outcome impact problem solution "
+    "collaborated led improved reduced increased delivered analyzed synthesized facilitated"
+).split()
+
+
+def _escape(text: str) -> str:
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def write_pdf(path: str, pages: List[List[Tuple[float, float, str, str]]]):
+    """
+    Write a minimal PDF with Helvetica text.
+
+    Args:
+        path: Output file
+        pages: Per page, a list of (x, y, mode, text) where mode is 'plain',
+            'kerned' (word gaps as TJ offsets, no space characters) or
+            'spaced' (letter spacing via Tc)
+    """
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in below
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    ]
+    page_ids = []
+    for lines in pages:
+        ops = []
+        for x, y, mode, text in lines:
+            if mode == 'kerned':
+                parts = ' '.join(f"({_escape(word)}) -280" for word in text.split())
+                ops.append(f"BT /F1 10 Tf 0 Tc {x} {y} Td [{parts}] TJ ET")
+            elif mode == 'spaced':
+                ops.append(f"BT /F1 10 Tf 4 Tc {x} {y} Td ({_escape(text)}) Tj ET")
+            else:
+                ops.append(f"BT /F1 10 Tf 0 Tc {x} {y} Td ({_escape(text)}) Tj ET")
+        stream = '\n'.join(ops)
+        objects.append(f"<< /Length {len(stream.encode('latin-1'))} >>\nstream\n{stream}\nendstream")
+        content_id = len(objects)
+        objects.append(
+            "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>"
+        )
+        page_ids.append(len(objects))
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(f'{i} 0 R' for i in page_ids)}] /Count {len(page_ids)} >>"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode('latin-1')
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode('latin-1')
+    for offset in offsets:
+        out += f"{offset:010d} 00000 n \n".encode('latin-1')
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode('latin-1')
+    with open(path, 'wb') as f:
+        f.write(out)
+
+
+def _sentence(rng: random.Random, words: int = 9) -> str:
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+def synthesize_corpus(directory: str, seed: int = 0) -> Dict[str, str]:
+    """
+    Generate the synthetic corpus.
+
+    Returns:
+        Mapping of PDF path to its ground-truth text in reading order
+    """
+    rng = random.Random(seed)
+    corpus = {}
+
+    def add(name: str, pages: List[List[Tuple[float, float, str, str]]], truth: List[str]):
+        path = os.path.join(directory, f"{name}.pdf")
+        write_pdf(path, pages)
+        corpus[path] = '\n'.join(truth)
+
+    for i in range(4):
+        lines = [_sentence(rng) for _ in range(45)]
+        add(f"resume_single_{i}", [[(60, 740 - 15 * n, 'plain', line) for n, line in enumerate(lines)]], lines)
+
+    for i in range(4):
+        left = [_sentence(rng, 5) for _ in range(40)]
+        right = [_sentence(rng, 5) for _ in range(40)]
+        page = [(50, 740 - 15 * n, 'plain', line) for n, line in enumerate(left)]
+        page += [(320, 740 - 15 * n, 'plain', line) for n, line in enumerate(right)]
+        add(f"resume_two_column_{i}", [page], left + right)
+
+    for i in range(4):
+        lines = [_sentence(rng) for _ in range(40)]
+        add(f"export_kerned_{i}", [[(60, 740 - 15 * n, 'kerned', line) for n, line in enumerate(lines)]], lines)
+
+    for i in range(3):
+        headings = [' '.join(rng.sample(WORDS, 2)).upper() for _ in range(4)]
+        lines, truth = [], []
+        y = 740
+        for heading in headings:
+            lines.append((60, y, 'spaced', heading))
+            truth.append(heading)
+            y -= 20
+            for _ in range(8):
+                sentence = _sentence(rng)
+                lines.append((60, y, 'plain', sentence))
+                truth.append(sentence)
+                y -= 15
+        add(f"letter_spaced_{i}", [lines], truth)
+
+    for i, page_count in enumerate((12, 40)):
+        pages, truth = [], []
+        for p in range(page_count):
+            body = [_sentence(rng) for _ in range(35)]
+            pages.append(
+                [(60, 760, 'plain', 'Jane Doe Portfolio')]
+                + [(60, 720 - 15 * n, 'plain', line) for n, line in enumerate(body)]
+                + [(300, 30, 'plain', str(p + 1))]
+            )
+            truth += ['Jane Doe Portfolio'] + body + [str(p + 1)]
+        add(f"portfolio_{page_count}_pages", pages, truth)
+
+    return corpus
+
+
+def score_against_truth(text: str, truth: str) -> Tuple[float, float]:
+    """
+    Compare extracted text with the known text.
+
+    Returns:
+        Tuple of (word recall, reading-order similarity), both 0.0-1.0
+    """
+    extracted = re.findall(r'[a-z0-9]+', text.lower())
+    expected = re.findall(r'[a-z0-9]+', truth.lower())
+    remaining: Dict[str, int] = {}
+    for word in extracted:
+        remaining[word] = remaining.get(word, 0) + 1
+    found = 0
+    for word in expected:
+        if remaining.get(word):
+            remaining[word] -= 1
+            found += 1
+    recall = found / max(len(expected), 1)
+    order = difflib.SequenceMatcher(None, expected, extracted, autojunk=False).ratio()
+    return recall, order
+
+
+def run(corpus: Dict[str, Optional[str]], repeat: int) -> Dict[str, Dict[str, float]]:
+    """Extract every document with every installed backend and aggregate the results."""
+    results = {}
+    for name, backend_class in BACKENDS.items():
+        if not backend_class.available():
+            print(f"{name}: not installed, skipped")
+            continue
+        backend = backend_class()
+        per_page, quality, recall, order, failures = [], [], [], [], 0
+        for path, truth in corpus.items():
+            try:
+                timings = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    pages = list(backend.extract_pages(path))
+                    timings.append(time.perf_counter() - start)
+            except Exception as e:
+                print(f"{name}: failed on {os.path.basename(path)}: {e}")
+                failures += 1
+                continue
+            text = '\n'.join(pages)
+            per_page.append(min(timings) / max(len(pages), 1) * 1000)
+            quality.append(text_quality(text))
+            if truth is not None:
+                r, o = score_against_truth(text, truth)
+                recall.append(r)
+                order.append(o)
+        results[name] = {
+            'ms_per_page': statistics.median(per_page) if per_page else float('nan'),
+            'quality': statistics.mean(quality) if quality else float('nan'),
+            'recall': statistics.mean(recall) if recall else float('nan'),
+            'order': statistics.mean(order) if order else float('nan'),
+            'failures': failures,
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark PDF extraction backends.')
+    parser.add_argument('--corpus', help='Directory of PDFs to benchmark instead of the synthetic corpus')
+    parser.add_argument('--repeat', type=int, default=3, help='Timing repetitions per document (best is kept)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        if args.corpus:
+            corpus = {
+                os.path.join(args.corpus, name): None
+                for name in sorted(os.listdir(args.corpus)) if name.lower().endswith('.pdf')
+            }
+        else:
+            corpus = synthesize_corpus(directory)
+        print(f"Benchmarking {len(corpus)} documents\n")
+        results = run(corpus, args.repeat)
+
+    print(f"{'backend':<10} {'ms/page':>8} {'quality':>8} {'recall':>7} {'order':>6} {'failed':>6}")
+    for name, r in sorted(results.items(), key=lambda item: item[1]['ms_per_page']):
+        print(
+            f"{name:<10} {r['ms_per_page']:>8.2f} {r['quality']:>8.3f} "
+            f"{r['recall']:>7.3f} {r['order']:>6.3f} {r['failures']:>6}"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,317 @@
+"""
+Replay recorded review jobs through the current code and compare performance.
+
+Archives written by utils/trace_recorder.py (TRACE_DIR) are fed back through
+ReviewPipeline. The current FileDetector, PDFProcessor, PDFRasterizer and
+evaluators (prompt building, image preparation) run as in production. The
+LLM is stubbed with the recorded responses, and URL captures are served from
+the recorded screenshots ('full' traces) unless --live-capture reloads the
+page with ScreenshotService. Each replay is traced the same way, so stage timings, CPU
+time and RSS can be compared with the recording.
+
+What can be replayed depends on TRACE_CONTENT at recording time:
+- 'full': the original PDF runs through extraction, detection and review
+- 'redacted': detection and review run on the recorded (redacted) text; URL
+  jobs have no screenshots, so they need --live-capture for image content
+- 'hash': nothing to replay; the trace is only listed
+
+Usage:
+    python tools/replay_traces.py data/traces
+    python tools/replay_traces.py data/traces/2026*.zip --llm-latency recorded --json replay.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipeline import ReviewPipeline  # noqa: E402
+from utils import Deadline, ProgressTracker, ReviewQueue, Runtime, TraceRecorder  # noqa: E402
+from utils.trace_recorder import list_traces, load_trace  # noqa: E402
+
+
+class _StatusMessage:
+    async def edit(self, content=None):
+        pass
+
+
+class ReplayMessage:
+    """Stands in for the Discord message; collects replies."""
+
+    def __init__(self):
+        self.replies: List[str] = []
+        self.channel = self
+        self.author = None
+
+    async def reply(self, content, **kwargs):
+        self.replies.append(content)
+        return _StatusMessage()
+
+    async def send(self, content, **kwargs):
+        self.replies.append(content)
+        return _StatusMessage()
+
+
+class ReplayAttachment:
+    """PDF attachment served from an archive."""
+
+    def __init__(self, filename: str, data: bytes):
+        self.filename = filename
+        self.data = data
+        self.size = len(data)
+        self.url = None
+
+    async def read(self) -> bytes:
+        return self.data
+
+
+class RecordedLLM:
+    """Replacement for LLMClient._send answering with a trace's recorded responses."""
+
+    def __init__(self, calls: List[Dict[str, Any]], latency: str):
+        self.calls = list(calls)
+        self.latency = latency
+        self.matched = 0
+        self.missing = 0
+
+    async def __call__(self, model, content, max_tokens):
+        from evaluators.llm_client import LLMClient
+
+        prompt_sha256, _ = LLMClient.fingerprint(content)
+        call = next((c for c in self.calls if c['prompt_sha256'] == prompt_sha256), None)
+        if call is not None:
+            self.matched += 1
+        elif self.calls:
+            # Prompt changed since the recording: answer in recorded order
+            call = self.calls[0]
+        if call is None:
+            self.missing += 1
+            return "(no recorded response)", {}, 'end_turn'
+        self.calls.remove(call)
+        if self.latency == 'recorded':
+            await asyncio.sleep(call['latency'])
+        return call.get('response', "(response not recorded)"), call.get('usage', {}), call.get('stop_reason')
+
+
+class RecordedCapture:
+    """Replacement for ScreenshotService serving a trace's recorded capture."""
+
+    def __init__(self, trace: Dict[str, Any]):
+        capture = trace['capture'] or {}
+        self.capture = {
+            'screenshots': [trace['files'][s['file']] for s in capture.get('screenshots', []) if s.get('file')],
+            'url': trace['url'],
+            'title': '',
+            'text': capture.get('text', {}).get('text', ''),
+            'headings': [tuple(h) for h in capture.get('headings', [])],
+            'image_alts': capture.get('image_alts', []),
+            'metrics': capture.get('metrics'),
+            'page_height': capture.get('page_height'),
+            'captured_height': capture.get('captured_height'),
+            'truncation_note': capture.get('truncation_note'),
+            'viewports': {
+                name: dict(view, image=trace['files'][view['file']])
+                for name, view in capture.get('viewports', {}).items() if view.get('file')
+            },
+        }
+
+    async def capture_page(self, url, **kwargs):
+        return dict(self.capture)
+
+    async def capture_views(self, url, **kwargs):
+        return dict(self.capture)
+
+    async def get_page_text(self, url, timeout=30.0):
+        return self.capture['text']
+
+    async def close(self):
+        pass
+
+
+class ReplayRuntime(Runtime):
+    """Runtime with stubbed LLM and capture, no history/duplicate reuse, tracing into a temp dir."""
+
+    def __init__(self, trace: Dict[str, Any], recorder: TraceRecorder, llm_latency: str, live_capture: bool):
+        super().__init__(api_key='replay')
+        self.trace = trace
+        self.recorder = recorder
+        self.llm = RecordedLLM(trace['llm'], llm_latency)
+        self.live_capture = live_capture
+
+    @property
+    def trace_recorder(self):
+        return self.recorder
+
+    @property
+    def submission_history(self):
+        return None
+
+    @property
+    def duplicate_index(self):
+        return None
+
+    @property
+    def resume_evaluator(self):
+        evaluator = super().resume_evaluator
+        evaluator.client._send = self.llm
+        return evaluator
+
+    @property
+    def portfolio_evaluator(self):
+        evaluator = super().portfolio_evaluator
+        evaluator.client._send = self.llm
+        return evaluator
+
+    async def get_screenshot_service(self):
+        if self.live_capture:
+            return await super().get_screenshot_service()
+        return RecordedCapture(self.trace)
+
+
+async def replay_text(pipeline: ReviewPipeline, runtime: ReplayRuntime, trace: Dict[str, Any]):
+    """Replay PDF documents recorded without the PDF: detection and review from the recorded text."""
+    from utils import FileDetector
+
+    message = ReplayMessage()
+    recorded = runtime.recorder.start('pdf', trace['label'])
+    deadline = Deadline()
+    try:
+        for document in trace['documents']:
+            text = document['text'].get('text')
+            if not text:
+                continue
+            tracker = ProgressTracker(message, document['filename'])
+            start = time.monotonic()
+            file_type, _ = FileDetector.detect_incremental(text.split('\n\n'), document['filename'])
+            deadline.record('detect', time.monotonic() - start)
+            if len(text) >= 50:
+                await pipeline._review_text(file_type, text, document['filename'], None, tracker, deadline)
+    finally:
+        runtime.recorder.finish(recorded, deadline, {'replay': 'text only'})
+
+
+async def replay(path: str, llm_latency: str, live_capture: bool, directory: str) -> Optional[Dict[str, Any]]:
+    """
+    Replay one archive.
+
+    Returns:
+        Dict with the recorded and replayed trace summaries, or None if the
+        archive holds nothing replayable
+    """
+    trace = load_trace(path)
+    recorder = TraceRecorder(directory, content='hash')
+    runtime = ReplayRuntime(trace, recorder, llm_latency, live_capture)
+    pipeline = ReviewPipeline(runtime, ReviewQueue(max_concurrent=1))
+    message = ReplayMessage()
+    mode = None
+    # Build the evaluators up front: the recorded job ran in a warm process
+    runtime.resume_evaluator, runtime.portfolio_evaluator
+
+    try:
+        if trace['kind'] in ('pdf', 'pdfs'):
+            documents = trace['documents']
+            if documents and all(d.get('pdf_file') for d in documents):
+                mode = 'full'
+                attachments = [ReplayAttachment(d['filename'], trace['files'][d['pdf_file']]) for d in documents]
+                await pipeline.process_pdfs(attachments, message)
+            elif any(d['text'].get('text') for d in documents):
+                mode = 'text only'
+                await replay_text(pipeline, runtime, trace)
+        elif trace['kind'] == 'url' and trace['content'] != 'hash' and (trace['capture'] or live_capture):
+            mode = 'live capture' if live_capture else 'recorded capture'
+            await pipeline.process_url(trace['url'], message)
+    finally:
+        await runtime.close()
+
+    if mode is None or not recorder.recent:
+        return None
+    return {
+        'archive': os.path.basename(path),
+        'kind': trace['kind'],
+        'mode': mode,
+        'before': summarize(trace),
+        'after': summarize(recorder.recent[-1]),
+        'llm_matched': runtime.llm.matched,
+        'llm_missing': runtime.llm.missing,
+    }
+
+
+def summarize(trace: Dict[str, Any]) -> Dict[str, Any]:
+    """Timings and resource use of a trace, with model latency split out."""
+    llm_seconds = sum(call['latency'] for call in trace['llm'])
+    start, end = trace['resources'].get('start', {}), trace['resources'].get('end', {})
+    return {
+        'stages': trace['stages'],
+        'total_seconds': trace.get('total_seconds', 0.0),
+        'llm_seconds': llm_seconds,
+        # Time spent in our own code: the comparable number when LLM latency is stubbed out
+        'local_seconds': max(trace.get('total_seconds', 0.0) - llm_seconds, 0.0),
+        'cpu_seconds': end.get('cpu_seconds', 0.0) - start.get('cpu_seconds', 0.0),
+        'rss_mb': end.get('rss_mb'),
+        'llm_calls': len(trace['llm']),
+        'fallbacks': trace['fallbacks'],
+        'error': trace['error'],
+    }
+
+
+def _change(before: float, after: float) -> str:
+    if not before:
+        return ''
+    return f"{(after - before) / before:+.0%}"
+
+
+def print_result(result: Dict[str, Any]):
+    before, after = result['before'], result['after']
+    print(f"\n{result['archive']} ({result['kind']}, {result['mode']}; "
+          f"{result['llm_matched']} prompts unchanged, {result['llm_missing']} without recorded response)")
+    print(f"  {'stage':<16} {'before':>9} {'after':>9} {'change':>7}")
+    for stage in sorted(set(before['stages']) | set(after['stages'])):
+        b, a = before['stages'].get(stage, 0.0), after['stages'].get(stage, 0.0)
+        print(f"  {stage:<16} {b:>8.3f}s {a:>8.3f}s {_change(b, a):>7}")
+    for key in ('local_seconds', 'cpu_seconds'):
+        b, a = before[key], after[key]
+        print(f"  {key:<16} {b:>8.3f}s {a:>8.3f}s {_change(b, a):>7}")
+    if before['rss_mb'] is not None and after['rss_mb'] is not None:
+        print(f"  {'rss_mb':<16} {before['rss_mb']:>9.0f} {after['rss_mb']:>9.0f}")
+    if after['error']:
+        print(f"  replay error: {after['error']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay recorded review jobs against the current code.')
+    parser.add_argument('paths', nargs='+', help='Trace archives or directories of archives')
+    parser.add_argument('--llm-latency', choices=['zero', 'recorded'], default='zero',
+                        help='Answer stubbed LLM calls immediately or after the recorded latency')
+    parser.add_argument('--live-capture', action='store_true', help='Reload URLs with Chromium instead of recorded captures')
+    parser.add_argument('--json', help='Also write the results to this file')
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for path in list_traces(args.paths):
+            result = asyncio.run(replay(path, args.llm_latency, args.live_capture, directory))
+            if result is None:
+                print(f"\n{os.path.basename(path)}: nothing to replay (recorded with TRACE_CONTENT=hash?)")
+                continue
+            print_result(result)
+            results.append(result)
+
+    if results:
+        before = [r['before']['local_seconds'] for r in results]
+        after = [r['after']['local_seconds'] for r in results]
+        print(f"\n{len(results)} jobs replayed; median local time "
+              f"{statistics.median(before):.3f}s -> {statistics.median(after):.3f}s "
+              f"({_change(statistics.median(before), statistics.median(after))})")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=1, default=str)
+
+
+if __name__ == '__main__':
+    main()
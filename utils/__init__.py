@@ -1,5 +1,38 @@
-from .file_detector import FileDetector
-from .pdf_processor import PDFProcessor
-from .screenshot_service import ScreenshotService
+import importlib
 
-__all__ = ['FileDetector', 'PDFProcessor', 'ScreenshotService']
+# Exports are imported on first access so that heavy dependencies
+# (PDF libraries, Playwright, validators) stay off the startup path.
+_EXPORTS = {
+    'FileDetector': '.file_detector',
+    'PDFProcessor': '.pdf_processor',
+    'ScreenshotService': '.screenshot_service',
+    'ProgressTracker': '.progress_tracker',
+    'ReviewQueue': '.progress_tracker',
+    'Runtime': '.runtime',
+    'JobQueue': '.job_queue',
+    'PDFRasterizer': '.pdf_rasterizer',
+    'ImageDeduplicator': '.image_dedup',
+    'TextSections': '.text_sections',
+    'SubmissionHistory': '.submission_history',
+    'ReviewStore': '.review_store',
+    'MinHashIndex': '.minhash_index',
+    'TextNormalizer': '.text_normalizer',
+    'Deadline': '.deadline',
+    'DeadlineExceeded': '.deadline',
+    'AttachmentDownloader': '.attachment_download',
+    'DownloadRejected': '.attachment_download',
+    'TraceRecorder': '.trace_recorder',
+    'StageExecutor': '.stage_executor',
+    'URLIngestor': '.url_ingest',
+    'LinkedPDF': '.url_ingest',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
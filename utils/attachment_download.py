@@ -0,0 +1,126 @@
+"""
+Streaming, size-capped download of PDF attachments.
+
+attachment.read() buffers a whole upload in memory. Here the declared size
+is checked before anything is fetched, the body is streamed from the CDN in
+chunks into a SpooledTemporaryFile (in memory while small, on disk beyond
+that) and the download is aborted as soon as it passes the byte cap. The
+PDF signature is checked on the first chunk, so a renamed file is rejected
+without downloading the rest.
+"""
+import os
+import tempfile
+from typing import IO, AsyncIterator
+
+# Largest PDF accepted for review
+MAX_PDF_BYTES = int(os.getenv('MAX_PDF_BYTES', str(25 * 1024 * 1024)))
+
+# Downloads larger than this are spooled to disk instead of memory
+SPOOL_MAX_BYTES = int(os.getenv('DOWNLOAD_SPOOL_BYTES', str(2 * 1024 * 1024)))
+
+CHUNK_SIZE = 64 * 1024
+
+# The PDF header may be preceded by junk, but must start within the first 1024 bytes
+PDF_MAGIC = b'%PDF-'
+MAGIC_WINDOW = 1024
+
+
+class DownloadRejected(Exception):
+    """The attachment is too large or not a PDF; the message is shown to the user."""
+
+
+class AttachmentDownloader:
+    """Downloads attachments in chunks with a hard byte cap."""
+
+    @staticmethod
+    def check_size(attachment, max_bytes: int = MAX_PDF_BYTES):
+        """
+        Reject an attachment whose declared size is over the cap.
+
+        Args:
+            attachment: discord.py Attachment (or anything with .size)
+            max_bytes: Byte cap
+
+        Raises:
+            DownloadRejected: If the declared size exceeds max_bytes
+        """
+        size = getattr(attachment, 'size', None) or 0
+        if size > max_bytes:
+            raise DownloadRejected(
+                f"This PDF is {size / 1024 / 1024:.1f} MB; the limit is {max_bytes / 1024 / 1024:.0f} MB. "
+                "Try compressing it or exporting at a lower image quality."
+            )
+
+    @staticmethod
+    async def iter_chunks(attachment, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+        """
+        Stream the attachment body.
+
+        Args:
+            attachment: Object with a CDN .url (discord.py Attachment or the
+                worker's RemoteAttachment); objects without one are read whole
+            chunk_size: Bytes per chunk
+
+        Yields:
+            Chunks of the body
+        """
+        url = getattr(attachment, 'url', None)
+        if not url:
+            yield await attachment.read()
+            return
+
+        import aiohttp
+
+        async with aiohttp.ClientSession() as session:
+            async with session.get(url) as response:
+                response.raise_for_status()
+                async for chunk in response.content.iter_chunked(chunk_size):
+                    yield chunk
+
+    @staticmethod
+    async def download(
+        attachment,
+        max_bytes: int = MAX_PDF_BYTES,
+        spool_bytes: int = SPOOL_MAX_BYTES
+    ) -> IO[bytes]:
+        """
+        Download a PDF attachment into a spooled temporary file.
+
+        Args:
+            attachment: discord.py Attachment or compatible object
+            max_bytes: Byte cap; the download stops as soon as it is passed
+            spool_bytes: Size above which the buffer moves from memory to disk
+
+        Returns:
+            SpooledTemporaryFile positioned at the start (the caller closes it)
+
+        Raises:
+            DownloadRejected: If the attachment is too large or not a PDF
+        """
+        AttachmentDownloader.check_size(attachment, max_bytes)
+
+        buffer = tempfile.SpooledTemporaryFile(max_size=spool_bytes)
+        received = 0
+        head = b''
+        try:
+            async for chunk in AttachmentDownloader.iter_chunks(attachment):
+                received += len(chunk)
+                if received > max_bytes:
+                    raise DownloadRejected(
+                        f"This PDF is larger than the {max_bytes / 1024 / 1024:.0f} MB limit. "
+                        "Try compressing it or exporting at a lower image quality."
+                    )
+                if len(head) < MAGIC_WINDOW:
+                    head += chunk[:MAGIC_WINDOW - len(head)]
+                    if len(head) >= MAGIC_WINDOW and PDF_MAGIC not in head:
+                        raise DownloadRejected("This file doesn't look like a PDF. Try exporting it again as PDF.")
+                buffer.write(chunk)
+
+            if PDF_MAGIC not in head:
+                raise DownloadRejected("This file doesn't look like a PDF. Try exporting it again as PDF.")
+        except BaseException:
+            buffer.close()
+            raise
+
+        buffer.seek(0)
+        return buffer
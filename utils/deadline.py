@@ -0,0 +1,127 @@
+"""
+End-to-end deadlines for review jobs.
+
+Every job gets one deadline. Each stage (download, text extraction,
+rendering, page capture, model call) runs under a budget that is the
+smaller of its own allowance and the time left on the job, so a slow stage
+cannot push the whole review past the point where the user gives up.
+Stages that run out of budget raise DeadlineExceeded, and the pipeline
+degrades (text-only review, faster model) instead of failing. Time spent
+per stage and the fallbacks used are recorded for the job's log line.
+"""
+import asyncio
+import os
+import time
+from typing import Any, Awaitable, Dict, List, Optional
+
+# Per-stage allowances in seconds; each stage also gets at most what is left of the job
+DEFAULT_BUDGETS = {
+    'download': 20.0,
+    'extract': 20.0,
+    'render': 30.0,
+    'capture': 45.0,
+    'text_fallback': 20.0,
+    'evaluate': 90.0,
+    # Case study reviews run in parallel; the overview written from them must still fit
+    'case_study': 60.0,
+    'reduce': 30.0,
+}
+
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """A stage ran out of budget."""
+
+    def __init__(self, stage: str, budget: float):
+        super().__init__(f"{stage} exceeded its {budget:.1f}s budget")
+        self.stage = stage
+        self.budget = budget
+
+
+class Deadline:
+    """Job deadline split into per-stage budgets, with timing and fallback records."""
+
+    def __init__(self, total: Optional[float] = None, budgets: Optional[Dict[str, float]] = None):
+        """
+        Initialize deadline.
+
+        Args:
+            total: Seconds until the whole job must be answered
+                (default: REVIEW_DEADLINE env, 150)
+            budgets: Per-stage allowances overriding DEFAULT_BUDGETS
+        """
+        self.total = total if total is not None else float(os.getenv('REVIEW_DEADLINE', '150'))
+        self.budgets = {**DEFAULT_BUDGETS, **(budgets or {})}
+        self.started = time.monotonic()
+        self.expires_at = self.started + self.total
+        self.timings: Dict[str, float] = {}
+        self.fallbacks: List[str] = []
+
+    def remaining(self) -> float:
+        """Seconds left on the job (never negative)."""
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def elapsed(self) -> float:
+        """Seconds since the deadline started."""
+        return time.monotonic() - self.started
+
+    def budget(self, stage: str, reserve: float = 0.0) -> float:
+        """
+        Time available to a stage.
+
+        Args:
+            stage: Stage name
+            reserve: Seconds to keep back for later stages
+
+        Returns:
+            min(stage allowance, time left minus reserve), at least 0
+        """
+        allowance = self.budgets.get(stage, self.total)
+        return max(min(allowance, self.remaining() - reserve), 0.0)
+
+    async def run(self, stage: str, awaitable: Awaitable[Any], budget: Optional[float] = None, reserve: float = 0.0) -> Any:
+        """
+        Await a stage within its budget and record how long it took.
+
+        Args:
+            stage: Stage name
+            awaitable: Coroutine or future doing the stage's work
+            budget: Explicit budget (still capped by the time left)
+            reserve: Seconds to keep back for later stages
+
+        Returns:
+            Result of the awaitable
+
+        Raises:
+            DeadlineExceeded: If the budget runs out (the work is cancelled)
+        """
+        limit = self.budget(stage, reserve) if budget is None else max(min(budget, self.remaining() - reserve), 0.0)
+        start = time.monotonic()
+        try:
+            if limit <= 0:
+                if asyncio.iscoroutine(awaitable):
+                    awaitable.close()
+                raise DeadlineExceeded(stage, limit)
+            return await asyncio.wait_for(awaitable, timeout=limit)
+        except asyncio.TimeoutError as e:
+            if isinstance(e, DeadlineExceeded):
+                raise
+            raise DeadlineExceeded(stage, limit) from None
+        finally:
+            self.record(stage, time.monotonic() - start)
+
+    def record(self, stage: str, seconds: float):
+        """Add time spent in a stage."""
+        self.timings[stage] = self.timings.get(stage, 0.0) + seconds
+
+    def fallback(self, description: str):
+        """Record that the job degraded (e.g. 'capture -> text only')."""
+        self.fallbacks.append(description)
+
+    def report(self) -> str:
+        """Format stage timings and fallbacks as a single log line."""
+        elapsed = self.elapsed()
+        parts = [f"{stage}: {seconds:.2f}s" for stage, seconds in self.timings.items()]
+        parts.append(f"total: {elapsed:.2f}s/{self.total:.0f}s")
+        if self.fallbacks:
+            parts.append(f"fallbacks: {', '.join(self.fallbacks)}")
+        return ' | '.join(parts)
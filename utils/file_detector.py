@@ -2,7 +2,7 @@
 File type detection for resume vs portfolio identification.
 """
 import re
-from typing import Tuple
+from typing import Iterable, Tuple
 
 
 class FileDetector:
@@ -138,3 +138,44 @@ class FileDetector:
         else:
             # Default to portfolio if uncertain (original bot behavior)
             return 'portfolio' if text_type == 'unknown' else text_type
+
+    @staticmethod
+    def detect_incremental(
+        pages: Iterable[str],
+        filename: str = '',
+        min_confidence: float = 0.8,
+        min_chars: int = 1500
+    ) -> Tuple[str, int]:
+        """
+        Detect the type from the first pages, stopping once confident.
+
+        A confident filename decides without reading any page. Otherwise the
+        text is classified after each page once min_chars have been seen, and
+        reading stops at the first confident result; if none comes, detect()
+        decides on everything read.
+
+        Args:
+            pages: Page texts in order (may be a lazy iterator)
+            filename: Optional filename
+            min_confidence: Text confidence that ends detection early
+            min_chars: Text needed before an early decision is trusted
+
+        Returns:
+            Tuple of ('resume' | 'portfolio', number of pages read)
+        """
+        filename_type, filename_conf = FileDetector.detect_from_filename(filename)
+        if filename_conf >= 0.8:
+            return filename_type, 0
+
+        text = ''
+        pages_read = 0
+        for page in pages:
+            text = f"{text}\n\n{page}" if text else page
+            pages_read += 1
+            if len(text) < min_chars:
+                continue
+            text_type, text_conf = FileDetector.detect_from_text(text)
+            if text_type != 'unknown' and text_conf >= min_confidence:
+                return text_type, pages_read
+
+        return FileDetector.detect(text, filename), pages_read
@@ -0,0 +1,222 @@
+"""
+Perceptual deduplication of screenshot tiles before vision calls.
+
+Full-page captures are split into viewport-shaped tiles. Tiles that are
+blank (almost all background) or perceptually identical to a tile already
+kept (repeated hero banners, near-identical gallery rows) are dropped, so
+the vision model only pays tokens for distinct sections of the page.
+"""
+import io
+from typing import Any, Dict, List, Tuple, Union
+from PIL import Image
+
+
+class ImageDeduplicator:
+    """Tiles images and drops blank or near-duplicate tiles using difference hashes."""
+
+    def __init__(
+        self,
+        hash_size: int = 8,
+        max_distance: int = 5,
+        blank_threshold: float = 0.005,
+        tile_aspect: float = 0.5625,
+        jpeg_quality: int = 85,
+        max_source_pixels: int = 40_000_000
+    ):
+        """
+        Initialize deduplicator.
+
+        Args:
+            hash_size: dHash grid size (hash has hash_size**2 bits)
+            max_distance: Maximum Hamming distance for two tiles to count as duplicates
+            blank_threshold: Tiles with a smaller fraction of non-background pixels are blank
+            tile_aspect: Tile height as a fraction of image width (0.5625 = 16:9)
+            jpeg_quality: JPEG quality of the emitted tiles
+            max_source_pixels: Larger sources are downscaled first, bounding memory
+        """
+        self.hash_size = hash_size
+        self.max_distance = max_distance
+        self.blank_threshold = blank_threshold
+        self.tile_aspect = tile_aspect
+        self.jpeg_quality = jpeg_quality
+        self.max_source_pixels = max_source_pixels
+
+    @staticmethod
+    def dhash(image: Image.Image, hash_size: int = 8) -> int:
+        """
+        Compute a difference hash: brightness gradients of a tiny grayscale thumbnail.
+
+        Args:
+            image: Image to hash
+            hash_size: Grid size
+
+        Returns:
+            Hash as an integer of hash_size**2 bits
+        """
+        small = image.convert('L').resize((hash_size + 1, hash_size), Image.BILINEAR)
+        pixels = list(small.getdata())
+        value = 0
+        for row in range(hash_size):
+            for col in range(hash_size):
+                left = pixels[row * (hash_size + 1) + col]
+                right = pixels[row * (hash_size + 1) + col + 1]
+                value = (value << 1) | (left > right)
+        return value
+
+    @staticmethod
+    def estimate_tokens(width: int, height: int) -> int:
+        """
+        Estimate vision tokens for an image (about width * height / 750 after
+        the API downscales it to a 1568px long edge, capped near 1600).
+
+        Args:
+            width: Image width in pixels
+            height: Image height in pixels
+
+        Returns:
+            Estimated token count
+        """
+        scale = min(1.0, 1568 / max(width, height, 1))
+        return min(int(width * scale * height * scale / 750), 1600)
+
+    def is_blank(self, image: Image.Image) -> bool:
+        """
+        Whether a tile is (almost) entirely background.
+
+        Args:
+            image: Tile to check
+
+        Returns:
+            True if fewer than blank_threshold of the pixels differ from the dominant shade
+        """
+        gray = image.convert('L').resize((128, max(1, int(128 * image.height / max(image.width, 1)))))
+        histogram = gray.histogram()
+        background = max(range(256), key=lambda shade: histogram[shade])
+        # Shades within a small band around the background count as background
+        near = sum(histogram[max(0, background - 8):background + 9])
+        total = gray.width * gray.height
+        return (total - near) / max(total, 1) < self.blank_threshold
+
+    def split_tiles(self, image: Image.Image) -> List[Image.Image]:
+        """
+        Split a tall image into viewport-shaped tiles.
+
+        Images no taller than twice their width (e.g. rendered PDF pages) are
+        kept whole.
+
+        Args:
+            image: Source image
+
+        Returns:
+            Tiles from top to bottom
+        """
+        if image.height <= image.width * 2:
+            return [image]
+        tile_height = max(1, int(image.width * self.tile_aspect))
+        tiles = []
+        for top in range(0, image.height, tile_height):
+            bottom = min(top + tile_height, image.height)
+            # Fold a thin remainder into the previous tile
+            if tiles and bottom - top < tile_height // 4:
+                previous_top = top - tile_height
+                tiles[-1] = image.crop((0, previous_top, image.width, bottom))
+                break
+            tiles.append(image.crop((0, top, image.width, bottom)))
+        return tiles
+
+    def deduplicate(
+        self,
+        sources: List[Union[str, bytes]],
+        max_tiles: int = 10
+    ) -> Tuple[List[bytes], Dict[str, Any]]:
+        """
+        Tile the source images and keep only distinct, non-blank tiles.
+
+        At least one tile per source image is always kept. When more distinct
+        tiles remain than max_tiles, an evenly spread subset is returned and
+        the tiles left out are counted as capped.
+
+        Args:
+            sources: Image file paths or encoded image bytes
+            max_tiles: Maximum number of tiles returned
+
+        Returns:
+            Tuple of (JPEG-encoded tiles, report dict with tile counts, the
+            estimated tokens and bytes before and after, and peak_bytes, an
+            estimate of the largest working set while processing)
+        """
+        report = {
+            'tiles_total': 0,
+            'blank_dropped': 0,
+            'duplicates_dropped': 0,
+            'capped': 0,
+            'tiles_kept': 0,
+            'tokens_before': 0,
+            'tokens_after': 0,
+            'bytes_before': 0,
+            'bytes_after': 0,
+            'peak_bytes': 0,
+        }
+        kept: List[Image.Image] = []
+        kept_hashes: List[int] = []
+
+        for source in sources:
+            if isinstance(source, (bytes, bytearray)):
+                data = source
+            else:
+                with open(source, 'rb') as f:
+                    data = f.read()
+            report['bytes_before'] += len(data)
+
+            # Only one decoded source is alive at a time
+            image = Image.open(io.BytesIO(data))
+            if image.width * image.height > self.max_source_pixels:
+                scale = (self.max_source_pixels / (image.width * image.height)) ** 0.5
+                image = image.resize((int(image.width * scale), int(image.height * scale)))
+            image = image.convert('RGB')
+            kept_pixels = sum(tile.width * tile.height for tile in kept)
+            report['peak_bytes'] = max(
+                report['peak_bytes'],
+                len(data) + (image.width * image.height + kept_pixels) * 3
+            )
+            del data
+
+            kept_from_source = 0
+            tiles = self.split_tiles(image)
+            for tile in tiles:
+                report['tiles_total'] += 1
+                report['tokens_before'] += self.estimate_tokens(tile.width, tile.height)
+
+                if self.is_blank(tile):
+                    report['blank_dropped'] += 1
+                    continue
+
+                tile_hash = self.dhash(tile, self.hash_size)
+                if any(bin(tile_hash ^ other).count('1') <= self.max_distance for other in kept_hashes):
+                    report['duplicates_dropped'] += 1
+                    continue
+
+                kept.append(tile)
+                kept_hashes.append(tile_hash)
+                kept_from_source += 1
+
+            if kept_from_source == 0 and tiles:
+                # Never drop a whole source; keep its first tile
+                kept.append(tiles[0])
+                kept_hashes.append(self.dhash(tiles[0], self.hash_size))
+
+        if len(kept) > max_tiles:
+            report['capped'] = len(kept) - max_tiles
+            step = (len(kept) - 1) / max(max_tiles - 1, 1)
+            kept = [kept[round(i * step)] for i in range(max_tiles)]
+
+        encoded = []
+        for tile in kept:
+            buffer = io.BytesIO()
+            tile.save(buffer, format='JPEG', quality=self.jpeg_quality, optimize=True)
+            encoded.append(buffer.getvalue())
+            report['tokens_after'] += self.estimate_tokens(tile.width, tile.height)
+            report['bytes_after'] += len(encoded[-1])
+        report['tiles_kept'] = len(encoded)
+
+        return encoded, report
@@ -0,0 +1,224 @@
+"""
+Durable local job queue backed by SQLite.
+
+The gateway process enqueues review jobs and worker processes claim them
+with a lease. A worker keeps its lease alive with heartbeats; if it dies,
+the lease expires and another worker (or the restarted one) picks the job
+up again, so in-flight jobs survive worker restarts. Delivery is
+at-least-once.
+"""
+import json
+import os
+import socket
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+
+class JobQueue:
+    """SQLite job queue with leased claims, shared by gateway and workers."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            worker TEXT,
+            lease_until REAL,
+            error TEXT,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_jobs_status_lease ON jobs (status, lease_until);
+    """
+
+    def __init__(self, path: str = 'data/jobs.db', max_attempts: int = 3):
+        """
+        Initialize job queue.
+
+        Args:
+            path: SQLite database file (shared by all processes on the node)
+            max_attempts: Claims allowed per job before it is marked failed
+        """
+        self.path = path
+        self.max_attempts = max_attempts
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(self.SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open a short-lived connection configured for multi-process access."""
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def default_worker_id() -> str:
+        """Worker identity used in leases: host and pid."""
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    def enqueue(self, kind: str, payload: Dict[str, Any]) -> int:
+        """
+        Add a job to the queue.
+
+        Args:
+            kind: Job type ('pdf' or 'url')
+            payload: JSON-serializable job description
+
+        Returns:
+            Job id
+        """
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO jobs (kind, payload, created_at, updated_at) VALUES (?, ?, ?, ?)",
+                (kind, json.dumps(payload), now, now)
+            )
+            return cursor.lastrowid
+
+    def claim(self, worker_id: str, lease_seconds: float = 60.0) -> Optional[Dict[str, Any]]:
+        """
+        Claim the oldest runnable job: queued, or running with an expired lease.
+
+        Args:
+            worker_id: Identity of the claiming worker
+            lease_seconds: Lease duration; renew with heartbeat()
+
+        Returns:
+            Job dict (id, kind, payload, attempts, created_at) or None if idle
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                # Jobs whose worker died too often are given up on
+                conn.execute(
+                    "UPDATE jobs SET status = 'failed', error = 'lease expired too often', updated_at = ? "
+                    "WHERE status = 'running' AND lease_until < ? AND attempts >= ?",
+                    (now, now, self.max_attempts)
+                )
+                row = conn.execute(
+                    "SELECT * FROM jobs WHERE status = 'queued' "
+                    "OR (status = 'running' AND lease_until < ?) "
+                    "ORDER BY id LIMIT 1",
+                    (now,)
+                ).fetchone()
+                if row is None:
+                    conn.execute('COMMIT')
+                    return None
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', worker = ?, lease_until = ?, "
+                    "attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                    (worker_id, now + lease_seconds, now, row['id'])
+                )
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+
+        return {
+            'id': row['id'],
+            'kind': row['kind'],
+            'payload': json.loads(row['payload']),
+            'attempts': row['attempts'] + 1,
+            'created_at': row['created_at'],
+        }
+
+    def heartbeat(self, job_id: int, worker_id: str, lease_seconds: float = 60.0) -> bool:
+        """
+        Extend a job's lease.
+
+        Args:
+            job_id: Job id
+            worker_id: Worker holding the lease
+            lease_seconds: New lease duration from now
+
+        Returns:
+            False if the lease was lost to another worker
+        """
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET lease_until = ?, updated_at = ? "
+                "WHERE id = ? AND worker = ? AND status = 'running'",
+                (now + lease_seconds, now, job_id, worker_id)
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, job_id: int, worker_id: Optional[str] = None) -> bool:
+        """
+        Mark a job as done.
+
+        Args:
+            job_id: Job id
+            worker_id: Worker that ran it; the job is left alone if another worker holds it now
+
+        Returns:
+            False if the job was not updated
+        """
+        return self._finish(job_id, 'done', None, worker_id)
+
+    def fail(self, job_id: int, error: str, worker_id: Optional[str] = None) -> bool:
+        """Mark a job as failed (it will not be retried); see complete()."""
+        return self._finish(job_id, 'failed', error, worker_id)
+
+    def _finish(self, job_id: int, status: str, error: Optional[str], worker_id: Optional[str]) -> bool:
+        query = "UPDATE jobs SET status = ?, error = ?, lease_until = NULL, updated_at = ? WHERE id = ?"
+        params = [status, error, time.time(), job_id]
+        if worker_id is not None:
+            query += " AND worker = ? AND status = 'running'"
+            params.append(worker_id)
+        with self._connect() as conn:
+            return conn.execute(query, params).rowcount == 1
+
+    def position(self, job_id: int) -> int:
+        """
+        Queue position of a job (1 = next to be claimed, 0 = not queued).
+
+        Args:
+            job_id: Job id
+
+        Returns:
+            Position among queued jobs
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND id <= ?",
+                (job_id,)
+            ).fetchone()
+            return row[0]
+
+    def stats(self) -> Dict[str, int]:
+        """Number of jobs per status."""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+            return {status: count for status, count in rows}
+
+    def purge_finished(self, older_than_seconds: float = 7 * 24 * 3600) -> int:
+        """
+        Delete finished jobs older than a cutoff.
+
+        Args:
+            older_than_seconds: Age threshold
+
+        Returns:
+            Number of deleted jobs
+        """
+        cutoff = time.time() - older_than_seconds
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed') AND updated_at < ?",
+                (cutoff,)
+            )
+            return cursor.rowcount
@@ -0,0 +1,291 @@
+"""
+On-disk MinHash/LSH index of reviewed documents.
+
+Many uploads are near-identical: the same resume template, or the same file
+with a line changed. Each reviewed document is reduced to a MinHash
+signature of its word shingles, and the signature is split into bands that
+are stored as indexed (band, bucket) rows in SQLite. A lookup is one indexed
+query for the bands of the new document, followed by a signature comparison
+for the few candidates that share a band, so its cost does not grow with
+the corpus.
+"""
+import hashlib
+import json
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from array import array
+from typing import Any, Dict, List, Optional, Set
+
+# Mersenne prime for the universal hash family (a * x + b) mod p
+_PRIME = (1 << 61) - 1
+_MAX_HASH = 0xFFFFFFFF
+
+
+class MinHashIndex:
+    """Finds near-duplicates of reviewed documents and returns their feedback."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS documents (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            file_type TEXT NOT NULL,
+            text_hash TEXT NOT NULL,
+            signature BLOB NOT NULL,
+            sections BLOB NOT NULL,
+            feedback TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            user_id INTEGER
+        );
+        CREATE TABLE IF NOT EXISTS bands (
+            band INTEGER NOT NULL,
+            bucket INTEGER NOT NULL,
+            doc_id INTEGER NOT NULL,
+            PRIMARY KEY (band, bucket, doc_id)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_bands_doc ON bands (doc_id);
+    """
+
+    def __init__(
+        self,
+        path: str = 'data/minhash.db',
+        num_perm: int = 128,
+        bands: int = 16,
+        shingle_size: int = 3,
+        max_documents: int = 200_000
+    ):
+        """
+        Initialize index.
+
+        With 16 bands of 8 rows, documents sharing about 70% of their
+        shingles become candidates; the final decision uses the full
+        signature similarity.
+
+        Args:
+            path: SQLite database file (shared by all processes on the node)
+            num_perm: Number of hash functions in a signature
+            bands: LSH bands (num_perm must be divisible by bands)
+            shingle_size: Words per shingle
+            max_documents: Oldest documents beyond this count are pruned
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.path = path
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.max_documents = max_documents
+        rng = random.Random(1)
+        self._perms = [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(num_perm)]
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # One long-lived connection: opening one per lookup would cost more than the lookup
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(self.SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(documents)")}
+        if 'user_id' not in columns:
+            try:
+                self._conn.execute("ALTER TABLE documents ADD COLUMN user_id INTEGER")
+            except sqlite3.OperationalError:
+                pass  # Added by another process in the meantime
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def normalize(text: str) -> List[str]:
+        """
+        Lowercase text and reduce it to alphanumeric words.
+
+        Args:
+            text: Extracted document text
+
+        Returns:
+            List of words
+        """
+        return re.sub(r'[^a-z0-9]+', ' ', text.lower()).split()
+
+    @staticmethod
+    def text_hash(text: str) -> str:
+        """Hash of the normalized text, identifying exact re-uploads."""
+        return hashlib.sha1(' '.join(MinHashIndex.normalize(text)).encode('utf-8')).hexdigest()
+
+    def shingles(self, text: str) -> Set[int]:
+        """
+        Hash every run of shingle_size consecutive words.
+
+        Args:
+            text: Extracted document text
+
+        Returns:
+            Set of 32-bit shingle hashes
+        """
+        words = self.normalize(text)
+        k = self.shingle_size
+        if len(words) <= k:
+            return {zlib.crc32(' '.join(words).encode('utf-8'))} if words else set()
+        return {zlib.crc32(' '.join(words[i:i + k]).encode('utf-8')) for i in range(len(words) - k + 1)}
+
+    def signature(self, text: str) -> List[int]:
+        """
+        Compute the MinHash signature of a document.
+
+        Args:
+            text: Extracted document text
+
+        Returns:
+            num_perm minimum hash values
+        """
+        shingles = self.shingles(text)
+        if not shingles:
+            return [_MAX_HASH] * self.num_perm
+        return [
+            min(((a * x + b) % _PRIME) & _MAX_HASH for x in shingles)
+            for a, b in self._perms
+        ]
+
+    @staticmethod
+    def similarity(first: List[int], second: List[int]) -> float:
+        """Estimated Jaccard similarity: share of equal signature values."""
+        return sum(1 for x, y in zip(first, second) if x == y) / max(len(first), 1)
+
+    def _band_keys(self, signature: List[int]) -> List[tuple]:
+        keys = []
+        for band in range(self.bands):
+            rows = array('I', signature[band * self.rows:(band + 1) * self.rows]).tobytes()
+            digest = hashlib.blake2b(rows, digest_size=8).digest()
+            keys.append((band, int.from_bytes(digest, 'big', signed=True)))
+        return keys
+
+    def query(
+        self,
+        text: str,
+        file_type: str,
+        threshold: float = 0.8,
+        signature: Optional[List[int]] = None,
+        user_id: Optional[int] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Find the most similar indexed document.
+
+        Args:
+            text: Extracted text of the new document
+            file_type: 'resume' or 'portfolio'; only documents of this type match
+            threshold: Minimum estimated similarity
+            signature: Precomputed signature of text (computed if omitted)
+            user_id: Uploader of the new document
+
+        Returns:
+            Dict with id, similarity, exact (normalized text identical and
+            indexed by the same user_id), sections and feedback of the best
+            match, or None
+        """
+        signature = signature or self.signature(text)
+        # One indexed probe per band; candidates must share at least one band
+        probes = ' UNION '.join('SELECT doc_id FROM bands WHERE band = ? AND bucket = ?' for _ in range(self.bands))
+        params = [value for key in self._band_keys(signature) for value in key]
+
+        with self._lock:
+            candidates = self._conn.execute(
+                f"SELECT id, signature FROM documents WHERE id IN ({probes}) AND file_type = ? "
+                "ORDER BY id DESC LIMIT 50",
+                params + [file_type]
+            ).fetchall()
+
+            best_id, best_score = None, threshold
+            for doc_id, blob in candidates:
+                score = self.similarity(signature, array('I', blob).tolist())
+                if score >= best_score:
+                    best_id, best_score = doc_id, score
+            if best_id is None:
+                return None
+
+            text_hash, sections, feedback, owner = self._conn.execute(
+                "SELECT text_hash, sections, feedback, user_id FROM documents WHERE id = ?",
+                (best_id,)
+            ).fetchone()
+
+        return {
+            'id': best_id,
+            'similarity': best_score,
+            # Another user's feedback is only ever adapted, never handed over verbatim
+            'exact': user_id is not None and owner == user_id and text_hash == self.text_hash(text),
+            'sections': json.loads(zlib.decompress(sections)),
+            'feedback': feedback,
+        }
+
+    def add(
+        self,
+        text: str,
+        file_type: str,
+        sections: List[Dict[str, str]],
+        feedback: str,
+        signature: Optional[List[int]] = None,
+        user_id: Optional[int] = None
+    ) -> int:
+        """
+        Index a reviewed document together with its feedback.
+
+        Args:
+            text: Extracted document text
+            file_type: 'resume' or 'portfolio'
+            sections: Section structure from TextSections.split()
+            feedback: Feedback sent for the document
+            signature: Precomputed signature of text (computed if omitted)
+            user_id: Uploader of the document
+
+        Returns:
+            Document id
+        """
+        signature = signature or self.signature(text)
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                cursor = self._conn.execute(
+                    "INSERT INTO documents (file_type, text_hash, signature, sections, feedback, created_at, user_id) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        file_type,
+                        self.text_hash(text),
+                        array('I', signature).tobytes(),
+                        zlib.compress(json.dumps(sections).encode('utf-8')),
+                        feedback,
+                        time.time(),
+                        user_id
+                    )
+                )
+                doc_id = cursor.lastrowid
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO bands (band, bucket, doc_id) VALUES (?, ?, ?)",
+                    [(band, bucket, doc_id) for band, bucket in self._band_keys(signature)]
+                )
+                if doc_id % 1000 == 0:
+                    self._prune(doc_id)
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        return doc_id
+
+    def _prune(self, newest_id: int):
+        """Drop documents older than the newest max_documents (called every 1000 inserts)."""
+        cutoff = newest_id - self.max_documents
+        if cutoff > 0:
+            self._conn.execute("DELETE FROM documents WHERE id <= ?", (cutoff,))
+            self._conn.execute("DELETE FROM bands WHERE doc_id <= ?", (cutoff,))
+
+    def count(self) -> int:
+        """Number of indexed documents."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
@@ -0,0 +1,278 @@
+"""
+Pluggable PDF text extraction backends.
+
+Each backend wraps one library behind the same page-by-page interface.
+Libraries are imported lazily, so a missing optional backend is skipped
+rather than breaking extraction. select_backend() samples the first pages
+with each candidate, scores the text with text_quality() and picks the
+best, preferring the faster backend when the quality is good enough.
+"""
+import re
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Default order, fastest first (see tools/benchmark_pdf_backends.py)
+DEFAULT_ORDER = ['pypdfium2', 'pypdf', 'pdfminer', 'pypdf2']
+
+_CID_ARTIFACT = re.compile(r'\(cid:\d+\)')
+_WORD = re.compile(r'\S+')
+
+
+class PDFBackend(ABC):
+    """Interface of an extraction backend."""
+
+    name = ''
+    module = ''
+
+    @classmethod
+    def available(cls) -> bool:
+        """Whether the backend's library is installed."""
+        try:
+            __import__(cls.module)
+            return True
+        except ImportError:
+            return False
+
+    @abstractmethod
+    def extract_pages(self, pdf_path: str, start: int = 0, stop: Optional[int] = None) -> Iterator[str]:
+        """
+        Yield the text of pages start..stop-1.
+
+        Args:
+            pdf_path: Path to PDF file
+            start: First page index
+            stop: Page index to stop before (None for the last page)
+
+        Yields:
+            Raw text of each page
+        """
+
+    @abstractmethod
+    def page_count(self, pdf_path: str) -> int:
+        """Number of pages in the document."""
+
+
+class PdfiumBackend(PDFBackend):
+    """pypdfium2 (PDFium): fastest, robust on design-tool exports."""
+
+    name = 'pypdfium2'
+    module = 'pypdfium2'
+
+    def extract_pages(self, pdf_path, start=0, stop=None):
+        import pypdfium2 as pdfium
+
+        pdf = pdfium.PdfDocument(pdf_path)
+        try:
+            for index in range(start, min(stop if stop is not None else len(pdf), len(pdf))):
+                page = pdf[index]
+                textpage = page.get_textpage()
+                text = textpage.get_text_bounded()
+                textpage.close()
+                page.close()
+                # PDFium ends lines with \r\n
+                yield text.replace('\r\n', '\n').replace('\r', '\n')
+        finally:
+            pdf.close()
+
+    def page_count(self, pdf_path):
+        import pypdfium2 as pdfium
+
+        pdf = pdfium.PdfDocument(pdf_path)
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+
+
+class PypdfBackend(PDFBackend):
+    """pypdf, the maintained successor of PyPDF2."""
+
+    name = 'pypdf'
+    module = 'pypdf'
+    reader_module = 'pypdf'
+
+    def _reader(self, file):
+        return __import__(self.reader_module).PdfReader(file)
+
+    def extract_pages(self, pdf_path, start=0, stop=None):
+        with open(pdf_path, 'rb') as file:
+            pages = self._reader(file).pages
+            for index in range(start, min(stop if stop is not None else len(pages), len(pages))):
+                yield pages[index].extract_text() or ''
+
+    def page_count(self, pdf_path):
+        with open(pdf_path, 'rb') as file:
+            return len(self._reader(file).pages)
+
+
+class PyPDF2Backend(PypdfBackend):
+    """Deprecated PyPDF2, kept as a last resort when installed."""
+
+    name = 'pypdf2'
+    module = 'PyPDF2'
+    reader_module = 'PyPDF2'
+
+
+class PdfminerBackend(PDFBackend):
+    """pdfminer.six: slowest, an independent parser for files the others reject."""
+
+    name = 'pdfminer'
+    module = 'pdfminer'
+
+    def extract_pages(self, pdf_path, start=0, stop=None):
+        from io import StringIO
+        from pdfminer.converter import TextConverter
+        from pdfminer.layout import LAParams
+        from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+        from pdfminer.pdfpage import PDFPage
+
+        # One parser for the whole document (extract_text() per page re-parses it every time)
+        with open(pdf_path, 'rb') as file:
+            manager = PDFResourceManager()
+            output = StringIO()
+            device = TextConverter(manager, output, laparams=LAParams())
+            interpreter = PDFPageInterpreter(manager, device)
+            try:
+                for index, page in enumerate(PDFPage.get_pages(file)):
+                    if stop is not None and index >= stop:
+                        break
+                    if index < start:
+                        continue
+                    interpreter.process_page(page)
+                    yield output.getvalue()
+                    output.seek(0)
+                    output.truncate()
+            finally:
+                device.close()
+
+    def page_count(self, pdf_path):
+        from pdfminer.pdfpage import PDFPage
+
+        with open(pdf_path, 'rb') as file:
+            return sum(1 for _ in PDFPage.get_pages(file))
+
+
+BACKENDS = {backend.name: backend for backend in (PdfiumBackend, PypdfBackend, PdfminerBackend, PyPDF2Backend)}
+
+
+def get_backend(name: str) -> PDFBackend:
+    """
+    Instantiate a backend by name.
+
+    Args:
+        name: One of BACKENDS
+
+    Returns:
+        Backend instance
+
+    Raises:
+        ValueError: If the name is unknown or its library is not installed
+    """
+    backend = BACKENDS.get(name)
+    if backend is None or not backend.available():
+        raise ValueError(f"PDF backend not available: {name}")
+    return backend()
+
+
+def text_quality(text: str) -> float:
+    """
+    Score how much extracted text looks like real prose (0.0-1.0).
+
+    Penalizes replacement and private-use characters, (cid:N) glyph
+    artifacts, letter-by-letter spacing, words glued together without
+    spaces and vowel-less gibberish.
+
+    Args:
+        text: Extracted text
+
+    Returns:
+        Quality score (0.0 for empty text)
+    """
+    stripped = _CID_ARTIFACT.sub('\ufffd', text)
+    if not stripped.strip():
+        return 0.0
+
+    visible = [c for c in stripped if not c.isspace()]
+    bad = sum(1 for c in visible if c == '\ufffd' or '\ue000' <= c <= '\uf8ff' or (ord(c) < 32))
+    char_score = 1.0 - bad / max(len(visible), 1)
+
+    words = _WORD.findall(stripped)
+    alpha = [w for w in words if any(c.isalpha() for c in w)]
+    if not alpha:
+        return char_score * 0.5
+    single = sum(1 for w in alpha if len(w) == 1) / len(alpha)
+    glued = sum(1 for w in alpha if len(w) > 25) / len(alpha)
+    vowelless = sum(1 for w in alpha if len(w) > 3 and not re.search(r'[aeiouyAEIOUY]', w) and w.isalpha() and not w.isupper()) / len(alpha)
+    word_score = max(0.0, 1.0 - max(single - 0.15, 0.0) * 2 - glued * 3 - vowelless * 2)
+
+    return round(char_score * word_score, 3)
+
+
+def select_backend(
+    pdf_path: str,
+    candidates: Optional[List[str]] = None,
+    sample_pages: int = 2,
+    good_enough: float = 0.9,
+    max_pages_for_slow: int = 40
+) -> Tuple[PDFBackend, Dict[str, Any]]:
+    """
+    Pick the backend for a document from a quick trial extraction.
+
+    Candidates are tried in order on the first sample_pages pages; the first
+    whose text scores at least good_enough wins, otherwise the best scoring
+    one. pdfminer is skipped for documents longer than max_pages_for_slow.
+    When the first backend that reads the document finds no text at all on
+    the sampled pages (scanned or image-only PDFs), the others are not tried.
+
+    Args:
+        pdf_path: Path to PDF file
+        candidates: Backend names in order of preference (default DEFAULT_ORDER)
+        sample_pages: Pages extracted per candidate
+        good_enough: Quality at which the search stops
+        max_pages_for_slow: Page limit for the slow pdfminer backend
+
+    Returns:
+        Tuple of (backend, selection report with page_count, scores and
+        timings per tried backend)
+
+    Raises:
+        Exception: If no backend can read the document
+    """
+    report: Dict[str, Any] = {'page_count': None, 'scores': {}, 'timings': {}}
+    best: Optional[PDFBackend] = None
+    best_score = -1.0
+    errors = []
+
+    for name in candidates or DEFAULT_ORDER:
+        backend_class = BACKENDS.get(name)
+        if backend_class is None or not backend_class.available():
+            continue
+        if name == 'pdfminer' and (report['page_count'] or 0) > max_pages_for_slow:
+            continue
+        backend = backend_class()
+        start = time.perf_counter()
+        try:
+            if report['page_count'] is None:
+                report['page_count'] = backend.page_count(pdf_path)
+            sample = '\n'.join(backend.extract_pages(pdf_path, 0, sample_pages))
+        except Exception as e:
+            errors.append(f"{name}: {e}")
+            continue
+        finally:
+            report['timings'][name] = round(time.perf_counter() - start, 4)
+
+        score = text_quality(sample)
+        report['scores'][name] = score
+        if score > best_score:
+            best, best_score = backend, score
+        if score >= good_enough:
+            break
+        if not sample.strip():
+            # No text layer: other backends read the same (empty) content streams
+            report['no_text'] = True
+            break
+
+    if best is None:
+        raise Exception("No PDF backend could read the document: " + '; '.join(errors))
+    return best, report
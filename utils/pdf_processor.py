@@ -1,34 +1,126 @@
 """
 PDF processing utilities for text extraction.
 """
-import PyPDF2
-from typing import Optional
+import os
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from .pdf_backends import DEFAULT_ORDER, PDFBackend, get_backend, select_backend
+from .text_normalizer import TextNormalizer
+
+# Characters of text the evaluators read; extraction stops once this much is collected
+MAX_TEXT_CHARS = int(os.getenv('MAX_TEXT_CHARS', '15000'))
 
 
 class PDFProcessor:
     """Handles PDF text extraction and processing."""
 
     @staticmethod
-    def extract_text(pdf_path: str) -> str:
+    def backend_order() -> List[str]:
         """
-        Extract text from PDF file.
+        Backends to try, in order of preference.
+
+        Returns:
+            PDF_BACKEND env (comma-separated names) or DEFAULT_ORDER
+        """
+        configured = os.getenv('PDF_BACKEND', '')
+        return [name.strip() for name in configured.split(',') if name.strip()] or DEFAULT_ORDER
+
+    @staticmethod
+    def select_backend(pdf_path: str) -> Tuple[PDFBackend, Dict[str, Any]]:
+        """
+        Choose the extraction backend for a document.
 
         Args:
             pdf_path: Path to PDF file
 
         Returns:
-            Extracted text content
+            Tuple of (backend, selection report from pdf_backends.select_backend)
+        """
+        return select_backend(pdf_path, PDFProcessor.backend_order())
+
+    @staticmethod
+    def extract_pages(pdf_path: str, backend: Optional[PDFBackend] = None) -> Iterator[str]:
+        """
+        Extract text page by page.
+
+        Args:
+            pdf_path: Path to PDF file
+            backend: Backend to use (default: chosen by select_backend)
+
+        Yields:
+            Raw text of each page
         """
-        text = ""
         try:
-            with open(pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                for page in pdf_reader.pages:
-                    text += page.extract_text() + "\n"
-            return text.strip()
+            if backend is None:
+                backend, _ = PDFProcessor.select_backend(pdf_path)
+            yield from backend.extract_pages(pdf_path)
         except Exception as e:
             raise Exception(f"Error extracting text: {str(e)}")
 
+    @staticmethod
+    def extract_text(pdf_path: str) -> str:
+        """
+        Extract text from PDF file.
+
+        Args:
+            pdf_path: Path to PDF file
+
+        Returns:
+            Extracted text content
+        """
+        return "\n".join(PDFProcessor.extract_pages(pdf_path)).strip()
+
+    @staticmethod
+    def open_clean_pages(pdf_path: str) -> 'CleanPageReader':
+        """
+        Open a PDF for lazy, normalized page reading.
+
+        Args:
+            pdf_path: Path to PDF file
+
+        Returns:
+            CleanPageReader over the document (close it, or use it as a context manager)
+        """
+        return CleanPageReader(pdf_path)
+
+    @staticmethod
+    def extract_clean_pages(pdf_path: str, max_chars: Optional[int] = MAX_TEXT_CHARS) -> Tuple[List[str], Dict[str, Any]]:
+        """
+        Extract and normalize pages lazily until the text budget is filled.
+
+        Pages are read one at a time, so a long document stops being parsed
+        as soon as max_chars of cleaned text have been collected.
+
+        Args:
+            pdf_path: Path to PDF file
+            max_chars: Text budget in characters (None reads every page)
+
+        Returns:
+            Tuple of (cleaned text per non-empty page, CleanPageReader.report())
+        """
+        with PDFProcessor.open_clean_pages(pdf_path) as reader:
+            pages = reader.read(max_chars)
+            return pages, reader.report()
+
+    @staticmethod
+    def extract_clean_text(pdf_path: str, max_chars: Optional[int] = MAX_TEXT_CHARS) -> Tuple[str, Dict[str, Any]]:
+        """
+        Extract text and normalize it page by page as it is read.
+
+        Running headers/footers, page numbers, duplicated lines, broken
+        hyphenation, ligatures and extra whitespace are removed before the
+        text reaches a prompt.
+
+        Args:
+            pdf_path: Path to PDF file
+            max_chars: Text budget in characters (None reads every page)
+
+        Returns:
+            Tuple of (normalized text, report from extract_clean_pages)
+        """
+        pages, report = PDFProcessor.extract_clean_pages(pdf_path, max_chars)
+        return '\n\n'.join(pages), report
+
     @staticmethod
     def get_page_count(pdf_path: str) -> Optional[int]:
         """
@@ -40,12 +132,12 @@ class PDFProcessor:
         Returns:
             Number of pages or None if error
         """
-        try:
-            with open(pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                return len(pdf_reader.pages)
-        except Exception:
-            return None
+        for name in PDFProcessor.backend_order():
+            try:
+                return get_backend(name).page_count(pdf_path)
+            except Exception:
+                continue
+        return None
 
     @staticmethod
     def validate_pdf(pdf_path: str) -> bool:
@@ -58,9 +150,105 @@ class PDFProcessor:
         Returns:
             True if valid, False otherwise
         """
+        return PDFProcessor.get_page_count(pdf_path) is not None
+
+
+class CleanPageReader:
+    """
+    Normalized pages of one PDF, parsed only as far as they are asked for.
+
+    Pages read are kept, so one reader can serve type detection first and
+    then the evaluator's text budget, which depends on the detected type,
+    without parsing any page twice.
+    """
+
+    def __init__(self, pdf_path: str):
+        """
+        Open the document with the backend chosen by PDFProcessor.select_backend.
+
+        Args:
+            pdf_path: Path to PDF file
+
+        Raises:
+            Exception: If no backend can read the file
+        """
+        self._start = time.perf_counter()
         try:
-            with open(pdf_path, 'rb') as file:
-                PyPDF2.PdfReader(file)
-            return True
-        except Exception:
-            return False
+            self.backend, self.selection = PDFProcessor.select_backend(pdf_path)
+        except Exception as e:
+            raise Exception(f"Error extracting text: {str(e)}")
+        self.normalizer = TextNormalizer()
+        self._raw = PDFProcessor.extract_pages(pdf_path, self.backend)
+        self._clean = self.normalizer.normalize_pages(self._raw)
+        self.pages: List[str] = []
+        self.chars = 0
+        self.finished = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def iter_pages(self, max_chars: Optional[int] = None) -> Iterator[str]:
+        """
+        Pages in order: those already read, then new ones until max_chars are collected.
+
+        Args:
+            max_chars: Text budget in characters (None reads every page)
+
+        Yields:
+            Cleaned text per non-empty page
+        """
+        index = 0
+        while True:
+            if index < len(self.pages):
+                yield self.pages[index]
+                index += 1
+                continue
+            if self.finished or (max_chars is not None and self.chars >= max_chars):
+                return
+            try:
+                page = next(self._clean)
+            except StopIteration:
+                self.finished = True
+                return
+            self.pages.append(page)
+            self.chars += len(page)
+
+    def read(self, max_chars: Optional[int] = None) -> List[str]:
+        """
+        Read on until max_chars of text are collected or the document ends.
+
+        Args:
+            max_chars: Text budget in characters (None reads every page)
+
+        Returns:
+            Every page read so far
+        """
+        for _ in self.iter_pages(max_chars):
+            pass
+        return self.pages
+
+    def report(self) -> Dict[str, Any]:
+        """
+        TextNormalizer report of the pages read so far, extended with the
+        document's page_count, whether reading stopped before the end
+        (truncated), the backend used, the selection scores and timings per
+        backend and the total extraction time.
+        """
+        report = dict(self.normalizer.report)
+        report.update({
+            'page_count': self.selection['page_count'],
+            'truncated': not self.finished and self.normalizer.report['pages'] < (self.selection['page_count'] or 0),
+            'backend': self.backend.name,
+            'backend_scores': self.selection['scores'],
+            'backend_timings': self.selection['timings'],
+            'extract_seconds': round(time.perf_counter() - self._start, 3),
+        })
+        return report
+
+    def close(self):
+        """Close the backend's document (pages not read yet are never parsed)."""
+        self._clean.close()
+        self._raw.close()
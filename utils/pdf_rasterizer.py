@@ -0,0 +1,202 @@
+"""
+Rasterization of image-heavy PDFs for visual evaluation.
+
+Design portfolios exported from Figma or InDesign are mostly images and
+vector art, so text extraction yields next to nothing. Instead of rendering
+every page, a few representative pages are sampled (the cover, the most
+visual pages, and pages spread through the document) and rendered in a
+process pool within a DPI and page budget.
+"""
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Optional
+
+_executor: Optional[Executor] = None
+_executor_pid: Optional[int] = None
+
+
+def _get_executor(max_workers: int) -> Executor:
+    """
+    Shared rendering pool, created on first use in each process.
+
+    Daemon processes may not start children, so there pages are rendered on
+    a single thread instead (pdfium is not thread-safe).
+    """
+    global _executor, _executor_pid
+    if _executor is None or _executor_pid != os.getpid():
+        if multiprocessing.current_process().daemon:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='rasterizer')
+        else:
+            _executor = ProcessPoolExecutor(max_workers=max_workers)
+        _executor_pid = os.getpid()
+    return _executor
+
+
+def _candidate_pages(page_count: int, max_candidates: int) -> List[int]:
+    """Pages worth scoring: all of them, or an even spread including the first and last."""
+    if max_candidates <= 1:
+        return [0] if page_count else []
+    if page_count <= max_candidates:
+        return list(range(page_count))
+    return sorted({round(k * (page_count - 1) / (max_candidates - 1)) for k in range(max_candidates)})
+
+
+def _score_pages(pdf_path: str, max_candidates: int) -> List[Optional[float]]:
+    """
+    Score a sample of pages by how much visual content they hold (runs in the pool).
+
+    The score is the fraction of the page covered by images plus a bonus for
+    vector paths, which is how Figma exports most artwork. Only
+    `max_candidates` pages spread through the document are opened; the
+    others score None.
+    """
+    import pypdfium2 as pdfium
+    import pypdfium2.raw as pdfium_c
+
+    pdf = pdfium.PdfDocument(pdf_path)
+    try:
+        scores: List[Optional[float]] = [None] * len(pdf)
+        for index in _candidate_pages(len(pdf), max_candidates):
+            page = pdf[index]
+            try:
+                width, height = page.get_size()
+                page_area = max(width * height, 1.0)
+
+                image_area = 0.0
+                path_count = 0
+                for obj in page.get_objects(max_depth=2):
+                    if obj.type == pdfium_c.FPDF_PAGEOBJ_IMAGE:
+                        left, bottom, right, top = obj.get_pos()
+                        image_area += max(right - left, 0) * max(top - bottom, 0)
+                    elif obj.type == pdfium_c.FPDF_PAGEOBJ_PATH:
+                        path_count += 1
+            finally:
+                page.close()
+
+            scores[index] = min(image_area / page_area, 1.0) + 0.5 * min(path_count / 200, 1.0)
+    finally:
+        pdf.close()
+    return scores
+
+
+def _render_page(pdf_path: str, index: int, dpi: int, max_edge: int) -> bytes:
+    """Render one page to JPEG bytes (runs in the pool)."""
+    import io
+    import pypdfium2 as pdfium
+
+    pdf = pdfium.PdfDocument(pdf_path)
+    try:
+        page = pdf[index]
+        try:
+            width, height = page.get_size()
+            # Scale from PDF points (1/72 in) to the target DPI, capped at max_edge pixels
+            scale = min(dpi / 72, max_edge / max(width, height))
+            image = page.render(scale=scale).to_pil().convert('RGB')
+        finally:
+            page.close()
+        buffer = io.BytesIO()
+        image.save(buffer, format='JPEG', quality=85, optimize=True)
+    finally:
+        pdf.close()
+    return buffer.getvalue()
+
+
+class PDFRasterizer:
+    """Renders a sampled subset of PDF pages to images."""
+
+    def __init__(
+        self,
+        dpi: int = 110,
+        max_pages: int = 5,
+        max_edge: int = 1568,
+        processes: int = 2,
+        candidates_per_page: int = 4
+    ):
+        """
+        Initialize rasterizer.
+
+        Args:
+            dpi: Render resolution
+            max_pages: Maximum number of pages rendered per document
+            max_edge: Maximum width/height of a rendered page in pixels
+                (larger images are downscaled by the vision API anyway)
+            processes: Size of the shared rendering process pool
+            candidates_per_page: Pages scored per rendered page; long documents
+                are only scored on this sample
+        """
+        self.dpi = dpi
+        self.max_pages = max_pages
+        self.max_edge = max_edge
+        self.processes = processes
+        self.candidates_per_page = candidates_per_page
+
+    @staticmethod
+    def select_pages(scores: List[Optional[float]], max_pages: int) -> List[int]:
+        """
+        Choose which pages to render.
+
+        Takes the cover, then the most visual pages for half of the remaining
+        budget, then pages spread evenly through the document for the rest.
+
+        Args:
+            scores: Visual content score per page (None for pages not scored)
+            max_pages: Page budget
+
+        Returns:
+            Sorted page indices
+        """
+        page_count = len(scores)
+        if page_count <= max_pages:
+            return list(range(page_count))
+
+        selected = [0]
+        scored = [i for i in range(1, page_count) if scores[i] is not None]
+        by_score = sorted(scored, key=lambda i: scores[i], reverse=True)
+        for index in by_score[:(max_pages - 1) // 2]:
+            selected.append(index)
+
+        remaining = max_pages - len(selected)
+        for k in range(1, remaining + 1):
+            target = round(k * (page_count - 1) / remaining)
+            # Nearest unselected page to the evenly spaced target
+            candidates = sorted(
+                (i for i in range(page_count) if i not in selected),
+                key=lambda i: abs(i - target)
+            )
+            if candidates:
+                selected.append(candidates[0])
+
+        return sorted(selected)
+
+    async def rasterize(self, pdf_path: str) -> List[bytes]:
+        """
+        Render the selected pages of a PDF.
+
+        Args:
+            pdf_path: Path to PDF file
+
+        Returns:
+            Rendered pages as JPEG bytes, in page order
+        """
+        loop = asyncio.get_running_loop()
+        executor = _get_executor(self.processes)
+
+        scores = await loop.run_in_executor(
+            executor, _score_pages, pdf_path, self.max_pages * self.candidates_per_page
+        )
+        pages = self.select_pages(scores, self.max_pages)
+
+        tasks = [
+            loop.run_in_executor(
+                executor,
+                _render_page,
+                pdf_path,
+                index,
+                self.dpi,
+                self.max_edge
+            )
+            for index in pages
+        ]
+        return list(await asyncio.gather(*tasks))
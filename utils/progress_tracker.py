@@ -0,0 +1,237 @@
+"""
+Live status message for review jobs.
+
+Replaces the cascade of per-stage reactions and progress messages with a
+single status message per job that is edited in place. Stage updates are
+coalesced and edits are throttled so a job costs a handful of Discord REST
+calls regardless of how many stages it reports.
+"""
+import asyncio
+import time
+from typing import List, Optional
+
+
+class ProgressTracker:
+    """Keeps one throttled, coalesced status message per review job."""
+
+    def __init__(
+        self,
+        message,
+        label: str,
+        min_interval: float = 2.0,
+        started_at: Optional[float] = None
+    ):
+        """
+        Initialize progress tracker.
+
+        Args:
+            message: Discord message that triggered the job
+            label: Short job label shown in the status (e.g. file name)
+            min_interval: Minimum seconds between status message edits
+            started_at: Unix time the job was received (defaults to now)
+        """
+        self.message = message
+        self.label = label
+        self.min_interval = min_interval
+        self.stage = 'Received'
+        self.queue_position = 0
+        self.started_at = started_at if started_at is not None else time.time()
+        self.status_message = None
+        self._last_edit = 0.0
+        self._flush_task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self._closed = False
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since the job was received."""
+        return time.time() - self.started_at
+
+    def render(self, icon: str = '⏳') -> str:
+        """
+        Render the current status line.
+
+        Args:
+            icon: Leading status icon
+
+        Returns:
+            Status message content
+        """
+        if self.queue_position > 0:
+            stage = f"Queued — position {self.queue_position}"
+        else:
+            stage = self.stage
+        return f"{icon} **{self.label}** · {stage} · {self.elapsed:.0f}s"
+
+    async def start(self, queue_position: int = 0):
+        """
+        Post the status message.
+
+        Args:
+            queue_position: Number of jobs ahead of this one (0 = running)
+        """
+        self.queue_position = queue_position
+        try:
+            self.status_message = await self.message.reply(
+                self.render(), mention_author=False
+            )
+            self._last_edit = time.monotonic()
+        except Exception as e:
+            print(f"Warning: Failed to post status message: {e}")
+
+    def attach(self, status_message):
+        """
+        Resume an existing status message instead of posting a new one.
+
+        Used by workers picking up a job whose status was posted by the gateway.
+
+        Args:
+            status_message: Message (or PartialMessage) to edit
+        """
+        self.status_message = status_message
+        self.queue_position = 0
+        self._schedule_flush()
+
+    def update(self, stage: str):
+        """
+        Report a new stage. Consecutive updates are coalesced into one edit.
+
+        Args:
+            stage: Human-readable stage description
+        """
+        self.stage = stage
+        self._schedule_flush()
+
+    def set_queue_position(self, position: int):
+        """
+        Report the job's position in the review queue.
+
+        Args:
+            position: Number of jobs ahead of this one (0 = running)
+        """
+        if position == self.queue_position:
+            return
+        self.queue_position = position
+        self._schedule_flush()
+
+    async def finish(self, text: str = 'Done'):
+        """
+        Mark the job as complete.
+
+        Args:
+            text: Final stage description
+        """
+        await self._close('✅', text)
+
+    async def fail(self, text: str = 'Failed'):
+        """
+        Mark the job as failed.
+
+        Args:
+            text: Final stage description
+        """
+        await self._close('❌', text)
+
+    async def _close(self, icon: str, text: str):
+        """Cancel any pending edit and write the final status immediately."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
+        self.queue_position = 0
+        self.stage = text
+        await self._edit(self.render(icon))
+
+    def _schedule_flush(self):
+        """Schedule a throttled edit unless one is already pending."""
+        if self._closed or self.status_message is None:
+            return
+        if self._flush_task and not self._flush_task.done():
+            return
+        delay = max(0.0, self.min_interval - (time.monotonic() - self._last_edit))
+        self._flush_task = asyncio.create_task(self._flush_after(delay))
+
+    async def _flush_after(self, delay: float):
+        """Wait out the throttle window, then edit with the latest state."""
+        await asyncio.sleep(delay)
+        if not self._closed:
+            await self._edit(self.render())
+
+    async def _edit(self, content: str):
+        """Edit the status message, ignoring transient Discord errors."""
+        if self.status_message is None:
+            return
+        async with self._lock:
+            try:
+                await self.status_message.edit(content=content)
+                self._last_edit = time.monotonic()
+            except Exception as e:
+                print(f"Warning: Failed to update status message: {e}")
+
+
+class ReviewQueue:
+    """Bounds concurrent reviews and keeps waiting jobs' queue positions current."""
+
+    def __init__(self, max_concurrent: int = 2):
+        """
+        Initialize review queue.
+
+        Args:
+            max_concurrent: Maximum number of reviews running at once
+        """
+        self.max_concurrent = max_concurrent
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._waiting: List[ProgressTracker] = []
+
+    @property
+    def waiting(self) -> int:
+        """Number of jobs waiting for a slot."""
+        return len(self._waiting)
+
+    def slot(self, tracker: ProgressTracker) -> '_ReviewSlot':
+        """
+        Reserve a review slot for a job.
+
+        Args:
+            tracker: Progress tracker of the job
+
+        Returns:
+            Async context manager holding the slot
+        """
+        return _ReviewSlot(self, tracker)
+
+    def next_position(self) -> int:
+        """Queue position a newly submitted job would get (0 if it can run now)."""
+        if self._semaphore.locked():
+            return len(self._waiting) + 1
+        return 0
+
+    def _refresh_positions(self):
+        for position, tracker in enumerate(self._waiting, 1):
+            tracker.set_queue_position(position)
+
+
+class _ReviewSlot:
+    """Async context manager returned by ReviewQueue.slot()."""
+
+    def __init__(self, queue: ReviewQueue, tracker: ProgressTracker):
+        self.queue = queue
+        self.tracker = tracker
+
+    async def __aenter__(self):
+        if self.queue._semaphore.locked():
+            self.queue._waiting.append(self.tracker)
+            self.tracker.set_queue_position(len(self.queue._waiting))
+            try:
+                await self.queue._semaphore.acquire()
+            finally:
+                self.queue._waiting.remove(self.tracker)
+                self.queue._refresh_positions()
+        else:
+            await self.queue._semaphore.acquire()
+        self.tracker.set_queue_position(0)
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.queue._semaphore.release()
@@ -0,0 +1,405 @@
+"""
+Memory-aware adaptive concurrency.
+
+The container has a fixed memory limit, and Chromium pages, PDF parsing and
+base64 image copies all add to RSS. ResourceController samples the RSS of
+this process and its children (Chromium, the rasterizer pool) and their
+CPU use every few seconds. It then:
+
+- lowers or raises the number of concurrent captures, extractions and LLM
+  requests (AdjustableLimiter), one step at a time;
+- pauses intake of new jobs when memory is critical and resumes below the
+  high-water mark;
+- recycles the shared browser once Chromium grows past a threshold.
+
+Every decision is logged and kept for metrics(). psutil is optional: without
+it the limiters stay at their maximum and nothing is adjusted.
+"""
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+# (minimum, maximum) concurrency per resource
+DEFAULT_LIMITS = {
+    'capture': (1, int(os.getenv('MAX_CONCURRENT_CAPTURES', '3'))),
+    'extract': (1, int(os.getenv('MAX_CONCURRENT_EXTRACTIONS', '4'))),
+    'llm': (2, int(os.getenv('MAX_CONCURRENT_LLM_CALLS', '8'))),
+}
+
+# Share of the memory limit at which concurrency is raised / lowered / intake paused
+MEMORY_LOW = float(os.getenv('MEMORY_LOW', '0.6'))
+MEMORY_HIGH = float(os.getenv('MEMORY_HIGH', '0.8'))
+MEMORY_CRITICAL = float(os.getenv('MEMORY_CRITICAL', '0.9'))
+
+# CPU use (percent of all cores) above which concurrency is not raised
+CPU_HIGH = float(os.getenv('CPU_HIGH', '85'))
+
+# Chromium RSS that triggers a browser restart
+BROWSER_RECYCLE_MB = float(os.getenv('BROWSER_RECYCLE_MB', '1200'))
+
+_BROWSER_NAMES = ('chrom', 'headless_shell')
+
+
+def detect_memory_limit() -> int:
+    """
+    Memory available to the process in bytes.
+
+    Returns:
+        MEMORY_LIMIT_MB env, else the cgroup (v2 or v1) limit, else total RAM
+        (0 if psutil is missing and no limit is set)
+    """
+    configured = os.getenv('MEMORY_LIMIT_MB')
+    if configured:
+        return int(float(configured) * 1024 * 1024)
+
+    for path in ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes'):
+        try:
+            with open(path) as f:
+                value = f.read().strip()
+        except OSError:
+            continue
+        # 'max' (v2) or a near-2^63 value (v1) mean unlimited
+        if value.isdigit() and int(value) < 1 << 60:
+            return int(value)
+
+    try:
+        import psutil
+        return psutil.virtual_memory().total
+    except ImportError:
+        return 0
+
+
+class AdjustableLimiter:
+    """Semaphore whose limit can change while tasks hold or wait for slots."""
+
+    def __init__(self, name: str, limit: int, minimum: int = 1, maximum: Optional[int] = None):
+        """
+        Initialize limiter.
+
+        Args:
+            name: Resource name (for metrics)
+            limit: Initial number of slots
+            minimum: Lowest limit set_limit() allows
+            maximum: Highest limit set_limit() allows (default: limit)
+        """
+        self.name = name
+        self.minimum = minimum
+        self.maximum = maximum if maximum is not None else limit
+        self.limit = limit
+        self.in_use = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._paused = False
+        self._drained: Optional[asyncio.Future] = None
+
+    @property
+    def waiting(self) -> int:
+        """Tasks waiting for a slot."""
+        return sum(1 for waiter in self._waiters if not waiter.done())
+
+    def _can_enter(self) -> bool:
+        return not self._paused and self.in_use < self.limit
+
+    def _wake(self):
+        """Hand free slots to waiters in FIFO order."""
+        while self._waiters and self._can_enter():
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_use += 1
+                waiter.set_result(None)
+
+    def set_limit(self, limit: int) -> int:
+        """
+        Change the number of slots (clamped to minimum..maximum).
+
+        Holders above a lowered limit keep their slots; new acquisitions wait
+        until in_use drops below it.
+
+        Returns:
+            New limit
+        """
+        self.limit = max(self.minimum, min(limit, self.maximum))
+        self._wake()
+        return self.limit
+
+    async def acquire(self):
+        """Wait for a slot."""
+        if not self._waiters and self._can_enter():
+            self.in_use += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just before the cancellation
+                self.release()
+            else:
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+            raise
+
+    def release(self):
+        """Return a slot."""
+        self.in_use -= 1
+        if self._paused and self.in_use == 0 and self._drained is not None and not self._drained.done():
+            self._drained.set_result(None)
+        self._wake()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+    def drained(self) -> '_Drained':
+        """
+        Async context manager that runs its body with no slot in use.
+
+        New acquisitions wait while it waits for holders to finish and while
+        its body runs (e.g. restarting the browser between captures).
+        """
+        return _Drained(self)
+
+    def stats(self) -> Dict[str, int]:
+        """Current limit, slots in use and waiting tasks."""
+        return {'limit': self.limit, 'in_use': self.in_use, 'waiting': self.waiting}
+
+
+class _Drained:
+    """Async context manager returned by AdjustableLimiter.drained()."""
+
+    def __init__(self, limiter: AdjustableLimiter):
+        self.limiter = limiter
+
+    async def __aenter__(self):
+        limiter = self.limiter
+        limiter._paused = True
+        if limiter.in_use:
+            limiter._drained = asyncio.get_running_loop().create_future()
+            try:
+                await limiter._drained
+            except asyncio.CancelledError:
+                limiter._paused = False
+                limiter._wake()
+                raise
+        return limiter
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.limiter._paused = False
+        self.limiter._drained = None
+        self.limiter._wake()
+
+
+class ResourceController:
+    """Samples memory and CPU and adapts concurrency limits, intake and the browser."""
+
+    def __init__(
+        self,
+        limits: Optional[Dict[str, Tuple[int, int]]] = None,
+        memory_limit: Optional[int] = None,
+        interval: Optional[float] = None,
+        on_browser_recycle: Optional[Callable[[], Awaitable[Any]]] = None
+    ):
+        """
+        Initialize controller.
+
+        Args:
+            limits: (minimum, maximum) concurrency per resource (default DEFAULT_LIMITS);
+                limiters start at their maximum
+            memory_limit: Memory budget in bytes (default: detect_memory_limit())
+            interval: Seconds between samples (default: RESOURCE_SAMPLE_INTERVAL env, 2)
+            on_browser_recycle: Coroutine function restarting the shared browser
+        """
+        self.limiters = {
+            name: AdjustableLimiter(name, maximum, minimum, maximum)
+            for name, (minimum, maximum) in (limits or DEFAULT_LIMITS).items()
+        }
+        self.memory_limit = memory_limit if memory_limit is not None else detect_memory_limit()
+        self.interval = interval if interval is not None else float(os.getenv('RESOURCE_SAMPLE_INTERVAL', '2'))
+        self.on_browser_recycle = on_browser_recycle
+        self.last_sample: Dict[str, float] = {}
+        self.decisions: Deque[str] = deque(maxlen=50)
+        self.counters = {'limit_changes': 0, 'intake_pauses': 0, 'browser_recycles': 0}
+        self._intake = asyncio.Event()
+        self._intake.set()
+        self._processes: Dict[int, Any] = {}
+        self._recycle_task: Optional[asyncio.Task] = None
+        self._task: Optional[asyncio.Task] = None
+        try:
+            import psutil
+            self._psutil = psutil
+        except ImportError:
+            print("Warning: psutil not installed, adaptive concurrency disabled")
+            self._psutil = None
+
+    def limiter(self, name: str) -> AdjustableLimiter:
+        """Limiter of a resource ('capture', 'extract' or 'llm')."""
+        return self.limiters[name]
+
+    @property
+    def intake_paused(self) -> bool:
+        """Whether new jobs are held back."""
+        return not self._intake.is_set()
+
+    async def wait_for_intake(self):
+        """Return once new jobs may start."""
+        await self._intake.wait()
+
+    def start(self):
+        """Start sampling in the background (idempotent; no-op without psutil)."""
+        if self._task is None and self._psutil is not None and self.memory_limit:
+            self._task = asyncio.create_task(self._run())
+        return self._task
+
+    async def stop(self):
+        """Stop sampling."""
+        for task in (self._task, self._recycle_task):
+            if task and not task.done():
+                task.cancel()
+        self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                sample = await asyncio.to_thread(self.sample)
+                self.decide(sample)
+            except Exception as e:
+                print(f"Warning: Resource sampling failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def sample(self) -> Dict[str, float]:
+        """
+        Measure RSS and CPU of this process and all its children.
+
+        Returns:
+            Dict with rss_mb (total), process_mb, children_mb, browser_mb and
+            cpu_percent (summed over processes, normalized to all cores)
+        """
+        psutil = self._psutil
+        me = self._processes.setdefault(os.getpid(), psutil.Process())
+        process_rss = me.memory_info().rss
+        cpu = me.cpu_percent(None)
+        children_rss = browser_rss = 0
+        alive = {me.pid}
+        for child in me.children(recursive=True):
+            # Keep Process objects so cpu_percent() measures since the previous sample
+            child = self._processes.setdefault(child.pid, child)
+            try:
+                rss = child.memory_info().rss
+                cpu += child.cpu_percent(None)
+                name = child.name().lower()
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+            alive.add(child.pid)
+            children_rss += rss
+            if any(marker in name for marker in _BROWSER_NAMES):
+                browser_rss += rss
+        self._processes = {pid: process for pid, process in self._processes.items() if pid in alive}
+
+        megabyte = 1024 * 1024
+        return {
+            'rss_mb': (process_rss + children_rss) / megabyte,
+            'process_mb': process_rss / megabyte,
+            'children_mb': children_rss / megabyte,
+            'browser_mb': browser_rss / megabyte,
+            'cpu_percent': cpu / (psutil.cpu_count() or 1),
+        }
+
+    def _decide(self, reason: str):
+        entry = f"{time.strftime('%H:%M:%S')} {reason}"
+        self.decisions.append(entry)
+        print(f"Resource controller: {reason}")
+
+    def _step(self, delta: int, reason: str):
+        changed = []
+        for limiter in self.limiters.values():
+            before = limiter.limit
+            if limiter.set_limit(before + delta) != before:
+                changed.append(f"{limiter.name} {before}->{limiter.limit}")
+        if changed:
+            self.counters['limit_changes'] += 1
+            self._decide(f"{reason}: {', '.join(changed)}")
+
+    def decide(self, sample: Dict[str, float]) -> float:
+        """
+        Adjust limits, intake and the browser for one sample.
+
+        Args:
+            sample: Result of sample()
+
+        Returns:
+            Memory pressure (total RSS / memory limit)
+        """
+        self.last_sample = sample
+        pressure = sample['rss_mb'] * 1024 * 1024 / self.memory_limit if self.memory_limit else 0.0
+        usage = f"memory {pressure:.0%}, cpu {sample['cpu_percent']:.0f}%"
+
+        if pressure >= MEMORY_CRITICAL:
+            for limiter in self.limiters.values():
+                limiter.set_limit(limiter.minimum)
+            if not self.intake_paused:
+                self._intake.clear()
+                self.counters['intake_pauses'] += 1
+                self._decide(f"{usage}: intake paused, limits at minimum")
+        elif pressure >= MEMORY_HIGH or sample['cpu_percent'] >= CPU_HIGH:
+            self._step(-1, f"{usage}: lowering concurrency")
+        elif pressure < MEMORY_LOW:
+            self._step(1, f"{usage}: raising concurrency")
+
+        if self.intake_paused and pressure < MEMORY_HIGH:
+            self._intake.set()
+            self._decide(f"{usage}: intake resumed")
+
+        recycling = self._recycle_task is not None and not self._recycle_task.done()
+        if sample['browser_mb'] >= BROWSER_RECYCLE_MB and self.on_browser_recycle and not recycling:
+            self.counters['browser_recycles'] += 1
+            self._decide(f"browser at {sample['browser_mb']:.0f} MB: recycling")
+            self._recycle_task = asyncio.create_task(self.on_browser_recycle())
+
+        return pressure
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Current state for monitoring.
+
+        Returns:
+            Dict with the last sample, memory_limit_mb, pressure, per-resource
+            limiter stats, intake_paused, decision counters and recent decisions
+        """
+        rss_mb = self.last_sample.get('rss_mb', 0.0)
+        limit_mb = self.memory_limit / 1024 / 1024
+        return {
+            **self.last_sample,
+            'enabled': self._task is not None,
+            'memory_limit_mb': limit_mb,
+            'pressure': rss_mb / limit_mb if limit_mb else 0.0,
+            'limits': {name: limiter.stats() for name, limiter in self.limiters.items()},
+            'intake_paused': self.intake_paused,
+            **self.counters,
+            'recent_decisions': list(self.decisions)[-5:],
+        }
+
+    def format_metrics(self) -> str:
+        """Format metrics() for a Discord message."""
+        m = self.metrics()
+        lines = [
+            "**Resource metrics**",
+            f"Memory: {m.get('rss_mb', 0):.0f} / {m['memory_limit_mb']:.0f} MB ({m['pressure']:.0%}) — "
+            f"browser {m.get('browser_mb', 0):.0f} MB, CPU {m.get('cpu_percent', 0):.0f}%",
+            "Concurrency: " + ', '.join(
+                f"{name} {s['in_use']}/{s['limit']} (+{s['waiting']} waiting)" for name, s in m['limits'].items()
+            ),
+            f"Intake: {'⏸️ paused' if m['intake_paused'] else 'open'} | limit changes {m['limit_changes']}, "
+            f"pauses {m['intake_pauses']}, browser recycles {m['browser_recycles']}",
+        ]
+        if not m['enabled']:
+            lines.append("_Adaptive control is off (psutil missing or controller not started)._")
+        if m['recent_decisions']:
+            lines.append("Recent: " + '; '.join(m['recent_decisions']))
+        return '\n'.join(lines)
@@ -0,0 +1,415 @@
+"""
+Indexed store of every delivered review, backed by SQLite.
+
+Each review sent to Discord is kept with its user, guild, channel, type,
+content hash, scores (extraction and capture measurements), stage timings
+and the feedback text, for `!history`, mentor dashboards and analytics.
+Lookups go through indexes (user, guild and time, content hash) and an
+FTS5 full-text index on the feedback, so a user's recent reviews come back
+in milliseconds however large the table grows.
+
+Writes never block a review: add() only queues the row, and a background
+task writes queued rows in one transaction every REVIEW_STORE_FLUSH_SECONDS
+or as soon as REVIEW_STORE_BATCH rows are waiting.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+# Rows written per transaction / seconds a queued row may wait
+REVIEW_STORE_BATCH = int(os.getenv('REVIEW_STORE_BATCH', '50'))
+REVIEW_STORE_FLUSH_SECONDS = float(os.getenv('REVIEW_STORE_FLUSH_SECONDS', '2'))
+
+# Queued rows kept while the database cannot be written; older ones are dropped beyond this
+MAX_PENDING = 10000
+
+COLUMNS = (
+    'created_at', 'user_id', 'guild_id', 'channel_id', 'message_id', 'kind', 'file_type', 'label',
+    'title', 'content_sha256', 'scores', 'timings', 'total_seconds', 'fallbacks', 'feedback',
+)
+
+# Listing columns (everything but the feedback text)
+SUMMARY_COLUMNS = ', '.join(('id',) + COLUMNS[:-1])
+
+
+class ReviewStore:
+    """Stores delivered reviews and answers history, search and stats queries."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS reviews (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            created_at REAL NOT NULL,
+            user_id INTEGER NOT NULL,
+            guild_id INTEGER,
+            channel_id INTEGER,
+            message_id INTEGER,
+            kind TEXT NOT NULL,
+            file_type TEXT NOT NULL,
+            label TEXT,
+            title TEXT,
+            content_sha256 TEXT,
+            scores TEXT NOT NULL,
+            timings TEXT NOT NULL,
+            total_seconds REAL,
+            fallbacks TEXT,
+            feedback TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_reviews_user_time ON reviews (user_id, created_at);
+        CREATE INDEX IF NOT EXISTS idx_reviews_guild_time ON reviews (guild_id, created_at);
+        CREATE INDEX IF NOT EXISTS idx_reviews_time ON reviews (created_at);
+        CREATE INDEX IF NOT EXISTS idx_reviews_content ON reviews (content_sha256);
+    """
+
+    # External-content FTS5 index: the feedback text is stored once, in reviews
+    FTS_SCHEMA = """
+        CREATE VIRTUAL TABLE IF NOT EXISTS reviews_fts USING fts5(
+            feedback, content='reviews', content_rowid='id', tokenize='porter unicode61'
+        );
+        CREATE TRIGGER IF NOT EXISTS reviews_fts_insert AFTER INSERT ON reviews BEGIN
+            INSERT INTO reviews_fts (rowid, feedback) VALUES (new.id, new.feedback);
+        END;
+        CREATE TRIGGER IF NOT EXISTS reviews_fts_delete AFTER DELETE ON reviews BEGIN
+            INSERT INTO reviews_fts (reviews_fts, rowid, feedback) VALUES ('delete', old.id, old.feedback);
+        END;
+    """
+
+    def __init__(
+        self,
+        path: str = 'data/reviews.db',
+        batch_size: int = REVIEW_STORE_BATCH,
+        flush_interval: float = REVIEW_STORE_FLUSH_SECONDS
+    ):
+        """
+        Initialize review store.
+
+        Args:
+            path: SQLite database file (shared by all processes on the node)
+            batch_size: Queued rows that trigger an immediate write
+            flush_interval: Seconds a queued row waits at most before it is written
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending: List[tuple] = []
+        # add() runs on the event loop, queries in worker threads; both read the queue
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(self.SCHEMA)
+            try:
+                conn.executescript(self.FTS_SCHEMA)
+                self.full_text = True
+            except sqlite3.OperationalError as e:
+                # SQLite built without FTS5: search falls back to LIKE
+                print(f"Warning: Full-text index unavailable ({e}); review search scans the feedback")
+                self.full_text = False
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open a short-lived connection configured for multi-process access."""
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def content_hash(content: str) -> str:
+        """SHA-256 of the reviewed text (or URL), used to find repeat submissions."""
+        return hashlib.sha256((content or '').encode('utf-8', 'replace')).hexdigest()
+
+    def add(
+        self,
+        user_id: int,
+        file_type: str,
+        feedback: str,
+        kind: str = 'pdf',
+        label: Optional[str] = None,
+        title: Optional[str] = None,
+        content: str = '',
+        guild_id: Optional[int] = None,
+        channel_id: Optional[int] = None,
+        message_id: Optional[int] = None,
+        scores: Optional[Dict[str, Any]] = None,
+        timings: Optional[Dict[str, float]] = None,
+        total_seconds: Optional[float] = None,
+        fallbacks: Iterable[str] = ()
+    ):
+        """
+        Queue a delivered review; it is written by the background flush.
+
+        Outside an event loop the row is written immediately.
+
+        Args:
+            user_id: Discord user id
+            file_type: 'resume' or 'portfolio'
+            feedback: Feedback sent to the user
+            kind: 'pdf' or 'url'
+            label: File name or URL
+            title: Review heading (e.g. 'Resume Feedback - Revision Review')
+            content: Reviewed text, stored as its hash only
+            guild_id: Discord server id (None in DMs)
+            channel_id: Discord channel id
+            message_id: Id of the message that was reviewed
+            scores: Numeric measurements of the review (pages, text quality, ...)
+            timings: Seconds per stage from the job's Deadline
+            total_seconds: Seconds from leaving the queue to delivery
+            fallbacks: Degradations of the job (e.g. 'capture -> text only')
+        """
+        row = (
+            time.time(), int(user_id), guild_id, channel_id, message_id, kind, file_type, label, title,
+            self.content_hash(content), json.dumps(scores or {}), json.dumps(timings or {}),
+            total_seconds, ', '.join(fallbacks) or None, feedback,
+        )
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._write([row])
+            return
+
+        with self._lock:
+            self._pending.append(row)
+            full = len(self._pending) >= self.batch_size
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._run())
+        elif full and self._wake is not None:
+            self._wake.set()
+
+    async def _run(self):
+        """Write queued rows every flush_interval (sooner when a batch is full) until the queue is empty."""
+        self._wake = asyncio.Event()
+        while True:
+            if len(self._pending) < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._wake.clear()
+            if not await self.flush() or not self._pending:
+                return
+
+    async def flush(self) -> bool:
+        """
+        Write all queued rows in one transaction.
+
+        Returns:
+            False if the write failed (the rows stay queued for the next flush)
+        """
+        with self._lock:
+            rows, self._pending = self._pending, []
+        if not rows:
+            return True
+        try:
+            await asyncio.to_thread(self._write, rows)
+            return True
+        except Exception as e:
+            print(f"Warning: Could not write {len(rows)} reviews to the review store: {e}")
+            with self._lock:
+                self._pending = (rows + self._pending)[-MAX_PENDING:]
+            return False
+
+    def _write(self, rows: List[tuple]):
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                conn.executemany(
+                    f"INSERT INTO reviews ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                    rows
+                )
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+
+    async def close(self):
+        """Stop the background flush and write whatever is still queued."""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        await self.flush()
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        review = dict(row)
+        for key in ('scores', 'timings'):
+            if key in review:
+                review[key] = json.loads(review[key])
+        return review
+
+    def _queued(self, user_id: int) -> List[Dict[str, Any]]:
+        """Reviews of a user not written yet (newest first, without id)."""
+        with self._lock:
+            rows = [row for row in self._pending if row[1] == int(user_id)]
+        reviews = []
+        for row in reversed(rows):
+            review = dict(zip(COLUMNS, row), id=None)
+            review.pop('feedback')
+            review['scores'], review['timings'] = json.loads(review['scores']), json.loads(review['timings'])
+            reviews.append(review)
+        return reviews
+
+    def recent(self, user_id: int, limit: int = 5, file_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Most recent reviews of a user, including ones still queued.
+
+        Args:
+            user_id: Discord user id
+            limit: Reviews returned
+            file_type: Only 'resume' or 'portfolio' reviews (default: both)
+
+        Returns:
+            Review dicts without the feedback text, newest first (see get())
+        """
+        query = f"SELECT {SUMMARY_COLUMNS} FROM reviews WHERE user_id = ?"
+        params: List[Any] = [int(user_id)]
+        if file_type:
+            query += " AND file_type = ?"
+            params.append(file_type)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        params.append(limit)
+        with self._connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+        queued = [r for r in self._queued(user_id) if not file_type or r['file_type'] == file_type]
+        return (queued + [self._to_dict(row) for row in rows])[:limit]
+
+    def get(self, review_id: int) -> Optional[Dict[str, Any]]:
+        """
+        One stored review.
+
+        Args:
+            review_id: Review id
+
+        Returns:
+            Dict with id, created_at, user_id, guild_id, channel_id,
+            message_id, kind, file_type, label, title, content_sha256,
+            scores, timings, total_seconds, fallbacks and feedback, or None
+        """
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM reviews WHERE id = ?", (review_id,)).fetchone()
+        return self._to_dict(row) if row is not None else None
+
+    def by_content(self, content_sha256: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Reviews of the same text (any user), newest first, without the feedback text."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT {SUMMARY_COLUMNS} FROM reviews WHERE content_sha256 = ? ORDER BY created_at DESC LIMIT ?",
+                (content_sha256, limit)
+            ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    @staticmethod
+    def _match_query(text: str) -> str:
+        """FTS5 query matching all words of text (quoted, so user input is never parsed as syntax)."""
+        return ' '.join('"' + word.replace('"', '""') + '"' for word in text.split())
+
+    def search(
+        self,
+        text: str,
+        user_id: Optional[int] = None,
+        guild_id: Optional[int] = None,
+        limit: int = 10
+    ) -> List[Dict[str, Any]]:
+        """
+        Full-text search of the feedback.
+
+        Args:
+            text: Words that must all appear (stemmed, case-insensitive)
+            user_id: Only this user's reviews
+            guild_id: Only reviews from this server
+            limit: Reviews returned
+
+        Returns:
+            Review dicts without the feedback text, plus a 'snippet' of the
+            match, newest first
+        """
+        if not text.split():
+            return []
+        where, params = [], []
+        if user_id is not None:
+            where.append("r.user_id = ?")
+            params.append(int(user_id))
+        if guild_id is not None:
+            where.append("r.guild_id = ?")
+            params.append(guild_id)
+        columns = ', '.join(f"r.{c}" for c in SUMMARY_COLUMNS.split(', '))
+
+        if self.full_text:
+            query = (
+                f"SELECT {columns}, snippet(reviews_fts, 0, '**', '**', '…', 16) AS snippet "
+                f"FROM reviews_fts JOIN reviews r ON r.id = reviews_fts.rowid "
+                f"WHERE reviews_fts MATCH ?{''.join(' AND ' + w for w in where)} "
+                # A user's few rows are read through the user index; otherwise FTS5 streams matches
+                # newest first (ids grow with time) and stops at the limit instead of ranking all of them
+                f"ORDER BY {'r.created_at DESC' if user_id is not None else 'reviews_fts.rowid DESC'} LIMIT ?"
+            )
+            params = [self._match_query(text)] + params + [limit]
+        else:
+            words = text.split()
+            where += ["r.feedback LIKE ?"] * len(words)
+            params += [f"%{word}%" for word in words]
+            query = (
+                f"SELECT {columns}, substr(r.feedback, 1, 120) AS snippet FROM reviews r "
+                f"WHERE {' AND '.join(where)} ORDER BY r.created_at DESC LIMIT ?"
+            )
+            params.append(limit)
+
+        with self._connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def stats(self, guild_id: Optional[int] = None, since: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Review counts and timings per file type, for dashboards.
+
+        Args:
+            guild_id: Only reviews from this server (default: all)
+            since: Only reviews created after this Unix time (default: all)
+
+        Returns:
+            {file_type: {'reviews', 'users', 'avg_seconds', 'with_fallbacks'}}
+        """
+        where, params = [], []
+        if guild_id is not None:
+            where.append("guild_id = ?")
+            params.append(guild_id)
+        if since is not None:
+            where.append("created_at >= ?")
+            params.append(since)
+        query = (
+            "SELECT file_type, COUNT(*) AS reviews, COUNT(DISTINCT user_id) AS users, "
+            "AVG(total_seconds) AS avg_seconds, COUNT(fallbacks) AS with_fallbacks FROM reviews"
+            + (" WHERE " + ' AND '.join(where) if where else '')
+            + " GROUP BY file_type"
+        )
+        with self._connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+        return {row['file_type']: {k: row[k] for k in row.keys() if k != 'file_type'} for row in rows}
+
+    @staticmethod
+    def format_history(reviews: List[Dict[str, Any]]) -> str:
+        """Format recent() or search() results as Discord message lines."""
+        lines = []
+        for review in reviews:
+            number = f"`#{review['id']}`" if review['id'] is not None else '`(saving)`'
+            when = time.strftime('%Y-%m-%d %H:%M', time.gmtime(review['created_at']))
+            line = f"{number} {when} UTC · {review['title'] or review['file_type']} · {review['label'] or ''}"
+            if review.get('total_seconds') is not None:
+                line += f" · {review['total_seconds']:.0f}s"
+            if review.get('snippet'):
+                line += f"\n> {' '.join(review['snippet'].split())}"
+            lines.append(line)
+        return '\n'.join(lines)
@@ -0,0 +1,237 @@
+"""
+Lazily initialized runtime for the bot's heavy subsystems.
+
+The gateway connection only needs discord.py. Evaluators (anthropic), PDF
+processing (pypdfium2, pypdf) and the screenshot service (Playwright + Chromium) are
+imported and built on first use, or in the background once the bot is
+ready, so a restart reaches the gateway within a couple of seconds.
+"""
+import asyncio
+import importlib
+import os
+import time
+from typing import Dict, Optional
+
+# Modules pre-imported by warm_up(), in the order they are usually needed
+HEAVY_MODULES = [
+    'utils.file_detector',
+    'utils.pdf_processor',
+    'evaluators',
+    'utils.screenshot_service',
+]
+
+
+class Runtime:
+    """Builds evaluators and the shared browser on demand and records startup timings."""
+
+    def __init__(self, api_key: str, process_start: Optional[float] = None):
+        """
+        Initialize runtime.
+
+        Args:
+            api_key: Anthropic API key
+            process_start: time.perf_counter() value taken at process start
+        """
+        self.api_key = api_key
+        self.process_start = process_start if process_start is not None else time.perf_counter()
+        self.timings: Dict[str, float] = {}
+        self._resume_evaluator = None
+        self._portfolio_evaluator = None
+        self._screenshot_service = None
+        self._pdf_rasterizer = None
+        self._submission_history = None
+        self._duplicate_index = None
+        self._review_store = None
+        self._resources = None
+        self._stages = None
+        self._trace_recorder = None
+        self._browser_lock = asyncio.Lock()
+        self._warm_task: Optional[asyncio.Task] = None
+
+    def mark(self, label: str) -> float:
+        """
+        Record seconds elapsed since process start under a label.
+
+        Args:
+            label: Timing label
+
+        Returns:
+            Elapsed seconds
+        """
+        elapsed = time.perf_counter() - self.process_start
+        self.timings[label] = elapsed
+        return elapsed
+
+    def report(self) -> str:
+        """Format recorded timings as a single log line."""
+        return ' | '.join(f"{label}: {seconds:.2f}s" for label, seconds in self.timings.items())
+
+    @property
+    def resources(self):
+        """ResourceController adapting concurrency to memory and CPU, built on first access."""
+        if self._resources is None:
+            from utils.resource_controller import ResourceController
+            self._resources = ResourceController(on_browser_recycle=self.recycle_browser)
+        return self._resources
+
+    @property
+    def stages(self):
+        """StageExecutor with the per-stage worker pools of the review pipeline, built on first access."""
+        if self._stages is None:
+            from utils.stage_executor import StageExecutor
+            self._stages = StageExecutor()
+        return self._stages
+
+    @property
+    def resume_evaluator(self):
+        """ResumeEvaluator, built on first access."""
+        if self._resume_evaluator is None:
+            from evaluators import ResumeEvaluator
+            self._resume_evaluator = ResumeEvaluator(api_key=self.api_key)
+            self._resume_evaluator.client.limiter = self.resources.limiter('llm')
+        return self._resume_evaluator
+
+    @property
+    def portfolio_evaluator(self):
+        """PortfolioEvaluator, built on first access."""
+        if self._portfolio_evaluator is None:
+            from evaluators import PortfolioEvaluator
+            self._portfolio_evaluator = PortfolioEvaluator(api_key=self.api_key)
+            self._portfolio_evaluator.client.limiter = self.resources.limiter('llm')
+        return self._portfolio_evaluator
+
+    @property
+    def pdf_rasterizer(self):
+        """PDFRasterizer configured from RASTER_* environment variables."""
+        if self._pdf_rasterizer is None:
+            from utils import PDFRasterizer
+            self._pdf_rasterizer = PDFRasterizer(
+                dpi=int(os.getenv('RASTER_DPI', '110')),
+                max_pages=int(os.getenv('RASTER_MAX_PAGES', '5')),
+                processes=int(os.getenv('RASTER_PROCESSES', '2'))
+            )
+        return self._pdf_rasterizer
+
+    @property
+    def submission_history(self):
+        """SubmissionHistory at SUBMISSION_HISTORY_PATH, or None if disabled or unavailable."""
+        if self._submission_history is None:
+            path = os.getenv('SUBMISSION_HISTORY_PATH', 'data/history.db')
+            if not path:
+                return None
+            try:
+                from utils import SubmissionHistory
+                self._submission_history = SubmissionHistory(path)
+            except Exception as e:
+                print(f"Warning: Submission history unavailable: {e}")
+                return None
+        return self._submission_history
+
+    @property
+    def duplicate_index(self):
+        """MinHashIndex at DUPLICATE_INDEX_PATH, or None if disabled or unavailable."""
+        if self._duplicate_index is None:
+            path = os.getenv('DUPLICATE_INDEX_PATH', 'data/minhash.db')
+            if not path:
+                return None
+            try:
+                from utils import MinHashIndex
+                self._duplicate_index = MinHashIndex(path)
+            except Exception as e:
+                print(f"Warning: Duplicate index unavailable: {e}")
+                return None
+        return self._duplicate_index
+
+    @property
+    def review_store(self):
+        """ReviewStore at REVIEW_STORE_PATH, or None if disabled or unavailable."""
+        if self._review_store is None:
+            path = os.getenv('REVIEW_STORE_PATH', 'data/reviews.db')
+            if not path:
+                return None
+            try:
+                from utils import ReviewStore
+                self._review_store = ReviewStore(path)
+            except Exception as e:
+                print(f"Warning: Review store unavailable: {e}")
+                return None
+        return self._review_store
+
+    @property
+    def trace_recorder(self):
+        """TraceRecorder writing to TRACE_DIR, or None if tracing is off (the default)."""
+        if self._trace_recorder is None:
+            directory = os.getenv('TRACE_DIR', '')
+            if not directory:
+                return None
+            try:
+                from utils import TraceRecorder
+                self._trace_recorder = TraceRecorder(directory)
+            except Exception as e:
+                print(f"Warning: Trace recorder unavailable: {e}")
+                return None
+        return self._trace_recorder
+
+    async def get_screenshot_service(self):
+        """
+        Get the shared ScreenshotService, launching Chromium if needed.
+
+        Returns:
+            Started ScreenshotService
+        """
+        async with self._browser_lock:
+            if self._screenshot_service is None:
+                await asyncio.to_thread(importlib.import_module, 'utils.screenshot_service')
+                from utils import ScreenshotService
+                service = ScreenshotService()
+                await service.start()
+                self._screenshot_service = service
+            return self._screenshot_service
+
+    async def recycle_browser(self):
+        """Restart Chromium between captures to give its memory back."""
+        async with self.resources.limiter('capture').drained():
+            async with self._browser_lock:
+                if self._screenshot_service is None:
+                    return
+                service, self._screenshot_service = self._screenshot_service, None
+                await service.close()
+        print("Browser recycled; it relaunches on the next capture")
+
+    def start_warm_up(self):
+        """Schedule warm_up() and resource monitoring in the background (idempotent)."""
+        self.resources.start()
+        if self._warm_task is None:
+            self._warm_task = asyncio.create_task(self.warm_up())
+        return self._warm_task
+
+    async def warm_up(self):
+        """Import heavy modules off the event loop, build evaluators and warm Chromium."""
+        try:
+            for module in HEAVY_MODULES:
+                await asyncio.to_thread(importlib.import_module, module)
+            self.resume_evaluator
+            self.portfolio_evaluator
+            self.mark('modules loaded')
+
+            service = await self.get_screenshot_service()
+            await service.warm_up()
+            self.mark('browser warm')
+        except Exception as e:
+            print(f"Warning: Runtime warm-up failed: {e}")
+        print(f"Startup timings - {self.report()}")
+
+    async def close(self):
+        """Stop resource monitoring, write queued reviews, shut down the shared browser and close the duplicate index."""
+        if self._warm_task and not self._warm_task.done():
+            self._warm_task.cancel()
+        if self._resources is not None:
+            await self._resources.stop()
+        if self._review_store is not None:
+            await self._review_store.close()
+        if self._duplicate_index is not None:
+            self._duplicate_index.close()
+            self._duplicate_index = None
+        if self._screenshot_service is not None:
+            await self._screenshot_service.close()
+            self._screenshot_service = None
@@ -1,20 +1,398 @@
 """
 Screenshot service for capturing web pages using Playwright.
+
+By default each process launches its own Chromium. With CAPTURE_SERVICE_URL
+set, captures are sent to the shared capture service (capture_service.py)
+instead, which runs them on its warm browser pool with this same class.
 """
 import asyncio
 import base64
+import os
+import re
 from pathlib import Path
-from typing import Optional, List
+from typing import Any, Dict, Optional, List, Tuple
+from urllib.parse import urlsplit
 import validators
 from playwright.async_api import async_playwright, Browser, Page
 
+# Shared capture service (capture_service.py); empty launches Chromium in this process
+CAPTURE_SERVICE_URL = os.getenv('CAPTURE_SERVICE_URL', '')
+CAPTURE_SERVICE_TOKEN = os.getenv('CAPTURE_SERVICE_TOKEN', '')
+# Seconds a remote capture may take beyond its navigation timeout (scrolling, screenshots, views)
+REMOTE_CAPTURE_OVERHEAD = 60.0
+# Text elements checked for contrast, and examples kept per metric
+METRICS_MAX_TEXT_ELEMENTS = 400
+METRICS_MAX_EXAMPLES = 3
+
+# Collects everything capture_page() needs from the loaded DOM in one round trip
+PAGE_CONTENT_SCRIPT = """
+() => {
+    const clean = (s) => (s || '').replace(/\\s+/g, ' ').trim();
+    const headings = Array.from(document.querySelectorAll('h1, h2, h3, h4'))
+        .map((h) => [Number(h.tagName[1]), clean(h.innerText)])
+        .filter((h) => h[1])
+        .slice(0, 100);
+    const imageAlts = Array.from(document.images)
+        .filter((img) => img.naturalWidth >= 32 && img.naturalHeight >= 32)
+        .map((img) => (img.hasAttribute('alt') ? clean(img.getAttribute('alt')) : null))
+        .slice(0, 200);
+    return {
+        title: document.title,
+        text: document.body ? document.body.innerText : '',
+        headings,
+        imageAlts,
+    };
+}
+"""
+
+# Deterministic accessibility and structure metrics, measured on the loaded DOM
+# so the model does not have to estimate them from screenshots
+PAGE_METRICS_SCRIPT = """
+({ maxTextElements, maxExamples }) => {
+    const clean = (s) => (s || '').replace(/\\s+/g, ' ').trim();
+    const snippet = (s) => clean(s).slice(0, 40);
+    const visible = (el) => {
+        const rect = el.getBoundingClientRect();
+        if (rect.width === 0 || rect.height === 0) return false;
+        const style = getComputedStyle(el);
+        return style.visibility !== 'hidden' && style.display !== 'none' && Number(style.opacity) > 0.05;
+    };
+    const words = (s) => (clean(s).match(/\\S+/g) || []).length;
+
+    // Headings: outline problems a reader of the screenshots cannot see
+    const levels = Array.from(document.querySelectorAll('h1, h2, h3, h4, h5, h6'))
+        .filter((h) => clean(h.innerText))
+        .map((h) => Number(h.tagName[1]));
+    let skipped = 0;
+    levels.forEach((level, i) => { if (i > 0 && level > levels[i - 1] + 1) skipped += 1; });
+
+    const images = Array.from(document.images).filter((img) => img.naturalWidth >= 32 && img.naturalHeight >= 32);
+
+    // Contrast (WCAG 2): text color against the nearest opaque background;
+    // text over background images is skipped, since its backdrop is unknown
+    const parseColor = (value) => {
+        const m = (value || '').match(/^rgba?\\(([^)]+)\\)$/);
+        if (!m) return null;
+        const p = m[1].split(/[\\s,\\/]+/).filter(Boolean).map(Number);
+        return { r: p[0], g: p[1], b: p[2], a: p.length > 3 ? p[3] : 1 };
+    };
+    const over = (top, bottom) => ({
+        r: top.r * top.a + bottom.r * (1 - top.a),
+        g: top.g * top.a + bottom.g * (1 - top.a),
+        b: top.b * top.a + bottom.b * (1 - top.a),
+        a: 1,
+    });
+    const background = (el) => {
+        const layers = [];
+        for (let node = el; node && node.nodeType === 1; node = node.parentElement) {
+            const style = getComputedStyle(node);
+            if (style.backgroundImage && style.backgroundImage !== 'none') return null;
+            const color = parseColor(style.backgroundColor);
+            if (color && color.a > 0) {
+                layers.push(color);
+                if (color.a >= 1) break;
+            }
+        }
+        return layers.reverse().reduce((below, layer) => over(layer, below), { r: 255, g: 255, b: 255, a: 1 });
+    };
+    const channel = (v) => { v /= 255; return v <= 0.03928 ? v / 12.92 : Math.pow((v + 0.055) / 1.055, 2.4); };
+    const luminance = (c) => 0.2126 * channel(c.r) + 0.7152 * channel(c.g) + 0.0722 * channel(c.b);
+    const contrastRatio = (a, b) => {
+        const [light, dark] = [luminance(a), luminance(b)].sort((x, y) => y - x);
+        return (light + 0.05) / (dark + 0.05);
+    };
+    const hex = (c) => '#' + [c.r, c.g, c.b].map((v) => Math.round(v).toString(16).padStart(2, '0')).join('');
+
+    const textElements = new Map();
+    const walker = document.createTreeWalker(document.body || document.documentElement, NodeFilter.SHOW_TEXT);
+    for (let node = walker.nextNode(); node; node = walker.nextNode()) {
+        const parent = node.parentElement;
+        const count = words(node.textContent);
+        if (!parent || !count || ['SCRIPT', 'STYLE', 'NOSCRIPT'].includes(parent.tagName)) continue;
+        textElements.set(parent, (textElements.get(parent) || 0) + count);
+    }
+    let checked = 0, smallWords = 0, totalWords = 0;
+    const failures = [];
+    for (const [el, count] of textElements) {
+        if (!visible(el)) continue;
+        const style = getComputedStyle(el);
+        const size = parseFloat(style.fontSize) || 16;
+        totalWords += count;
+        if (size < 14) smallWords += count;
+        if (checked >= maxTextElements) continue;
+        const bg = background(el);
+        const fg = parseColor(style.color);
+        if (!bg || !fg) continue;
+        checked += 1;
+        const large = size >= 24 || (size >= 18.66 && Number(style.fontWeight) >= 700);
+        const ratio = contrastRatio(over(fg, bg), bg);
+        if (ratio < (large ? 3 : 4.5)) {
+            failures.push({ text: snippet(el.innerText), ratio: Math.round(ratio * 100) / 100,
+                            fg: hex(over(fg, bg)), bg: hex(bg), size: Math.round(size), large });
+        }
+    }
+    failures.sort((a, b) => a.ratio - b.ratio);
+
+    // Tap targets: WCAG 2.5.8 minimum is 24x24 CSS px, platform guidance 44x44;
+    // links inside running text are exempt
+    const targets = Array.from(document.querySelectorAll(
+        'a[href], button, input:not([type=hidden]), select, textarea, summary, [role=button], [role=link]'
+    )).filter((el) => visible(el) && !(el.tagName === 'A' && el.closest('p')));
+    const small = targets
+        .map((el) => ({ el, rect: el.getBoundingClientRect() }))
+        .filter(({ rect }) => rect.width < 44 || rect.height < 44);
+    small.sort((a, b) => a.rect.width * a.rect.height - b.rect.width * b.rect.height);
+
+    // Links
+    const vagueNames = ['click here', 'here', 'read more', 'more', 'learn more', 'link', 'view', 'see more', 'view more'];
+    const links = { total: 0, internal: 0, external: 0, mailto: 0, placeholder: 0, vague: 0, unnamed: 0 };
+    for (const a of document.querySelectorAll('a[href]')) {
+        const href = a.getAttribute('href').trim();
+        links.total += 1;
+        if (href === '#' || href === '' || href.toLowerCase().startsWith('javascript:')) links.placeholder += 1;
+        else if (href.toLowerCase().startsWith('mailto:')) links.mailto += 1;
+        else if (a.host && a.host !== location.host) links.external += 1;
+        else links.internal += 1;
+        const img = a.querySelector('img[alt]');
+        const name = clean(a.innerText) || clean(a.getAttribute('aria-label')) || clean(img && img.getAttribute('alt'))
+            || clean(a.getAttribute('title'));
+        if (!name) links.unnamed += 1;
+        else if (vagueNames.includes(name.toLowerCase())) links.vague += 1;
+    }
+
+    const paragraphs = Array.from(document.querySelectorAll('p')).map((p) => words(p.innerText)).filter((n) => n >= 5);
+    const fields = Array.from(document.querySelectorAll(
+        'input:not([type=hidden]):not([type=submit]):not([type=button]):not([type=reset]), select, textarea'
+    ));
+    const root = document.scrollingElement || document.documentElement;
+    const screens = Math.max(1, root.scrollHeight / window.innerHeight);
+
+    return {
+        headings: { total: levels.length, h1: levels.filter((level) => level === 1).length, skipped },
+        images: {
+            total: images.length,
+            missing_alt: images.filter((img) => !img.hasAttribute('alt')).length,
+            decorative: images.filter((img) => img.hasAttribute('alt') && !clean(img.getAttribute('alt'))).length,
+        },
+        contrast: { checked, failures: failures.length, worst: failures.slice(0, maxExamples) },
+        tap_targets: {
+            total: targets.length,
+            under_24: small.filter(({ rect }) => rect.width < 24 || rect.height < 24).length,
+            under_44: small.length,
+            smallest: small.slice(0, maxExamples).map(({ el, rect }) => ({
+                text: snippet(el.innerText || el.getAttribute('aria-label') || el.tagName.toLowerCase()),
+                width: Math.round(rect.width),
+                height: Math.round(rect.height),
+            })),
+        },
+        text: {
+            words: totalWords,
+            words_per_screen: Math.round(totalWords / screens),
+            paragraphs: paragraphs.length,
+            long_paragraphs: paragraphs.filter((n) => n > 120).length,
+            small_text_share: totalWords ? Math.round(100 * smallWords / totalWords) / 100 : 0,
+        },
+        links,
+        page: {
+            lang: document.documentElement.getAttribute('lang') || null,
+            viewport_meta: !!document.querySelector('meta[name=viewport]'),
+            unlabeled_fields: fields.filter((el) => !(el.labels && el.labels.length)
+                && !el.getAttribute('aria-label') && !el.getAttribute('aria-labelledby') && !el.getAttribute('title')).length,
+        },
+    };
+}
+"""
+
+# Scrolls down in viewport steps (so lazy content loads) until the bottom or
+# the height budget is reached, then reports page height and section starts
+SCROLL_SCRIPT = """
+async ({ maxHeight, stepDelay, maxSteps }) => {
+    const root = document.scrollingElement || document.documentElement;
+    const step = window.innerHeight;
+    for (let i = 0; i < maxSteps; i++) {
+        const target = Math.min(window.scrollY + step, maxHeight);
+        window.scrollTo(0, target);
+        await new Promise((resolve) => setTimeout(resolve, stepDelay));
+        if (window.scrollY + step >= root.scrollHeight - 2 || target >= maxHeight) {
+            break;
+        }
+    }
+    window.scrollTo(0, 0);
+    await new Promise((resolve) => setTimeout(resolve, stepDelay));
+
+    const boundaries = new Set();
+    const selector = 'section, header, footer, article, main > *, body > *, h1, h2';
+    for (const element of document.querySelectorAll(selector)) {
+        const top = Math.round(element.getBoundingClientRect().top + window.scrollY);
+        if (top > 0 && top < maxHeight) {
+            boundaries.add(top);
+        }
+    }
+    return {
+        pageHeight: root.scrollHeight,
+        boundaries: Array.from(boundaries).sort((a, b) => a - b).slice(0, 500),
+    };
+}
+"""
+
+
+# Extra viewport profiles captured beside the desktop view. Scale factor 1
+# keeps screenshots small; 'screens' is how many viewport heights are kept.
+VIEWPORT_PROFILES: Dict[str, Dict[str, Any]] = {
+    'tablet': {
+        'width': 820, 'height': 1180, 'screens': 1,
+        'context': {
+            'is_mobile': True, 'has_touch': True, 'device_scale_factor': 1,
+            'user_agent': (
+                'Mozilla/5.0 (iPad; CPU OS 17_0 like Mac OS X) AppleWebKit/605.1.15 '
+                '(KHTML, like Gecko) Version/17.0 Mobile/15E148 Safari/604.1'
+            ),
+        },
+    },
+    'mobile': {
+        'width': 390, 'height': 844, 'screens': 3,
+        'context': {
+            'is_mobile': True, 'has_touch': True, 'device_scale_factor': 1,
+            'user_agent': (
+                'Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) AppleWebKit/605.1.15 '
+                '(KHTML, like Gecko) Version/17.0 Mobile/15E148 Safari/604.1'
+            ),
+        },
+    },
+}
+
+
+class AssetCache:
+    """
+    In-memory cache of static responses shared by the browser contexts of one capture.
+
+    Browser contexts do not share Chromium's HTTP cache, so each viewport
+    would download every image, font, stylesheet and script again. Routed
+    through this cache, an asset is fetched once; contexts requesting it
+    while the fetch is in flight wait for that fetch.
+
+    The contexts emulate different devices (User-Agent, viewport), so only
+    responses that cannot depend on the device are shared between them:
+    images, fonts and fingerprinted scripts and stylesheets, unless their
+    Vary header names a device header. Other scripts and stylesheets are
+    cached per device profile. Documents are never cached.
+    """
+
+    CACHED_TYPES = ('stylesheet', 'script', 'image', 'font')
+    SHARED_TYPES = ('image', 'font')
+    # Content-hashed file names (app.3f9a1c2b.js, main-4c1d2e3f.css) never change per client
+    FINGERPRINTED = re.compile(r'[.\-_~][0-9a-f]{8,}\.(?:m?js|css)$', re.IGNORECASE)
+    # Vary values under which the response can differ between device profiles
+    DEVICE_VARY = ('*', 'user-agent', 'sec-ch-', 'viewport-width', 'width', 'dpr')
+    # Headers describing the original transfer, not the decoded body we replay
+    DROPPED_HEADERS = ('content-encoding', 'content-length', 'transfer-encoding')
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        """
+        Initialize cache.
+
+        Args:
+            max_bytes: Total body bytes kept; larger assets pass through uncached
+        """
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.pending: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, request, profile: str) -> str:
+        """Cache key of a request: its URL if any device may share it, else the URL within the profile."""
+        if request.resource_type in self.SHARED_TYPES or self.FINGERPRINTED.search(urlsplit(request.url).path):
+            return request.url
+        return f"{profile} {request.url}"
+
+    async def _fetch(self, route, key: str) -> Optional[Dict[str, Any]]:
+        future = asyncio.get_running_loop().create_future()
+        self.pending[key] = future
+        entry = None
+        shareable = False
+        try:
+            response = await route.fetch()
+            body = await response.body()
+            entry = {
+                'status': response.status,
+                'headers': {k: v for k, v in response.headers.items() if k.lower() not in self.DROPPED_HEADERS},
+                'body': body,
+            }
+            vary = response.headers.get('vary', '').lower()
+            # A shared key holding a device-dependent response would leak it to other profiles
+            shareable = key != route.request.url or not any(name in vary for name in self.DEVICE_VARY)
+            if shareable and response.ok and self.bytes + len(body) <= self.max_bytes:
+                self.entries[key] = entry
+                self.bytes += len(body)
+        except Exception:
+            entry = None
+        finally:
+            self.pending.pop(key, None)
+            # Waiters load it from the network when the response is not theirs to reuse
+            future.set_result(entry if shareable else None)
+        return entry
+
+    def handler(self, profile: str):
+        """
+        Playwright route handler for a browser context.
+
+        Args:
+            profile: Device profile of the context (viewport and User-Agent)
+
+        Returns:
+            Coroutine function taking the route
+        """
+        async def handle(route):
+            await self.handle(route, profile)
+        return handle
+
+    async def handle(self, route, profile: str = ''):
+        """Serve cacheable static GETs from the cache, pass the rest through."""
+        request = route.request
+        try:
+            if request.method != 'GET' or request.resource_type not in self.CACHED_TYPES:
+                await route.continue_()
+                return
+
+            key = self.key(request, profile)
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.hits += 1
+            elif key in self.pending:
+                entry = await self.pending[key]
+                self.hits += entry is not None
+            else:
+                self.misses += 1
+                entry = await self._fetch(route, key)
+
+            if entry is None:
+                await route.continue_()
+            else:
+                await route.fulfill(status=entry['status'], headers=entry['headers'], body=entry['body'])
+        except Exception:
+            # The page navigated away or closed while the request was routed
+            pass
+
 
 class ScreenshotService:
     """Captures screenshots of URLs using Playwright."""
 
-    def __init__(self):
+    def __init__(self, service_url: Optional[str] = None, token: Optional[str] = None):
+        """
+        Initialize screenshot service.
+
+        Args:
+            service_url: Capture service to send captures to instead of launching
+                Chromium (default: CAPTURE_SERVICE_URL; '' forces a local browser)
+            token: Shared secret of the capture service (default: CAPTURE_SERVICE_TOKEN)
+        """
         self.browser: Optional[Browser] = None
         self.playwright = None
+        self.service_url = (CAPTURE_SERVICE_URL if service_url is None else service_url).rstrip('/')
+        self.token = CAPTURE_SERVICE_TOKEN if token is None else token
+        self._session = None
 
     async def __aenter__(self):
         """Context manager entry."""
@@ -26,7 +404,13 @@ class ScreenshotService:
         await self.close()
 
     async def start(self):
-        """Initialize Playwright browser."""
+        """Initialize Playwright browser (or, in client mode, the HTTP session to the capture service)."""
+        if self.service_url:
+            if self._session is None:
+                import aiohttp
+                headers = {'Authorization': f"Bearer {self.token}"} if self.token else {}
+                self._session = aiohttp.ClientSession(headers=headers)
+            return
         if not self.browser:
             self.playwright = await async_playwright().start()
             self.browser = await self.playwright.chromium.launch(
@@ -34,8 +418,23 @@ class ScreenshotService:
                 args=['--no-sandbox', '--disable-setuid-sandbox']
             )
 
+    async def warm_up(self):
+        """Launch the browser and render a blank page so the first capture is fast."""
+        await self.start()
+        if self.service_url:
+            # The service keeps its own pool warm; make sure it is reachable
+            async with self._session.get(f"{self.service_url}/health") as response:
+                response.raise_for_status()
+            return
+        page = await self.browser.new_page()
+        await page.goto('about:blank')
+        await page.close()
+
     async def close(self):
         """Close browser and cleanup."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
         if self.browser:
             await self.browser.close()
             self.browser = None
@@ -43,6 +442,66 @@ class ScreenshotService:
             await self.playwright.stop()
             self.playwright = None
 
+    @staticmethod
+    def encode(value: Any) -> Any:
+        """Make a capture result JSON-safe (bytes become {'__bytes__': base64})."""
+        if isinstance(value, bytes):
+            return {'__bytes__': base64.b64encode(value).decode('ascii')}
+        if isinstance(value, dict):
+            return {key: ScreenshotService.encode(item) for key, item in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [ScreenshotService.encode(item) for item in value]
+        return value
+
+    @staticmethod
+    def decode(value: Any) -> Any:
+        """Inverse of encode()."""
+        if isinstance(value, dict):
+            if set(value) == {'__bytes__'}:
+                return base64.b64decode(value['__bytes__'])
+            return {key: ScreenshotService.decode(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [ScreenshotService.decode(item) for item in value]
+        return value
+
+    async def _remote(self, method: str, **kwargs) -> Any:
+        """
+        Run a capture method on the capture service.
+
+        Args:
+            method: ScreenshotService method name
+            **kwargs: JSON-safe arguments of the method
+
+        Returns:
+            Decoded result
+
+        Raises:
+            ValueError: If the service rejected the arguments
+            Exception: If the capture failed or the service is unreachable
+        """
+        import aiohttp
+
+        await self.start()
+        seconds = kwargs.get('timeout', 30.0) + kwargs.get('grace', 0.0) + REMOTE_CAPTURE_OVERHEAD
+        try:
+            async with self._session.post(
+                f"{self.service_url}/capture/{method}",
+                json=kwargs,
+                timeout=aiohttp.ClientTimeout(total=seconds)
+            ) as response:
+                body = await response.json(content_type=None)
+                status = response.status
+        except (aiohttp.ClientError, ValueError) as e:
+            raise Exception(f"Capture service unavailable: {type(e).__name__} {e}")
+        if status == 400:
+            raise ValueError(body.get('error'))
+        if status != 200:
+            raise Exception(body.get('error') or f"Capture service returned {status}")
+        result = self.decode(body['result'])
+        if isinstance(result, dict) and 'headings' in result:
+            result['headings'] = [tuple(heading) for heading in result['headings']]
+        return result
+
     @staticmethod
     def is_valid_url(url: str) -> bool:
         """
@@ -83,20 +542,20 @@ class ScreenshotService:
         viewport_width: int = 1920,
         viewport_height: int = 1080,
         wait_until: str = 'networkidle'
-    ) -> str:
+    ) -> bytes:
         """
         Capture screenshot of a URL.
 
         Args:
             url: URL to screenshot
-            output_path: Optional path to save screenshot
+            output_path: Optional path to also save the screenshot to
             full_page: Capture full page or just viewport
             viewport_width: Browser viewport width
             viewport_height: Browser viewport height
             wait_until: When to consider navigation complete
 
         Returns:
-            Path to saved screenshot
+            PNG image bytes
 
         Raises:
             ValueError: If URL is invalid
@@ -107,8 +566,18 @@ class ScreenshotService:
 
         url = self.normalize_url(url)
 
+        if self.service_url:
+            screenshot = await self._remote(
+                'capture_screenshot', url=url, full_page=full_page,
+                viewport_width=viewport_width, viewport_height=viewport_height, wait_until=wait_until
+            )
+            if output_path:
+                Path(output_path).write_bytes(screenshot)
+            return screenshot
+
         await self.start()
 
+        page = None
         try:
             page = await self.browser.new_page(
                 viewport={'width': viewport_width, 'height': viewport_height}
@@ -120,37 +589,337 @@ class ScreenshotService:
             # Wait a bit for dynamic content
             await page.wait_for_timeout(2000)
 
-            # Take screenshot
-            if output_path:
-                await page.screenshot(path=output_path, full_page=full_page)
-                screenshot_path = output_path
+            # Take screenshot (kept in memory; written to disk only if asked)
+            return await page.screenshot(path=output_path, full_page=full_page)
+
+        except Exception as e:
+            raise Exception(f"Failed to capture screenshot: {str(e)}")
+        finally:
+            if page is not None:
+                await page.close()
+
+    @staticmethod
+    def plan_segments(
+        page_height: int,
+        budget_height: int,
+        viewport_height: int,
+        boundaries: Optional[List[int]] = None
+    ) -> List[Tuple[int, int]]:
+        """
+        Split the captured part of a page into viewport-sized segments,
+        cutting at section boundaries where possible.
+
+        A segment ends at the section boundary closest to one viewport height
+        below its top, as long as that boundary lies within 0.6-1.4 viewport
+        heights; otherwise it is cut at exactly one viewport height.
+
+        Args:
+            page_height: Full scroll height of the page
+            budget_height: Maximum height to capture
+            viewport_height: Browser viewport height
+            boundaries: Y offsets where page sections start
+
+        Returns:
+            List of (top, height) segments covering min(page_height, budget_height)
+        """
+        limit = max(1, min(page_height, budget_height))
+        boundaries = sorted(b for b in (boundaries or []) if 0 < b < limit)
+        segments = []
+        top = 0
+        while top < limit:
+            target = top + viewport_height
+            if target >= limit:
+                bottom = limit
             else:
-                # Generate temp filename
-                from tempfile import NamedTemporaryFile
-                with NamedTemporaryFile(delete=False, suffix='.png') as tmp:
-                    screenshot_path = tmp.name
-                await page.screenshot(path=screenshot_path, full_page=full_page)
+                low, high = top + int(viewport_height * 0.6), top + int(viewport_height * 1.4)
+                nearby = [b for b in boundaries if low <= b <= high]
+                bottom = min(nearby, key=lambda b: abs(b - target)) if nearby else target
+                # Avoid a sliver at the end of the budget
+                if limit - bottom < viewport_height * 0.25:
+                    bottom = limit
+            segments.append((top, bottom - top))
+            top = bottom
+        return segments
+
+    async def capture_page(
+        self,
+        url: str,
+        full_page: bool = True,
+        viewport_width: int = 1920,
+        viewport_height: int = 1080,
+        wait_until: str = 'networkidle',
+        max_height: int = 12000,
+        max_pixels: int = 25_000_000,
+        timeout: float = 30.0,
+        context_options: Optional[Dict[str, Any]] = None,
+        asset_cache: Optional[AssetCache] = None
+    ) -> Dict[str, Any]:
+        """
+        Load a URL once and capture screenshots, text and structure together.
+
+        Full-page captures are bounded: the page is scrolled in viewport steps
+        (triggering lazy loading) until the height budget runs out, and only
+        that part is captured, as section-aligned segments rather than one
+        huge bitmap.
+
+        Args:
+            url: URL to capture
+            full_page: Capture the page down to the budget, or just the viewport
+            viewport_width: Browser viewport width
+            viewport_height: Browser viewport height
+            wait_until: When to consider navigation complete
+            max_height: Maximum captured page height in pixels
+            max_pixels: Maximum captured pixels (width * height) in total
+            timeout: Navigation timeout in seconds (capped at 30)
+            context_options: Extra browser context options (device emulation)
+            asset_cache: Cache shared with concurrent captures of the same page
+                (local browser only; the capture service uses its own)
+
+        Returns:
+            Dict with screenshots (PNG bytes per segment, top to bottom), url
+            (after redirects), title, text (innerText), headings (list of
+            (level, text)), image_alts (alt text per image, None where missing),
+            metrics (PAGE_METRICS_SCRIPT measurements, None if they failed),
+            page_height, captured_height and truncation_note (None unless the
+            page was longer than the budget)
+
+        Raises:
+            ValueError: If URL is invalid
+            Exception: If capture fails
+        """
+        if not self.is_valid_url(url):
+            raise ValueError(f"Invalid URL: {url}")
+
+        url = self.normalize_url(url)
+
+        if self.service_url:
+            return await self._remote(
+                'capture_page', url=url, timeout=timeout, full_page=full_page, viewport_width=viewport_width,
+                viewport_height=viewport_height, wait_until=wait_until, max_height=max_height,
+                max_pixels=max_pixels, context_options=context_options
+            )
+
+        await self.start()
+
+        budget_height = min(max_height, max_pixels // viewport_width) if full_page else viewport_height
+
+        context = None
+        try:
+            context = await self.browser.new_context(
+                viewport={'width': viewport_width, 'height': viewport_height},
+                **(context_options or {})
+            )
+            if asset_cache is not None:
+                profile = f"{viewport_width}x{viewport_height} {(context_options or {}).get('user_agent', '')}"
+                await context.route('**/*', asset_cache.handler(profile))
+            page = await context.new_page()
 
-            await page.close()
-            return screenshot_path
+            # Single navigation shared by every artifact below
+            await page.goto(url, wait_until=wait_until, timeout=min(timeout, 30.0) * 1000)
+
+            # Wait a bit for dynamic content
+            await page.wait_for_timeout(2000)
+
+            layout = await page.evaluate(SCROLL_SCRIPT, {
+                'maxHeight': budget_height,
+                'stepDelay': 250,
+                'maxSteps': 40,
+            })
+            content = await page.evaluate(PAGE_CONTENT_SCRIPT)
+            try:
+                metrics = await page.evaluate(PAGE_METRICS_SCRIPT, {
+                    'maxTextElements': METRICS_MAX_TEXT_ELEMENTS,
+                    'maxExamples': METRICS_MAX_EXAMPLES,
+                })
+            except Exception as e:
+                print(f"Warning: Page metrics of {url} failed: {e}")
+                metrics = None
+
+            page_height = max(int(layout['pageHeight']), viewport_height)
+            segments = self.plan_segments(page_height, budget_height, viewport_height, layout['boundaries'])
+            screenshots = []
+            for top, height in segments:
+                screenshots.append(await page.screenshot(
+                    clip={'x': 0, 'y': top, 'width': viewport_width, 'height': height},
+                    full_page=True
+                ))
+
+            captured_height = sum(height for _, height in segments)
+            truncation_note = None
+            if full_page and page_height > captured_height:
+                truncation_note = (
+                    f"Only the top {captured_height}px of this {page_height}px page were captured "
+                    f"(about {100 * captured_height // page_height}%). Do not penalize the portfolio "
+                    f"for content that is not shown; judge what is visible and say what could not be seen."
+                )
+
+            return {
+                'screenshots': screenshots,
+                'url': page.url,
+                'title': content['title'],
+                'text': content['text'],
+                'headings': [tuple(heading) for heading in content['headings']],
+                'image_alts': content['imageAlts'],
+                'metrics': metrics,
+                'page_height': page_height,
+                'captured_height': captured_height,
+                'truncation_note': truncation_note,
+            }
 
         except Exception as e:
-            raise Exception(f"Failed to capture screenshot: {str(e)}")
+            raise Exception(f"Failed to capture page: {str(e)}")
+        finally:
+            if context is not None:
+                await context.close()
+
+    @staticmethod
+    def compose_screens(screenshots: List[bytes], quality: int = 80) -> bytes:
+        """
+        Place the screens of a narrow viewport side by side in one JPEG.
+
+        A phone-width capture would otherwise be cut into many thin tiles;
+        side by side, three mobile screens cost about one image of tokens.
+
+        Args:
+            screenshots: PNG screenshots, top to bottom
+            quality: JPEG quality
+
+        Returns:
+            JPEG bytes
+        """
+        import io
+        from PIL import Image
+
+        images = [Image.open(io.BytesIO(data)).convert('RGB') for data in screenshots]
+        gap = 16
+        width = sum(image.width for image in images) + gap * (len(images) - 1)
+        strip = Image.new('RGB', (width, max(image.height for image in images)), (128, 128, 128))
+        left = 0
+        for image in images:
+            strip.paste(image, (left, 0))
+            left += image.width + gap
+        output = io.BytesIO()
+        strip.save(output, format='JPEG', quality=quality)
+        return output.getvalue()
+
+    async def capture_view(
+        self,
+        url: str,
+        profile: str,
+        asset_cache: Optional[AssetCache] = None,
+        timeout: float = 30.0
+    ) -> Dict[str, Any]:
+        """
+        Capture the first screens of a page in an emulated device profile.
+
+        Args:
+            url: URL to capture
+            profile: Name in VIEWPORT_PROFILES
+            asset_cache: Cache shared with the other views of the page
+            timeout: Navigation timeout in seconds
+
+        Returns:
+            Dict with image (JPEG of the screens side by side), width, height,
+            screens and tap_targets (tap target metrics at this width, or None)
+        """
+        settings = VIEWPORT_PROFILES[profile]
+        capture = await self.capture_page(
+            url,
+            full_page=True,
+            viewport_width=settings['width'],
+            viewport_height=settings['height'],
+            max_height=settings['height'] * settings['screens'],
+            timeout=timeout,
+            context_options=settings['context'],
+            asset_cache=asset_cache
+        )
+        screens = capture['screenshots'][:settings['screens']]
+        image = await asyncio.to_thread(self.compose_screens, screens)
+        return {
+            'image': image,
+            'width': settings['width'],
+            'height': settings['height'],
+            'screens': len(screens),
+            'tap_targets': (capture.get('metrics') or {}).get('tap_targets'),
+        }
+
+    async def capture_views(
+        self,
+        url: str,
+        views: Tuple[str, ...] = ('tablet', 'mobile'),
+        grace: float = 3.0,
+        **kwargs
+    ) -> Dict[str, Any]:
+        """
+        Capture the desktop page and extra device views concurrently.
+
+        Every view loads in its own browser context of the shared browser,
+        with static assets fetched once through an AssetCache. The desktop
+        capture decides the timing: extra views still loading `grace`
+        seconds after it finished are dropped, as are views that fail.
+
+        Args:
+            url: URL to capture
+            views: Names in VIEWPORT_PROFILES captured beside the desktop view
+            grace: Seconds extra views may take after the desktop capture
+            **kwargs: Desktop options passed to capture_page
+
+        Returns:
+            capture_page result with 'viewports' added, mapping view names
+            to capture_view results
+        """
+        if self.service_url:
+            if not self.is_valid_url(url):
+                raise ValueError(f"Invalid URL: {url}")
+            return await self._remote(
+                'capture_views', url=self.normalize_url(url), views=list(views), grace=grace, **kwargs
+            )
+
+        cache = AssetCache()
+        timeout = kwargs.get('timeout', 30.0)
+        desktop = asyncio.create_task(self.capture_page(url, asset_cache=cache, **kwargs))
+        extra = {
+            name: asyncio.create_task(self.capture_view(url, name, cache, timeout))
+            for name in views if name in VIEWPORT_PROFILES
+        }
+        try:
+            capture = await desktop
+            if extra:
+                await asyncio.wait(extra.values(), timeout=grace)
+        finally:
+            for task in extra.values():
+                task.cancel()
+            # Let cancelled views close their contexts before the browser slot is released
+            await asyncio.gather(*extra.values(), return_exceptions=True)
+
+        capture['viewports'] = {}
+        for name, task in extra.items():
+            if task.cancelled():
+                print(f"Warning: {name} view of {url} was not ready in time, skipped")
+            elif task.exception() is not None:
+                print(f"Warning: {name} view of {url} failed: {task.exception()}")
+            else:
+                capture['viewports'][name] = task.result()
+        print(
+            f"Viewports ({url}): desktop + {', '.join(capture['viewports']) or 'none'}; "
+            f"asset cache {cache.hits} hits / {cache.misses} fetches, {cache.bytes / 1e6:.1f} MB"
+        )
+        return capture
 
     async def capture_multiple_screenshots(
         self,
         urls: List[str],
         output_dir: Optional[str] = None
-    ) -> List[str]:
+    ) -> List[Optional[bytes]]:
         """
         Capture screenshots of multiple URLs.
 
         Args:
             urls: List of URLs
-            output_dir: Optional directory to save screenshots
+            output_dir: Optional directory to also save screenshots to
 
         Returns:
-            List of paths to saved screenshots
+            List of PNG image bytes (None where capture failed)
         """
         await self.start()
         screenshots = []
@@ -162,20 +931,24 @@ class ScreenshotService:
                 else:
                     output_path = None
 
-                path = await self.capture_screenshot(url, output_path)
-                screenshots.append(path)
+                screenshot = await self.capture_screenshot(url, output_path)
+                screenshots.append(screenshot)
             except Exception as e:
                 print(f"Failed to capture {url}: {e}")
                 screenshots.append(None)
 
         return screenshots
 
-    async def get_page_text(self, url: str) -> str:
+    async def get_page_text(self, url: str, timeout: float = 30.0) -> str:
         """
         Extract text content from a URL.
 
+        Waits for the DOM plus at most 5s of network activity, so it also
+        serves as the fast fallback when a full capture runs late.
+
         Args:
             url: URL to extract text from
+            timeout: Navigation timeout in seconds (capped at 30)
 
         Returns:
             Text content
@@ -184,20 +957,29 @@ class ScreenshotService:
             raise ValueError(f"Invalid URL: {url}")
 
         url = self.normalize_url(url)
+        if self.service_url:
+            return await self._remote('get_page_text', url=url, timeout=timeout)
+
         await self.start()
 
+        page = None
         try:
             page = await self.browser.new_page()
-            await page.goto(url, wait_until='networkidle', timeout=30000)
+            await page.goto(url, wait_until='domcontentloaded', timeout=min(timeout, 30.0) * 1000)
+            try:
+                # Give client-rendered pages a moment, without waiting for every image
+                await page.wait_for_load_state('networkidle', timeout=5000)
+            except Exception:
+                pass
 
             # Extract text content
-            text = await page.evaluate('() => document.body.innerText')
-
-            await page.close()
-            return text
+            return await page.evaluate('() => document.body.innerText')
 
         except Exception as e:
             raise Exception(f"Failed to extract text: {str(e)}")
+        finally:
+            if page is not None:
+                await page.close()
 
     @staticmethod
     def image_to_base64(image_path: str) -> str:
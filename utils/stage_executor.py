@@ -0,0 +1,311 @@
+"""
+Staged execution of review jobs.
+
+A review runs fetch → extract → preprocess → llm → deliver. Holding one
+review slot for the whole job keeps the CPU idle while a job waits on
+Claude, and leaves the model idle while the next job extracts. Here each
+stage has its own worker pool (an AdjustableLimiter) and a bounded queue of
+jobs waiting for a worker. Jobs hold one stage at a time, so stages overlap
+across jobs:
+
+- a job leaving a stage keeps its worker until the next stage's queue has
+  room, so a slow stage pushes back on the ones before it (backpressure)
+  instead of piling up work in memory;
+- moving back to an earlier stage (e.g. a text fallback) never waits for
+  queue room, so jobs cannot deadlock on each other's queues;
+- every stage tracks busy, blocked (done but waiting to hand off) and queue
+  time, and reports its utilization, so the bottleneck stage is visible.
+
+The ResourceController limiters (capture, extract, llm) still apply inside
+the stages and keep memory in check; stage pools decide the ordering.
+"""
+import asyncio
+import contextvars
+import os
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from utils.resource_controller import AdjustableLimiter
+
+STAGES = ('fetch', 'extract', 'preprocess', 'llm', 'deliver')
+
+# Workers per stage
+DEFAULT_WORKERS = {
+    'fetch': int(os.getenv('STAGE_FETCH_WORKERS', '6')),
+    'extract': int(os.getenv('STAGE_EXTRACT_WORKERS', '4')),
+    'preprocess': int(os.getenv('STAGE_PREPROCESS_WORKERS', '2')),
+    'llm': int(os.getenv('STAGE_LLM_WORKERS', '8')),
+    'deliver': int(os.getenv('STAGE_DELIVER_WORKERS', '4')),
+}
+
+# Jobs that may wait for a stage's workers before upstream stages are held back
+STAGE_QUEUE_SIZE = int(os.getenv('STAGE_QUEUE_SIZE', '4'))
+
+# Utilization is reported over this many recent seconds
+METRICS_WINDOW = float(os.getenv('STAGE_METRICS_WINDOW', '300'))
+
+# Stage flow of the job running in the current task (None outside the pipeline)
+current_flow: contextvars.ContextVar[Optional['JobFlow']] = contextvars.ContextVar('current_flow', default=None)
+
+
+class Stage:
+    """One pipeline stage: a worker pool, a bounded queue in front of it and its counters."""
+
+    def __init__(self, name: str, workers: int, queue_size: int):
+        """
+        Initialize stage.
+
+        Args:
+            name: Stage name
+            workers: Jobs the stage works on at once
+            queue_size: Jobs that may wait for a worker
+        """
+        self.name = name
+        self.workers = AdjustableLimiter(name, workers, minimum=1, maximum=max(workers, 64))
+        self.queue_size = queue_size
+        self._queue = asyncio.Semaphore(queue_size)
+        self.queued = 0
+        self.busy = 0
+        self.blocked = 0
+        self.completed = 0
+        self.wait_seconds = 0.0
+        self.started_at = time.monotonic()
+        # Integrals of busy/blocked workers and queued jobs over time
+        self._area = {'busy': 0.0, 'blocked': 0.0, 'queued': 0.0}
+        self._changed_at = self.started_at
+        self._checkpoints: Deque[Tuple[float, Dict[str, float]]] = deque([(self.started_at, dict(self._area))])
+
+    def _advance(self):
+        """Accumulate the time since the last state change (call before changing counts)."""
+        now = time.monotonic()
+        elapsed = now - self._changed_at
+        self._area['busy'] += self.busy * elapsed
+        self._area['blocked'] += self.blocked * elapsed
+        self._area['queued'] += self.queued * elapsed
+        self._changed_at = now
+        if now - self._checkpoints[-1][0] >= 5:
+            self._checkpoints.append((now, dict(self._area)))
+            while len(self._checkpoints) > 2 and now - self._checkpoints[1][0] >= METRICS_WINDOW:
+                self._checkpoints.popleft()
+
+    async def reserve(self):
+        """Wait for room in the queue (the caller keeps its current worker meanwhile)."""
+        await self._queue.acquire()
+
+    async def admit(self, reserved: bool):
+        """
+        Wait in the queue for a worker.
+
+        Args:
+            reserved: Whether the job holds a queue place from reserve()
+                (forward moves); backward moves skip the queue bound
+        """
+        self._advance()
+        self.queued += 1
+        start = time.monotonic()
+        try:
+            await self.workers.acquire()
+        finally:
+            self._advance()
+            self.queued -= 1
+            if reserved:
+                self._queue.release()
+        self.wait_seconds += time.monotonic() - start
+        self.busy += 1
+
+    def block(self):
+        """The job finished its work here and waits to hand off to the next stage."""
+        self._advance()
+        self.busy -= 1
+        self.blocked += 1
+
+    def resume(self):
+        """The job works in this stage again (re-entered before handing off)."""
+        self._advance()
+        self.blocked -= 1
+        self.busy += 1
+
+    def release(self, blocked: bool):
+        """Give the worker back."""
+        self._advance()
+        if blocked:
+            self.blocked -= 1
+        else:
+            self.busy -= 1
+        self.completed += 1
+        self.workers.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Current state and utilization over the last METRICS_WINDOW seconds.
+
+        Returns:
+            Dict with workers, busy, blocked, queued, queue_size, completed,
+            avg_wait (seconds per job), utilization and blocked_share (of
+            worker time), and avg_queued (jobs)
+        """
+        self._advance()
+        now = time.monotonic()
+        since, area = self._checkpoints[0]
+        elapsed = max(now - since, 1e-9)
+        capacity = self.workers.limit * elapsed
+        return {
+            'workers': self.workers.limit,
+            'busy': self.busy,
+            'blocked': self.blocked,
+            'queued': self.queued,
+            'queue_size': self.queue_size,
+            'completed': self.completed,
+            'avg_wait': self.wait_seconds / self.completed if self.completed else 0.0,
+            'utilization': (self._area['busy'] - area['busy']) / capacity,
+            'blocked_share': (self._area['blocked'] - area['blocked']) / capacity,
+            'avg_queued': (self._area['queued'] - area['queued']) / elapsed,
+        }
+
+
+class JobFlow:
+    """A job's (or one document's) path through the stages; holds at most one worker."""
+
+    def __init__(self, executor: 'StageExecutor'):
+        self.executor = executor
+        self.stage: Optional[Stage] = None
+        self.blocked = False
+        self._token = None
+
+    def __enter__(self):
+        self._token = current_flow.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        current_flow.reset(self._token)
+
+    async def enter(self, name: str):
+        """Move the job into a stage, handing off the current worker."""
+        target = self.executor.stages[name]
+        if target is self.stage:
+            if self.blocked:
+                target.resume()
+                self.blocked = False
+            return
+
+        forward = self.stage is None or STAGES.index(name) > STAGES.index(self.stage.name)
+        if forward:
+            # Backpressure: the current worker stays taken until the next queue has room
+            await target.reserve()
+        self.close()
+        await target.admit(reserved=forward)
+        self.stage = target
+
+    def leave(self):
+        """Mark the current stage's work as done (the worker is kept until the next enter)."""
+        if self.stage is not None and not self.blocked:
+            self.stage.block()
+            self.blocked = True
+
+    def close(self):
+        """Release the held worker, if any."""
+        if self.stage is not None:
+            self.stage.release(self.blocked)
+            self.stage = None
+            self.blocked = False
+
+    def __call__(self, name: str) -> '_StageBlock':
+        return _StageBlock(self, name)
+
+
+class _StageBlock:
+    """Async context manager returned by JobFlow(name)."""
+
+    def __init__(self, flow: JobFlow, name: str):
+        self.flow = flow
+        self.name = name
+
+    async def __aenter__(self):
+        await self.flow.enter(self.name)
+        return self.flow
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.flow.leave()
+
+
+class _NoStage:
+    """Stand-in block when a job runs outside a flow."""
+
+    async def __aenter__(self):
+        return None
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+
+class StageExecutor:
+    """The stage pools shared by all jobs of a process."""
+
+    def __init__(self, workers: Optional[Dict[str, int]] = None, queue_size: Optional[int] = None):
+        """
+        Initialize executor.
+
+        Args:
+            workers: Workers per stage (default DEFAULT_WORKERS; missing stages use their default)
+            queue_size: Queue length per stage (default STAGE_QUEUE_SIZE)
+        """
+        workers = {**DEFAULT_WORKERS, **(workers or {})}
+        queue_size = queue_size if queue_size is not None else STAGE_QUEUE_SIZE
+        self.stages = {name: Stage(name, workers[name], queue_size) for name in STAGES}
+
+    def flow(self) -> JobFlow:
+        """
+        Start a job's flow; use as `with executor.flow():` around the job.
+
+        Returns:
+            JobFlow, made current for stage() in this task while the block runs
+        """
+        return JobFlow(self)
+
+    @staticmethod
+    def stage(name: str):
+        """
+        Async context manager running its body in a stage of the current flow.
+
+        Args:
+            name: One of STAGES
+
+        Returns:
+            Stage block, or a no-op block outside a flow
+        """
+        flow = current_flow.get()
+        return flow(name) if flow is not None else _NoStage()
+
+    def set_workers(self, name: str, workers: int) -> int:
+        """Resize a stage's worker pool at runtime; returns the new size."""
+        return self.stages[name].workers.set_limit(workers)
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Stats per stage, in pipeline order."""
+        return {name: stage.stats() for name, stage in self.stages.items()}
+
+    def bottleneck(self, metrics: Optional[Dict[str, Dict[str, Any]]] = None) -> Optional[str]:
+        """
+        The stage most likely limiting throughput: the busiest one with jobs
+        waiting for it (None while the pipeline has been idle).
+        """
+        metrics = metrics or self.metrics()
+        busiest = max(metrics, key=lambda name: (metrics[name]['utilization'], metrics[name]['avg_queued']))
+        return busiest if metrics[busiest]['utilization'] > 0 else None
+
+    def format_metrics(self) -> str:
+        """Format metrics() for a Discord message."""
+        metrics = self.metrics()
+        lines = [f"**Pipeline stages** (last {METRICS_WINDOW / 60:.0f} min)"]
+        for name, s in metrics.items():
+            lines.append(
+                f"{name}: {s['busy']}/{s['workers']} busy, {s['blocked']} blocked, {s['queued']}/{s['queue_size']} queued | "
+                f"utilization {s['utilization']:.0%}, blocked {s['blocked_share']:.0%}, "
+                f"avg wait {s['avg_wait']:.1f}s, {s['completed']} done"
+            )
+        bottleneck = self.bottleneck(metrics)
+        if bottleneck:
+            lines.append(f"Bottleneck: **{bottleneck}** (raise STAGE_{bottleneck.upper()}_WORKERS if resources allow)")
+        return '\n'.join(lines)
@@ -0,0 +1,143 @@
+"""
+Per-user submission history backed by SQLite.
+
+Each reviewed upload is stored with its extracted text, section structure
+and the feedback that was sent, so a revised version from the same user can
+be diffed against the previous one and re-reviewed incrementally. A
+revision review only covers the changes, so it is kept beside the last full
+review rather than replacing it.
+"""
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+
+class SubmissionHistory:
+    """Stores the latest reviewed submissions of each user."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS submissions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            file_type TEXT NOT NULL,
+            filename TEXT,
+            text TEXT NOT NULL,
+            sections TEXT NOT NULL,
+            feedback TEXT NOT NULL,
+            revision_feedback TEXT,
+            created_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_submissions_user_type
+            ON submissions (user_id, file_type, created_at);
+    """
+
+    def __init__(self, path: str = 'data/history.db', keep: int = 5):
+        """
+        Initialize submission history.
+
+        Args:
+            path: SQLite database file (shared by all processes on the node)
+            keep: Submissions kept per user and file type; older ones are pruned
+        """
+        self.path = path
+        self.keep = keep
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(self.SCHEMA)
+            columns = {row['name'] for row in conn.execute("PRAGMA table_info(submissions)")}
+            if 'revision_feedback' not in columns:
+                try:
+                    conn.execute("ALTER TABLE submissions ADD COLUMN revision_feedback TEXT")
+                except sqlite3.OperationalError:
+                    pass  # Added by another process in the meantime
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open a short-lived connection configured for multi-process access."""
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            yield conn
+        finally:
+            conn.close()
+
+    def record(
+        self,
+        user_id: str,
+        file_type: str,
+        filename: Optional[str],
+        text: str,
+        sections: List[Dict[str, str]],
+        feedback: str,
+        revision_feedback: Optional[str] = None
+    ) -> int:
+        """
+        Store a reviewed submission and prune the user's oldest ones.
+
+        Args:
+            user_id: Discord user id
+            file_type: 'resume' or 'portfolio'
+            filename: Uploaded file name
+            text: Extracted text
+            sections: Section structure from TextSections.split()
+            feedback: Last full review of the document (for a revision, the
+                full review the revision was compared against)
+            revision_feedback: Changes-only feedback sent for a revision
+
+        Returns:
+            Submission id
+        """
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO submissions "
+                "(user_id, file_type, filename, text, sections, feedback, revision_feedback, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    str(user_id), file_type, filename, text, json.dumps(sections), feedback,
+                    revision_feedback, time.time()
+                )
+            )
+            conn.execute(
+                "DELETE FROM submissions WHERE user_id = ? AND file_type = ? AND id NOT IN ("
+                "SELECT id FROM submissions WHERE user_id = ? AND file_type = ? "
+                "ORDER BY created_at DESC, id DESC LIMIT ?)",
+                (str(user_id), file_type, str(user_id), file_type, self.keep)
+            )
+            return cursor.lastrowid
+
+    def latest(self, user_id: str, file_type: str) -> Optional[Dict[str, Any]]:
+        """
+        Most recent submission of a user for a file type.
+
+        Args:
+            user_id: Discord user id
+            file_type: 'resume' or 'portfolio'
+
+        Returns:
+            Submission dict (id, filename, text, sections, feedback,
+            revision_feedback, created_at) or None
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT * FROM submissions WHERE user_id = ? AND file_type = ? "
+                "ORDER BY created_at DESC, id DESC LIMIT 1",
+                (str(user_id), file_type)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            'id': row['id'],
+            'filename': row['filename'],
+            'text': row['text'],
+            'sections': json.loads(row['sections']),
+            'feedback': row['feedback'],
+            'revision_feedback': row['revision_feedback'],
+            'created_at': row['created_at'],
+        }
@@ -0,0 +1,179 @@
+"""
+Token-reducing normalization of extracted PDF text.
+
+Extracted PDF text carries noise that costs tokens without adding content:
+running headers, footers and page numbers on every page, words hyphenated
+across lines, letter-spaced headings, ligature glyphs, runs of whitespace
+and text layers that appear twice. TextNormalizer cleans pages one at a
+time as they are extracted, so it never needs the whole document in memory,
+and reports the estimated token savings.
+"""
+import math
+import re
+from typing import Any, Dict, Iterable, Iterator, List, Set, Tuple
+
+# Ligature and invisible characters left behind by PDF text layers
+CHARACTER_FIXES = {
+    '\ufb00': 'ff',  # ﬀ ligature
+    '\ufb01': 'fi',  # ﬁ ligature
+    '\ufb02': 'fl',  # ﬂ ligature
+    '\ufb03': 'ffi',  # ﬃ ligature
+    '\ufb04': 'ffl',  # ﬄ ligature
+    '\ufb05': 'st',  # ﬅ ligature
+    '\ufb06': 'st',  # ﬆ ligature
+    '\u00a0': ' ',  # no-break space
+    '\u2009': ' ',  # thin space
+    '\u202f': ' ',  # narrow no-break space
+    '\u00ad': '',  # soft hyphen
+    '\u200b': '',  # zero-width space
+    '\u200c': '',  # zero-width non-joiner
+    '\u200d': '',  # zero-width joiner
+    '\ufeff': '',  # byte order mark
+}
+_CHARACTER_TABLE = str.maketrans(CHARACTER_FIXES)
+
+_PAGE_NUMBER = re.compile(r'^(?:page\s*)?[-–—]?\s*\d{1,3}\s*(?:(?:/|of)\s*\d{1,3})?\s*[-–—]?$', re.IGNORECASE)
+_LETTER_SPACED = re.compile(r'^(?:\S ){3,}\S$')
+_HYPHENATED = re.compile(r'[A-Za-z]{2,}-$')
+_SPACES = re.compile(r'[ \t\f\v]+')
+
+
+class TextNormalizer:
+    """Cleans extracted PDF text page by page and tracks token savings."""
+
+    def __init__(self, edge_lines: int = 3, min_dedupe_length: int = 40):
+        """
+        Initialize normalizer.
+
+        Args:
+            edge_lines: Lines at the top and bottom of each page checked for
+                running headers and footers
+            min_dedupe_length: Lines at least this long are dropped when they
+                repeat anywhere in the document (duplicated text layers);
+                shorter lines are only deduplicated when adjacent
+        """
+        self.edge_lines = edge_lines
+        self.min_dedupe_length = min_dedupe_length
+        self._edge_seen: Set[str] = set()
+        self._long_seen: Set[int] = set()
+        self.report: Dict[str, Any] = {
+            'pages': 0,
+            'chars_before': 0,
+            'chars_after': 0,
+            'tokens_before': 0,
+            'tokens_after': 0,
+            'boilerplate_dropped': 0,
+            'page_numbers_dropped': 0,
+            'duplicates_dropped': 0,
+            'hyphens_joined': 0,
+        }
+
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        """Rough token estimate for English text (about 4 characters per token)."""
+        return math.ceil(len(text) / 4)
+
+    @staticmethod
+    def _edge_key(line: str) -> str:
+        """Key under which running headers/footers match across pages (digits ignored)."""
+        return re.sub(r'\d+', '#', line.lower())
+
+    @staticmethod
+    def _fix_letter_spacing(line: str) -> str:
+        """Turn 'U S E R  R E S E A R C H' back into 'USER RESEARCH'."""
+        if not _LETTER_SPACED.match(line.replace('  ', ' ')):
+            return line
+        words = re.split(r'\s{2,}', line)
+        return ' '.join(word.replace(' ', '') for word in words)
+
+    def normalize_page(self, page_text: str) -> str:
+        """
+        Normalize one page, using what earlier pages showed about boilerplate.
+
+        Args:
+            page_text: Raw text of one page
+
+        Returns:
+            Cleaned page text
+        """
+        self.report['pages'] += 1
+        self.report['chars_before'] += len(page_text)
+        self.report['tokens_before'] += self.estimate_tokens(page_text)
+
+        # Clean each line and rejoin words hyphenated across line breaks
+        lines: List[str] = []
+        for raw in page_text.splitlines():
+            line = _SPACES.sub(' ', self._fix_letter_spacing(raw.translate(_CHARACTER_TABLE).strip()))
+            if line and lines and _HYPHENATED.search(lines[-1]) and line[0].islower():
+                lines[-1] = lines[-1][:-1] + line
+                self.report['hyphens_joined'] += 1
+            else:
+                lines.append(line)
+
+        content_indices = [i for i, line in enumerate(lines) if line]
+        edges = set(content_indices[:self.edge_lines] + content_indices[-self.edge_lines:])
+
+        kept: List[str] = []
+        previous = None
+        for index, line in enumerate(lines):
+            if not line:
+                if kept and kept[-1]:
+                    kept.append('')
+                continue
+            if index in edges:
+                if _PAGE_NUMBER.match(line):
+                    self.report['page_numbers_dropped'] += 1
+                    continue
+                key = self._edge_key(line)
+                # The first occurrence is kept as content; repeats on later pages are running headers/footers
+                if key in self._edge_seen:
+                    self.report['boilerplate_dropped'] += 1
+                    continue
+                self._edge_seen.add(key)
+            if line == previous:
+                self.report['duplicates_dropped'] += 1
+                continue
+            if len(line) >= self.min_dedupe_length:
+                fingerprint = hash(line.lower())
+                if fingerprint in self._long_seen:
+                    self.report['duplicates_dropped'] += 1
+                    continue
+                self._long_seen.add(fingerprint)
+            kept.append(line)
+            previous = line
+
+        text = '\n'.join(kept).strip()
+        self.report['chars_after'] += len(text)
+        self.report['tokens_after'] += self.estimate_tokens(text)
+        return text
+
+    def normalize_pages(self, pages: Iterable[str]) -> Iterator[str]:
+        """
+        Normalize pages lazily, in order.
+
+        Args:
+            pages: Raw page texts (e.g. PDFProcessor.extract_pages)
+
+        Yields:
+            Cleaned text per page (empty pages are skipped)
+        """
+        for page_text in pages:
+            text = self.normalize_page(page_text)
+            if text:
+                yield text
+
+    def normalize(self, pages: Iterable[str]) -> Tuple[str, Dict[str, Any]]:
+        """
+        Normalize a whole document.
+
+        Args:
+            pages: Raw page texts
+
+        Returns:
+            Tuple of (cleaned text with pages separated by blank lines, report
+            with page count, characters and estimated tokens before and after,
+            and counts of dropped boilerplate, page numbers, duplicate lines
+            and rejoined hyphenations)
+        """
+        text = '\n\n'.join(self.normalize_pages(pages))
+        return text, dict(self.report)
@@ -0,0 +1,277 @@
+"""
+Section splitting and section-level diffs of extracted document text.
+
+Resumes and text portfolios are split into titled sections (Experience,
+Skills, Case Study: ...) so that a revised upload can be compared with the
+previous version section by section and only what changed is re-reviewed.
+Portfolios are also grouped into case studies, which are reviewed one by
+one in parallel.
+"""
+import difflib
+import re
+from typing import Any, Dict, List
+
+# Section titles recognized even when they are not written in capitals
+KNOWN_HEADINGS = {
+    'objective', 'summary', 'profile', 'about', 'about me', 'experience',
+    'work experience', 'professional experience', 'relevant experience',
+    'work history', 'employment', 'education', 'skills', 'technical skills',
+    'tools', 'projects', 'selected projects', 'certifications', 'awards',
+    'publications', 'volunteer', 'volunteering', 'leadership', 'languages',
+    'interests', 'references', 'contact', 'qualifications', 'professional summary',
+    'problem statement', 'problem', 'research', 'user research', 'design process',
+    'process', 'ideation', 'wireframes', 'prototype', 'prototyping', 'testing',
+    'usability testing', 'solution', 'outcome', 'outcomes', 'impact', 'results',
+    'reflection', 'learnings', 'next steps', 'overview', 'my role', 'challenge',
+}
+
+# Parts of a single case study; any other heading directly followed by one of these starts a case study
+PROCESS_HEADINGS = {
+    'problem statement', 'problem', 'research', 'user research', 'design process',
+    'process', 'ideation', 'wireframes', 'prototype', 'prototyping', 'testing',
+    'usability testing', 'solution', 'outcome', 'outcomes', 'impact', 'results',
+    'reflection', 'learnings', 'next steps', 'overview', 'my role', 'challenge',
+}
+
+# Case studies shorter than this are teasers (a project list entry), kept with the introduction
+MIN_CASE_STUDY_CHARS = 300
+
+_CASE_STUDY_PATTERN = re.compile(r'^(case study|project)\b', re.IGNORECASE)
+_NUMBERED_TITLE = re.compile(r' \(\d+\)$')
+
+
+class TextSections:
+    """Splits document text into titled sections and diffs two versions."""
+
+    @staticmethod
+    def is_heading(line: str) -> bool:
+        """
+        Whether a line looks like a section heading.
+
+        Args:
+            line: Single line of extracted text
+
+        Returns:
+            True for short known titles, all-caps lines and short lines ending in ':'
+        """
+        stripped = line.strip()
+        title = stripped.rstrip(':').strip()
+        if not title or len(title) > 60 or len(title.split()) > 6:
+            return False
+        if title[-1] in '.,;' or not any(c.isalpha() for c in title):
+            return False
+        if title.lower() in KNOWN_HEADINGS or _CASE_STUDY_PATTERN.match(title):
+            return True
+        letters = [c for c in title if c.isalpha()]
+        if len(letters) >= 3 and all(c.isupper() for c in letters):
+            return True
+        return stripped.endswith(':') and len(title.split()) <= 4
+
+    @staticmethod
+    def split(text: str) -> List[Dict[str, str]]:
+        """
+        Split text into sections at heading lines.
+
+        Text before the first heading (name, contact details) becomes a
+        section titled 'Header'. Repeated titles are numbered so every title
+        is unique within a document.
+
+        Args:
+            text: Extracted document text
+
+        Returns:
+            List of {'title', 'text'} dicts in document order
+        """
+        sections = []
+        title = 'Header'
+        lines: List[str] = []
+        seen: Dict[str, int] = {}
+
+        def flush():
+            body = '\n'.join(lines).strip()
+            if body or title != 'Header':
+                key = title.lower()
+                seen[key] = seen.get(key, 0) + 1
+                unique = title if seen[key] == 1 else f"{title} ({seen[key]})"
+                sections.append({'title': unique, 'text': body})
+
+        for line in text.splitlines():
+            if TextSections.is_heading(line):
+                flush()
+                title = line.strip().rstrip(':').strip()
+                lines = []
+            else:
+                lines.append(line.strip())
+        flush()
+        return sections
+
+    @staticmethod
+    def case_studies(text: str) -> Dict[str, Any]:
+        """
+        Group a portfolio's sections into case studies.
+
+        A case study starts at a 'Case study ...' / 'Project ...' heading, or
+        at a heading of its own (usually the project name) directly followed
+        by a process heading (Problem, Research, ...). Process sections belong
+        to the case study before them; portfolio-level sections (About,
+        Skills, Contact, ...) end it and go to the introduction.
+
+        Args:
+            text: Extracted portfolio text
+
+        Returns:
+            Dict with intro (text outside case studies) and case_studies
+            (list of {'title', 'text'} in document order, each text keeping
+            its sub-headings)
+        """
+        sections = TextSections.split(text)
+        # split() numbers repeated titles ('Problem (2)'); each case study has its own Problem
+        names = [_NUMBERED_TITLE.sub('', section['title']) for section in sections]
+        titles = [name.lower() for name in names]
+        intro: List[str] = []
+        studies: List[Dict[str, Any]] = []
+        current = None
+
+        for index, section in enumerate(sections):
+            title = titles[index]
+            following = titles[index + 1] if index + 1 < len(titles) else ''
+            starts = _CASE_STUDY_PATTERN.match(title) or (
+                title != 'header' and title not in KNOWN_HEADINGS and following in PROCESS_HEADINGS
+            )
+            if starts:
+                current = {'title': names[index], 'parts': [section['text']]}
+                studies.append(current)
+            elif current is not None and (title in PROCESS_HEADINGS or title not in KNOWN_HEADINGS):
+                current['parts'].append(f"{names[index]}\n{section['text']}")
+            else:
+                current = None
+                intro.append(section['text'] if title == 'header' else f"{names[index]}\n{section['text']}")
+
+        case_studies = []
+        for study in studies:
+            body = '\n\n'.join(part for part in study['parts'] if part.strip())
+            if len(body) < MIN_CASE_STUDY_CHARS:
+                intro.append(f"{study['title']}\n{body}")
+            else:
+                case_studies.append({'title': study['title'], 'text': body})
+        return {'intro': '\n\n'.join(part for part in intro if part.strip()), 'case_studies': case_studies}
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        return re.sub(r'\s+', ' ', text).strip().lower()
+
+    @staticmethod
+    def diff(
+        old_sections: List[Dict[str, str]],
+        new_sections: List[Dict[str, str]]
+    ) -> Dict[str, Any]:
+        """
+        Compare two versions of a document section by section.
+
+        Sections are matched by title (case-insensitive); whitespace and case
+        changes alone do not count as edits.
+
+        Args:
+            old_sections: Sections of the previous version
+            new_sections: Sections of the new version
+
+        Returns:
+            Dict with added (new sections), removed (titles), changed (list of
+            {'title', 'diff', 'similarity'} with '-'/'+' prefixed lines),
+            unchanged (titles) and change_ratio (share of the new text that is
+            added or edited, 0.0-1.0)
+        """
+        old_by_title = {section['title'].lower(): section for section in old_sections}
+        new_titles = {section['title'].lower() for section in new_sections}
+
+        result = {'added': [], 'removed': [], 'changed': [], 'unchanged': [], 'change_ratio': 0.0}
+        changed_chars = 0
+        total_chars = 0
+
+        for section in new_sections:
+            total_chars += len(section['text'])
+            previous = old_by_title.get(section['title'].lower())
+            if previous is None:
+                result['added'].append(section)
+                changed_chars += len(section['text'])
+                continue
+            if TextSections._normalize(previous['text']) == TextSections._normalize(section['text']):
+                result['unchanged'].append(section['title'])
+                continue
+
+            old_lines = [l.strip() for l in previous['text'].splitlines() if l.strip()]
+            new_lines = [l.strip() for l in section['text'].splitlines() if l.strip()]
+            matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+            diff_lines = []
+            for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+                if tag == 'equal':
+                    continue
+                diff_lines.extend(f"- {line}" for line in old_lines[i1:i2])
+                diff_lines.extend(f"+ {line}" for line in new_lines[j1:j2])
+                changed_chars += sum(len(line) for line in new_lines[j1:j2])
+            result['changed'].append({
+                'title': section['title'],
+                'diff': diff_lines,
+                'similarity': round(matcher.ratio(), 3),
+            })
+
+        result['removed'] = [
+            section['title'] for section in old_sections
+            if section['title'].lower() not in new_titles
+        ]
+        if total_chars:
+            result['change_ratio'] = round(min(changed_chars / total_chars, 1.0), 3)
+        elif result['removed']:
+            result['change_ratio'] = 1.0
+        return result
+
+    @staticmethod
+    def format_changes(diff: Dict[str, Any], max_chars: int = 6000) -> str:
+        """
+        Format a section diff for a revision prompt.
+
+        Args:
+            diff: Result of diff()
+            max_chars: Maximum length of the formatted changes
+
+        Returns:
+            Changed, added and removed sections as plain text
+        """
+        parts = []
+        for change in diff['changed']:
+            parts.append(f"### Changed: {change['title']}\n" + '\n'.join(change['diff']))
+        for section in diff['added']:
+            parts.append(f"### Added: {section['title']}\n{section['text']}")
+        for title in diff['removed']:
+            parts.append(f"### Removed: {title}")
+        if diff['unchanged']:
+            parts.append("Unchanged sections: " + ', '.join(diff['unchanged']))
+        text = '\n\n'.join(parts)
+        if len(text) > max_chars:
+            text = text[:max_chars] + "\n[... further changes truncated]"
+        return text
+
+    @staticmethod
+    def summarize_feedback(feedback: str, max_chars: int = 1200) -> str:
+        """
+        Shorten earlier feedback to its headings and main points.
+
+        Keeps markdown headings and the first line of each bullet, which is
+        where the reviews state their recommendations.
+
+        Args:
+            feedback: Full feedback text from an earlier review
+            max_chars: Maximum length of the summary
+
+        Returns:
+            Condensed feedback
+        """
+        kept = []
+        for line in feedback.splitlines():
+            stripped = line.strip()
+            if re.match(r'^(#{1,4}\s|\*\*[^*]+\*\*:?\s*$|[-*•]\s|\d+\.\s)', stripped):
+                kept.append(stripped[:200])
+        summary = '\n'.join(kept) if kept else feedback.strip()
+        if len(summary) > max_chars:
+            summary = summary[:max_chars].rsplit('\n', 1)[0] + "\n[...]"
+        return summary
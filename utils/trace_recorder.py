@@ -0,0 +1,402 @@
+"""
+Opt-in recorder of review jobs for offline replay.
+
+With TRACE_DIR set, every review job (or a TRACE_SAMPLE_RATE share of them)
+is written to one compact zip archive. The archive holds the job's inputs,
+stage timings and fallbacks, and metadata of each LLM call (model, latency,
+tokens, prompt hash). It also stores the response text the replay tool
+feeds back instead of calling the API, plus the process's CPU time and RSS.
+
+TRACE_CONTENT decides how much user content is kept:
+- 'hash': SHA-256 digests and sizes only
+- 'redacted' (default): text and LLM responses with emails, phone numbers
+  and URL paths masked, and filenames reduced to their type hints
+- 'full': as redacted, but with the unmasked LLM responses, the original PDF
+  and the page screenshots, so extraction and captures can be replayed
+
+Traces are linked to the running job through a context variable, so the
+LLM client records its calls without the pipeline passing the trace along.
+tools/replay_traces.py reruns archives through the current code.
+"""
+import contextvars
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+import zipfile
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+TRACE_VERSION = 1
+
+_EMAIL = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b')
+_PHONE = re.compile(r'(?<!\d)(?:\+?\d{1,2}[-.\s]?)?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}(?!\d)')
+_URL_PATH = re.compile(r'\b(https?://[^/\s]+)/[^\s)>\]]*')
+_FILENAME_HINTS = ('resume', 'cv', 'portfolio')
+
+# Trace of the job running in the current task (None when not recording)
+current_trace: contextvars.ContextVar[Optional['JobTrace']] = contextvars.ContextVar('current_trace', default=None)
+
+
+def sha256(data) -> str:
+    """Hex SHA-256 of bytes or text."""
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    return hashlib.sha256(data).hexdigest()
+
+
+def redact(text: str) -> str:
+    """Mask emails, phone numbers and URL paths in text."""
+    text = _EMAIL.sub('[email]', text)
+    text = _PHONE.sub('[phone]', text)
+    return _URL_PATH.sub(r'\1/[path]', text)
+
+
+def redact_filename(filename: str) -> str:
+    """Reduce a filename to the hints FileDetector reads ('jane_doe_resume.pdf' -> 'redacted_resume.pdf')."""
+    stem, extension = os.path.splitext(filename.lower())
+    hints = [hint for hint in _FILENAME_HINTS if hint in stem]
+    return '_'.join(['redacted'] + hints) + extension
+
+
+def _resources() -> Dict[str, float]:
+    """CPU seconds and RSS of this process."""
+    usage = {'cpu_seconds': time.process_time()}
+    try:
+        import psutil
+        usage['rss_mb'] = psutil.Process().memory_info().rss / 1024 / 1024
+    except ImportError:
+        pass
+    return usage
+
+
+class JobTrace:
+    """Everything recorded about one review job."""
+
+    def __init__(self, kind: str, label: str, content: str = 'redacted'):
+        """
+        Initialize trace.
+
+        Args:
+            kind: Job kind ('pdf', 'pdfs' or 'url')
+            label: Filename(s) or URL of the job
+            content: 'hash', 'redacted' or 'full' (see module docstring)
+        """
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.content = content
+        self.created_at = time.time()
+        self.data: Dict[str, Any] = {
+            'version': TRACE_VERSION,
+            'id': self.id,
+            'kind': kind,
+            'label': self._label(label),
+            'content': content,
+            'created_at': self.created_at,
+            'documents': [],
+            'url': None,
+            'capture': None,
+            'llm': [],
+            'stages': {},
+            'fallbacks': [],
+            'result': None,
+            'error': None,
+            'resources': {'start': _resources()},
+        }
+        self.files: Dict[str, bytes] = {}
+        self._token = None
+        # add_document runs in worker threads for concurrently prepared PDFs
+        self._lock = threading.Lock()
+
+    def _label(self, label: str) -> str:
+        if self.content == 'hash':
+            return sha256(label)[:16]
+        if self.kind == 'url':
+            return redact(label)
+        return ', '.join(redact_filename(name.strip()) for name in label.split(','))
+
+    def _text(self, text: str) -> Dict[str, Any]:
+        """Text as stored under the content mode."""
+        entry: Dict[str, Any] = {'sha256': sha256(text), 'chars': len(text)}
+        if self.content != 'hash':
+            entry['text'] = redact(text)
+        return entry
+
+    def _examples(self, examples: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Metric examples as stored under the content mode (their text is page content)."""
+        if self.content == 'hash':
+            return []
+        return [dict(example, text=redact(example['text'])) for example in examples]
+
+    def _metrics(self, metrics: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Page metrics as stored under the content mode."""
+        if not metrics:
+            return metrics
+        metrics = dict(metrics)
+        if metrics.get('contrast'):
+            metrics['contrast'] = dict(metrics['contrast'], worst=self._examples(metrics['contrast'].get('worst', [])))
+        if metrics.get('tap_targets'):
+            metrics['tap_targets'] = self._tap_targets(metrics['tap_targets'])
+        return metrics
+
+    def _tap_targets(self, tap_targets: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        if not tap_targets:
+            return tap_targets
+        return dict(tap_targets, smallest=self._examples(tap_targets.get('smallest', [])))
+
+    def add_document(
+        self,
+        filename: str,
+        pdf_path: str,
+        text: str,
+        report: Dict[str, Any],
+        file_type: str
+    ):
+        """
+        Record a PDF, its extracted text and how it was classified.
+
+        Args:
+            filename: Uploaded file name
+            pdf_path: Downloaded PDF (archived in 'full' mode)
+            text: Normalized text
+            report: PDFProcessor extraction report
+            file_type: Detected type
+        """
+        with open(pdf_path, 'rb') as f:
+            pdf_bytes = f.read()
+        document = {
+            'filename': redact_filename(filename) if self.content != 'full' else filename,
+            'pdf_sha256': sha256(pdf_bytes),
+            'pdf_bytes': len(pdf_bytes),
+            'file_type': file_type,
+            'report': report,
+            'text': self._text(text),
+            'pdf_file': None,
+        }
+        with self._lock:
+            if self.content == 'full':
+                document['pdf_file'] = f"pdf/{len(self.data['documents'])}.pdf"
+                self.files[document['pdf_file']] = pdf_bytes
+            self.data['documents'].append(document)
+
+    def add_capture(self, url: str, capture: Dict[str, Any]):
+        """
+        Record a URL capture (screenshots are archived only in 'full' mode).
+
+        Args:
+            url: Requested URL
+            capture: Result of ScreenshotService.capture_views (or capture_page)
+        """
+        screenshots = []
+        for index, image in enumerate(capture.get('screenshots') or []):
+            entry = {'sha256': sha256(image), 'bytes': len(image), 'file': None}
+            if self.content == 'full':
+                entry['file'] = f"screenshots/{index}.png"
+                self.files[entry['file']] = image
+            screenshots.append(entry)
+        viewports = {}
+        for name, view in (capture.get('viewports') or {}).items():
+            entry = {key: view[key] for key in ('width', 'height', 'screens')}
+            entry.update({'sha256': sha256(view['image']), 'file': None})
+            entry['tap_targets'] = self._tap_targets(view.get('tap_targets'))
+            if self.content == 'full':
+                entry['file'] = f"viewports/{name}.jpg"
+                self.files[entry['file']] = view['image']
+            viewports[name] = entry
+        self.data['url'] = sha256(url) if self.content == 'hash' else url
+        self.data['capture'] = {
+            'screenshots': screenshots,
+            'viewports': viewports,
+            'text': self._text(capture.get('text') or ''),
+            'headings': [] if self.content == 'hash' else [
+                [level, redact(text)] for level, text in capture.get('headings') or []
+            ],
+            'image_alts': [] if self.content == 'hash' else [
+                redact(alt) if alt else alt for alt in capture.get('image_alts') or []
+            ],
+            'metrics': self._metrics(capture.get('metrics')),
+            'truncation_note': capture.get('truncation_note'),
+            'page_height': capture.get('page_height'),
+            'captured_height': capture.get('captured_height'),
+        }
+
+    def record_llm(
+        self,
+        model: str,
+        prompt_sha256: str,
+        images: int,
+        max_tokens: int,
+        latency: float,
+        response: str,
+        usage: Optional[Dict[str, Any]] = None,
+        stop_reason: Optional[str] = None
+    ):
+        """Record one model request (called by LLMClient)."""
+        call = {
+            'model': model,
+            'prompt_sha256': prompt_sha256,
+            'images': images,
+            'max_tokens': max_tokens,
+            'latency': round(latency, 3),
+            'usage': usage or {},
+            'stop_reason': stop_reason,
+            'response_sha256': sha256(response),
+        }
+        if self.content != 'hash':
+            # Feedback quotes the submission back (contact details, links)
+            call['response'] = response if self.content == 'full' else redact(response)
+        self.data['llm'].append(call)
+
+    def finish(self, deadline=None, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None):
+        """
+        Close the trace with the job's timings and outcome.
+
+        Args:
+            deadline: Job Deadline (stage timings and fallbacks), if it started
+            result: Outcome summary (e.g. file types and feedback length)
+            error: Error message if the job failed
+        """
+        if deadline is not None:
+            self.data['stages'] = {stage: round(seconds, 4) for stage, seconds in deadline.timings.items()}
+            self.data['fallbacks'] = list(deadline.fallbacks)
+        self.data['total_seconds'] = round(time.time() - self.created_at, 4)
+        self.data['result'] = result
+        self.data['error'] = error
+        self.data['resources']['end'] = _resources()
+
+    def save(self, directory: str) -> str:
+        """
+        Write the trace as a zip archive.
+
+        Args:
+            directory: Target directory
+
+        Returns:
+            Path of the archive
+        """
+        os.makedirs(directory, exist_ok=True)
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(self.created_at))
+        path = os.path.join(directory, f"{stamp}_{self.kind}_{self.id}.zip")
+        with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr('trace.json', json.dumps(self.data, indent=1, default=str))
+            for name, data in self.files.items():
+                # PNG/PDF are already compressed
+                archive.writestr(name, data, compress_type=zipfile.ZIP_STORED)
+        return path
+
+
+class TraceRecorder:
+    """Creates job traces and writes them to TRACE_DIR."""
+
+    def __init__(
+        self,
+        directory: str,
+        content: Optional[str] = None,
+        sample_rate: Optional[float] = None,
+        max_traces: Optional[int] = None
+    ):
+        """
+        Initialize recorder.
+
+        Args:
+            directory: Directory receiving the archives
+            content: 'hash', 'redacted' or 'full' (default: TRACE_CONTENT env, 'redacted')
+            sample_rate: Share of jobs recorded (default: TRACE_SAMPLE_RATE env, 1.0)
+            max_traces: Archives kept; the oldest are deleted (default: TRACE_MAX_FILES env, 500)
+        """
+        self.directory = directory
+        self.content = content or os.getenv('TRACE_CONTENT', 'redacted')
+        if self.content not in ('hash', 'redacted', 'full'):
+            raise ValueError(f"Unknown TRACE_CONTENT: {self.content}")
+        self.sample_rate = sample_rate if sample_rate is not None else float(os.getenv('TRACE_SAMPLE_RATE', '1.0'))
+        self.max_traces = max_traces if max_traces is not None else int(os.getenv('TRACE_MAX_FILES', '500'))
+        # Finished traces, newest last (the replay tool reads its results from here)
+        self.recent: Deque[Dict[str, Any]] = deque(maxlen=20)
+
+    def start(self, kind: str, label: str) -> Optional[JobTrace]:
+        """
+        Begin tracing a job in the current task.
+
+        Args:
+            kind: Job kind
+            label: Filename(s) or URL
+
+        Returns:
+            JobTrace, or None if the job is not sampled
+        """
+        if random.random() >= self.sample_rate:
+            return None
+        trace = JobTrace(kind, label, self.content)
+        trace._token = current_trace.set(trace)
+        return trace
+
+    def finish(self, trace: Optional[JobTrace], deadline=None, result=None, error=None):
+        """
+        Close a trace and detach it from the current task.
+
+        Args:
+            trace: Trace from start() (None is ignored)
+            deadline: Job Deadline, if it started
+            result: Outcome summary
+            error: Error message if the job failed
+        """
+        if trace is None:
+            return
+        if trace._token is not None:
+            current_trace.reset(trace._token)
+            trace._token = None
+        trace.finish(deadline, result, error)
+        self.recent.append(trace.data)
+
+    def save(self, trace: Optional[JobTrace]) -> Optional[str]:
+        """
+        Write a finished trace and prune old archives (blocking; run in a thread).
+
+        Returns:
+            Archive path, or None if nothing was written
+        """
+        if trace is None:
+            return None
+        try:
+            path = trace.save(self.directory)
+            self._prune()
+            return path
+        except Exception as e:
+            print(f"Warning: Could not save trace {trace.id}: {e}")
+            return None
+
+    def _prune(self):
+        archives = sorted(name for name in os.listdir(self.directory) if name.endswith('.zip'))
+        for name in archives[:max(len(archives) - self.max_traces, 0)]:
+            os.remove(os.path.join(self.directory, name))
+
+
+def load_trace(path: str) -> Dict[str, Any]:
+    """
+    Read an archive written by JobTrace.save.
+
+    Args:
+        path: Archive path
+
+    Returns:
+        The trace dict, with 'files' mapping archived file names to bytes
+    """
+    with zipfile.ZipFile(path) as archive:
+        data = json.loads(archive.read('trace.json'))
+        data['files'] = {name: archive.read(name) for name in archive.namelist() if name != 'trace.json'}
+    return data
+
+
+def list_traces(paths: List[str]) -> List[str]:
+    """Expand files and directories into archive paths, oldest first."""
+    archives = []
+    for path in paths:
+        if os.path.isdir(path):
+            archives += [os.path.join(path, name) for name in os.listdir(path) if name.endswith('.zip')]
+        else:
+            archives.append(path)
+    return sorted(archives, key=os.path.basename)
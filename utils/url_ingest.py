@@ -0,0 +1,294 @@
+"""
+URL ingestion: extraction, canonicalization, dedup and HTTP pre-flight.
+
+Links are pulled from a message with one precompiled pattern, trimmed of
+trailing punctuation and canonicalized (scheme, host case, default port,
+tracking parameters, trailing slash, fragment), then deduplicated. A
+lightweight pre-flight (HEAD, falling back to a header-only GET) follows
+redirects and classifies each link by status and content type before any
+browser work:
+- 'html' (or 'unknown' when the pre-flight is inconclusive): screenshot review
+- 'pdf': downloaded and reviewed like an attachment
+- 'video', 'image', 'other', 'not_found': answered with a note, no browser launch
+"""
+import asyncio
+import os
+import re
+from typing import Any, Dict, Iterable, List, Optional
+from urllib.parse import parse_qsl, unquote, urlencode, urlsplit, urlunsplit
+
+# Seconds allowed for the pre-flight of one link (redirects included)
+PREFLIGHT_TIMEOUT = float(os.getenv('URL_PREFLIGHT_TIMEOUT', '6'))
+MAX_REDIRECTS = 8
+
+# http(s) URLs and bare www. links; stops at whitespace, quotes and angle brackets
+URL_PATTERN = re.compile(r'(?:https?://|www\.)[^\s<>"\'`|]+', re.IGNORECASE)
+TRAILING_PUNCTUATION = '.,;:!?*_~'
+BRACKETS = {')': '(', ']': '[', '}': '{'}
+
+TRACKING_PARAMS = {
+    'fbclid', 'gclid', 'dclid', 'gbraid', 'wbraid', 'msclkid', 'yclid', 'twclid',
+    'igshid', 'mc_cid', 'mc_eid', '_ga', '_gl', 'ref_src', 'si',
+}
+TRACKING_PREFIXES = ('utm_', 'hsa_', 'pk_')
+
+VIDEO_HOSTS = ('youtube.com', 'youtu.be', 'vimeo.com', 'loom.com', 'tiktok.com')
+
+# Some portfolio hosts refuse requests without a browser-like agent
+USER_AGENT = (
+    'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 '
+    '(KHTML, like Gecko) Chrome/131.0 Safari/537.36 PortfolioBot'
+)
+
+REASONS = {
+    'video': "🎬 {url} is a video. I can review portfolio websites and PDFs — share the page or PDF your video lives in.",
+    'image': "🖼️ {url} is a single image. Share your portfolio website or a PDF and I'll review it.",
+    'other': "📦 {url} isn't a web page or PDF ({content_type}), so I can't review it.",
+    'not_found': "🔗 {url} returned {status} — check the link is public and try again.",
+}
+
+
+class LinkedPDF:
+    """PDF behind a link, shaped like a Discord attachment for the PDF pipeline."""
+
+    def __init__(self, url: str, filename: str, size: int = 0):
+        self.url = url
+        self.filename = filename
+        self.size = size
+
+    async def read(self) -> bytes:
+        """Download the whole PDF (AttachmentDownloader streams from .url instead)."""
+        import aiohttp
+
+        async with aiohttp.ClientSession(headers={'User-Agent': USER_AGENT}) as session:
+            async with session.get(self.url) as response:
+                response.raise_for_status()
+                return await response.read()
+
+
+class URLIngestor:
+    """Turns message text into canonical, pre-flighted links."""
+
+    @staticmethod
+    def is_url(text: str) -> bool:
+        """
+        Check if text starts with a URL.
+
+        Args:
+            text: String to check
+
+        Returns:
+            True if text begins with an http(s) or www. link
+        """
+        return bool(URL_PATTERN.match(text.strip()))
+
+    @staticmethod
+    def _trim(url: str) -> str:
+        """Drop trailing punctuation and closing brackets that are not part of the URL."""
+        while url:
+            last = url[-1]
+            if last in TRAILING_PUNCTUATION:
+                url = url[:-1]
+            elif last in BRACKETS and url.count(last) > url.count(BRACKETS[last]):
+                url = url[:-1]
+            else:
+                break
+        return url
+
+    @staticmethod
+    def extract(text: str) -> List[str]:
+        """
+        Extract URLs from message text.
+
+        Args:
+            text: Message content
+
+        Returns:
+            URLs in order of appearance, trailing punctuation removed
+        """
+        urls = [URLIngestor._trim(match) for match in URL_PATTERN.findall(text or '')]
+        return [url for url in urls if '.' in url.split('//')[-1]]
+
+    @staticmethod
+    def canonicalize(url: str) -> str:
+        """
+        Canonical form of a URL, used for dedup and as the URL reviewed.
+
+        Lowercases scheme and host, adds https:// to bare links, drops
+        credentials, default ports, tracking parameters, the trailing slash
+        and fragments (except '#!' / '#/' routes of single-page apps).
+
+        Args:
+            url: URL as written
+
+        Returns:
+            Canonical URL
+        """
+        if not re.match(r'^[a-zA-Z][a-zA-Z0-9+.-]*://', url):
+            url = 'https://' + url
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        host = (parts.hostname or '').lower().rstrip('.')
+        try:
+            port = parts.port
+        except ValueError:
+            port = None
+        netloc = host
+        if port and (scheme, port) not in (('http', 80), ('https', 443)):
+            netloc = f"{host}:{port}"
+
+        path = parts.path.rstrip('/')
+        query = urlencode([
+            (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+            if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+        ])
+        fragment = parts.fragment if parts.fragment.startswith(('!', '/')) else ''
+        return urlunsplit((scheme, netloc, path, query, fragment))
+
+    @staticmethod
+    def dedupe(urls: Iterable[str]) -> List[str]:
+        """Canonicalize URLs and keep the first occurrence of each."""
+        seen = set()
+        unique = []
+        for url in urls:
+            canonical = URLIngestor.canonicalize(url)
+            if canonical not in seen:
+                seen.add(canonical)
+                unique.append(canonical)
+        return unique
+
+    @staticmethod
+    def classify(url: str, status: Optional[int], content_type: str) -> str:
+        """
+        Route of a link from its pre-flight response.
+
+        Args:
+            url: Final URL after redirects
+            status: HTTP status (None if the pre-flight failed)
+            content_type: Media type without parameters ('' if unknown)
+
+        Returns:
+            'html', 'pdf', 'video', 'image', 'other', 'not_found' or 'unknown'
+        """
+        host = (urlsplit(url).hostname or '').lower()
+        if any(host == h or host.endswith('.' + h) for h in VIDEO_HOSTS):
+            return 'video'
+        if status in (404, 410):
+            return 'not_found'
+        if content_type == 'application/pdf' or (not content_type and urlsplit(url).path.lower().endswith('.pdf')):
+            return 'pdf'
+        if status is None or status >= 400 or not content_type:
+            # Blocked, failing or silent: let the browser try
+            return 'unknown'
+        if content_type in ('text/html', 'application/xhtml+xml', 'text/plain'):
+            return 'html'
+        if content_type.startswith('video/'):
+            return 'video'
+        if content_type.startswith('image/'):
+            return 'image'
+        return 'other'
+
+    @staticmethod
+    def pdf_filename(url: str, content_disposition: str = '') -> str:
+        """
+        Filename for a linked PDF, safe to use in temp paths.
+
+        Args:
+            url: Final URL
+            content_disposition: Content-Disposition header, if any
+
+        Returns:
+            Filename ending in .pdf
+        """
+        match = re.search(r'filename\*?=(?:UTF-8\'\')?"?([^";]+)', content_disposition or '', re.IGNORECASE)
+        name = unquote(match.group(1)) if match else unquote(urlsplit(url).path.rsplit('/', 1)[-1])
+        name = re.sub(r'[^\w.-]+', '_', name).strip('._') or 'linked'
+        return name if name.lower().endswith('.pdf') else name + '.pdf'
+
+    @staticmethod
+    async def preflight(url: str, session, timeout: float = PREFLIGHT_TIMEOUT) -> Dict[str, Any]:
+        """
+        Resolve redirects and read the headers of a link without loading the page.
+
+        Args:
+            url: Canonical URL
+            session: aiohttp ClientSession
+            timeout: Seconds for the whole check
+
+        Returns:
+            Dict with url, final_url, status, content_type, content_length,
+            kind (see classify) and, for PDFs, filename
+        """
+        import aiohttp
+
+        link = {'url': url, 'final_url': url, 'status': None, 'content_type': '', 'content_length': 0}
+        host = (urlsplit(url).hostname or '').lower()
+        if any(host == h or host.endswith('.' + h) for h in VIDEO_HOSTS):
+            link['kind'] = 'video'
+            return link
+
+        client_timeout = aiohttp.ClientTimeout(total=timeout)
+        disposition = ''
+        try:
+            for method in ('HEAD', 'GET'):
+                # Body is never read: a GET is closed once the headers are in
+                async with session.request(
+                    method, url, allow_redirects=True, max_redirects=MAX_REDIRECTS, timeout=client_timeout
+                ) as response:
+                    link['status'] = response.status
+                    link['final_url'] = URLIngestor.canonicalize(str(response.url))
+                    link['content_type'] = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+                    link['content_length'] = int(response.headers.get('Content-Length') or 0)
+                    disposition = response.headers.get('Content-Disposition', '')
+                # Many servers reject or mishandle HEAD
+                if response.status < 400 or response.status in (404, 410):
+                    break
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            print(f"Warning: URL pre-flight failed for {url}: {type(e).__name__} {e}")
+
+        link['kind'] = URLIngestor.classify(link['final_url'], link['status'], link['content_type'])
+        if link['kind'] == 'pdf':
+            link['filename'] = URLIngestor.pdf_filename(link['final_url'], disposition)
+        return link
+
+    @staticmethod
+    async def ingest(text: str, timeout: float = PREFLIGHT_TIMEOUT) -> List[Dict[str, Any]]:
+        """
+        Extract, canonicalize, dedupe and pre-flight the links of a message.
+
+        Args:
+            text: Message content
+            timeout: Pre-flight seconds per link (checks run concurrently)
+
+        Returns:
+            One pre-flight dict per distinct destination, in message order
+        """
+        urls = URLIngestor.dedupe(URLIngestor.extract(text))
+        if not urls:
+            return []
+
+        import aiohttp
+
+        async with aiohttp.ClientSession(headers={'User-Agent': USER_AGENT}) as session:
+            links = await asyncio.gather(*(URLIngestor.preflight(url, session, timeout) for url in urls))
+
+        # Short links and redirects can lead to the same page
+        seen = set()
+        unique = []
+        for link in links:
+            if link['final_url'] not in seen:
+                seen.add(link['final_url'])
+                unique.append(link)
+        return unique
+
+    @staticmethod
+    def reason(link: Dict[str, Any]) -> str:
+        """User-facing note for a link that is not reviewed."""
+        return REASONS[link['kind']].format(
+            url=link['url'], status=link['status'], content_type=link['content_type'] or 'unknown type'
+        )
+
+    @staticmethod
+    def as_attachment(link: Dict[str, Any]) -> LinkedPDF:
+        """Attachment-like object for a link classified as 'pdf'."""
+        return LinkedPDF(link['final_url'], link['filename'], link['content_length'])
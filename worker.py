@@ -0,0 +1,224 @@
+"""
+Evaluation worker processes for gateway mode.
+
+With BOT_MODE=gateway, bot.py only holds the Discord gateway connection and
+puts review jobs on the local SQLite JobQueue. This script starts N worker
+processes that claim those jobs, run the review pipeline (PDF parsing,
+Chromium, LLM calls) and post results over Discord's REST API, so heavy
+work never competes with gateway heartbeats and scales across cores.
+
+Usage:
+    python worker.py --processes 4
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import time
+import discord
+from dotenv import load_dotenv
+
+# Before the project imports, which read their settings at import time
+load_dotenv()
+
+from utils import JobQueue, ProgressTracker, ReviewQueue, Runtime  # noqa: E402
+from pipeline import ReviewPipeline  # noqa: E402
+
+TOKEN = os.getenv('DISCORD_TOKEN')
+CLAUDE_API_KEY = os.getenv('CLAUDE_API_KEY')
+JOB_QUEUE_PATH = os.getenv('JOB_QUEUE_PATH', 'data/jobs.db')
+# Jobs in this process's staged pipeline at once (each stage bounds its own work)
+WORKER_CONCURRENCY = int(os.getenv('WORKER_CONCURRENCY', '4'))
+# Seconds between stage utilization logs (0 disables)
+STAGE_LOG_INTERVAL = float(os.getenv('STAGE_LOG_INTERVAL', '300'))
+LEASE_SECONDS = 60.0
+POLL_INTERVAL = 0.5
+
+
+class RemoteAttachment:
+    """Attachment reference from a job payload, downloaded with the worker's REST client."""
+
+    def __init__(self, client: discord.Client, url: str, filename: str, size: int):
+        self.client = client
+        self.url = url
+        self.filename = filename
+        self.size = size
+
+    async def read(self) -> bytes:
+        """Download the attachment from Discord's CDN."""
+        return await self.client.http.get_from_cdn(self.url)
+
+
+class Worker:
+    """Claims jobs from the queue and runs them through the review pipeline."""
+
+    def __init__(self, worker_id: str, client: discord.Client, job_queue: JobQueue):
+        """
+        Initialize worker.
+
+        Args:
+            worker_id: Identity used for job leases
+            client: Logged-in (REST only) Discord client
+            job_queue: Shared job queue
+        """
+        self.worker_id = worker_id
+        self.client = client
+        self.job_queue = job_queue
+        self.runtime = Runtime(api_key=CLAUDE_API_KEY)
+        self.pipeline = ReviewPipeline(self.runtime, ReviewQueue(max_concurrent=WORKER_CONCURRENCY))
+        self._slots = asyncio.Semaphore(WORKER_CONCURRENCY)
+        self._tasks = set()
+
+    async def run(self):
+        """Claim and run jobs until cancelled."""
+        self.runtime.start_warm_up()
+        log_task = asyncio.create_task(self._log_stages()) if STAGE_LOG_INTERVAL > 0 else None
+        try:
+            while True:
+                await self._slots.acquire()
+                # Under memory pressure, leave jobs in the durable queue instead of claiming them
+                await self.runtime.resources.wait_for_intake()
+                job = await asyncio.to_thread(self.job_queue.claim, self.worker_id, LEASE_SECONDS)
+                if job is None:
+                    self._slots.release()
+                    await asyncio.sleep(POLL_INTERVAL)
+                    continue
+                task = asyncio.create_task(self.handle(job))
+                self._tasks.add(task)
+                task.add_done_callback(self._task_done)
+        finally:
+            if log_task is not None:
+                log_task.cancel()
+            await self.runtime.close()
+
+    async def _log_stages(self):
+        """Periodically log stage utilization, so the bottleneck stage can be tuned."""
+        while True:
+            await asyncio.sleep(STAGE_LOG_INTERVAL)
+            print(f"Worker {self.worker_id} {self.runtime.stages.format_metrics()}")
+
+    def _task_done(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        self._slots.release()
+
+    async def handle(self, job: dict):
+        """Run one job while keeping its lease alive; a job whose lease is lost is abandoned."""
+        run = asyncio.create_task(self.run_job(job))
+        heartbeat = asyncio.create_task(self._heartbeat(job['id'], run))
+        try:
+            await run
+            if not await asyncio.to_thread(self.job_queue.complete, job['id'], self.worker_id):
+                print(f"Job {job['id']} finished after its lease was lost")
+        except asyncio.CancelledError:
+            if heartbeat.done() and not heartbeat.cancelled():
+                # Another worker reclaimed the job; it replies, so this one stops without replying
+                print(f"Job {job['id']} lease lost to another worker, stopped")
+                return
+            raise
+        except Exception as e:
+            print(f"Job {job['id']} failed: {e}")
+            await asyncio.to_thread(self.job_queue.fail, job['id'], str(e), self.worker_id)
+        finally:
+            heartbeat.cancel()
+            run.cancel()
+
+    async def _heartbeat(self, job_id: int, run: asyncio.Task):
+        """Renew the job's lease until it is lost, then cancel the job's task."""
+        while True:
+            await asyncio.sleep(LEASE_SECONDS / 3)
+            try:
+                renewed = await asyncio.to_thread(self.job_queue.heartbeat, job_id, self.worker_id, LEASE_SECONDS)
+            except Exception as e:
+                print(f"Warning: Heartbeat of job {job_id} failed: {e}")
+                continue
+            if not renewed:
+                run.cancel()
+                return
+
+    async def run_job(self, job: dict):
+        """
+        Rebuild the Discord context of a job and run it through the pipeline.
+
+        Args:
+            job: Claimed job from JobQueue.claim()
+        """
+        payload = job['payload']
+        channel = self.client.get_partial_messageable(payload['channel_id'], guild_id=payload.get('guild_id'))
+        message = channel.get_partial_message(payload['message_id'])
+
+        tracker = ProgressTracker(message, payload['label'], started_at=job['created_at'])
+        if payload.get('status_message_id'):
+            tracker.attach(channel.get_partial_message(payload['status_message_id']))
+        else:
+            await tracker.start()
+
+        if job['kind'] == 'pdf':
+            # Jobs queued by older gateways carry a single attachment
+            entries = payload.get('attachments') or [
+                {'url': payload['attachment_url'], 'filename': payload['filename'], 'size': payload.get('size', 0)}
+            ]
+            attachments = [
+                RemoteAttachment(self.client, entry['url'], entry['filename'], entry.get('size', 0))
+                for entry in entries
+            ]
+            await self.pipeline.process_pdfs(attachments, message, tracker, user_id=payload.get('author_id'))
+        elif job['kind'] == 'url':
+            await self.pipeline.process_url(payload['url'], message, tracker, user_id=payload.get('author_id'))
+        else:
+            raise ValueError(f"Unknown job kind: {job['kind']}")
+
+
+async def worker_main(index: int):
+    """Entry point of a single worker process."""
+    job_queue = JobQueue(JOB_QUEUE_PATH)
+    worker_id = f"{JobQueue.default_worker_id()}/{index}"
+
+    # REST-only client: no gateway connection is opened
+    client = discord.Client(intents=discord.Intents.none())
+    await client.login(TOKEN)
+    print(f"Worker {worker_id} started")
+    try:
+        await Worker(worker_id, client, job_queue).run()
+    finally:
+        await client.close()
+
+
+def run_worker(index: int):
+    asyncio.run(worker_main(index))
+
+
+def main():
+    """Start and supervise worker processes, restarting any that exit."""
+    parser = argparse.ArgumentParser(description='Run review worker processes.')
+    parser.add_argument(
+        '--processes',
+        type=int,
+        default=int(os.getenv('WORKER_PROCESSES', os.cpu_count() or 1)),
+        help='Number of worker processes (default: WORKER_PROCESSES or CPU count)'
+    )
+    args = parser.parse_args()
+
+    processes = {}
+    try:
+        while True:
+            for index in range(args.processes):
+                process = processes.get(index)
+                if process is None or not process.is_alive():
+                    if process is not None:
+                        print(f"Worker {index} exited with code {process.exitcode}, restarting")
+                    # Not daemonic: workers start their own children (the rasterizer pool)
+                    process = multiprocessing.Process(target=run_worker, args=(index,))
+                    process.start()
+                    processes[index] = process
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in processes.values():
+            process.terminate()
+        for process in processes.values():
+            process.join(timeout=10)
+
+
+if __name__ == '__main__':
+    main()